@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import json
+import multiprocessing
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -194,3 +196,151 @@ CORS_ALLOW_CREDENTIALS = True
 JUDGE0_API_URL = os.getenv("JUDGE0_API_URL", "https://judge0-ce.p.rapidapi.com")
 JUDGE0_API_KEY = os.getenv("JUDGE0_API_KEY", "564272a764msh6ebda9deeb299ddp18835ejsn9002c3e5521d")
 JUDGE0_RAPIDAPI_HOST = os.getenv("JUDGE0_RAPIDAPI_HOST", "judge0-ce.p.rapidapi.com")
+# 批量执行时每批提交的数量（Judge0默认最多20）
+JUDGE0_BATCH_SIZE = int(os.getenv("JUDGE0_BATCH_SIZE", "20"))
+# 判题机允许的最大CPU时间/运行时间限制（秒，Judge0默认max_cpu_time_limit=15、max_wall_time_limit=20），
+# 计时模式放大限制时不超过该值
+JUDGE0_MAX_CPU_TIME_LIMIT = float(os.getenv("JUDGE0_MAX_CPU_TIME_LIMIT", "15"))
+JUDGE0_MAX_WALL_TIME_LIMIT = float(os.getenv("JUDGE0_MAX_WALL_TIME_LIMIT", "20"))
+
+# 代码执行调度配置（按班级、学生两级加权公平排队）
+# gunicorn进程数和每个进程的请求线程数（与gunicorn_config.py一致）
+GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+# 每个进程同时向执行后端提交的最大任务数。调度器按进程排队（公平分配和单个学生的并发上限都只在
+# 一个进程内生效，整体并发为 进程数 × 该值），需小于请求线程数，否则槽位用不完，排队不会发生
+EXECUTION_MAX_CONCURRENCY = int(os.getenv("EXECUTION_MAX_CONCURRENCY", str(max(1, GUNICORN_THREADS - 1))))
+# 单个学生在一个进程内同时执行的最大任务数
+EXECUTION_MAX_CONCURRENT_PER_STUDENT = int(os.getenv("EXECUTION_MAX_CONCURRENT_PER_STUDENT", "2"))
+# 班级权重，JSON格式，如 {"3": 2.0} 表示班级3获得两倍份额；未配置的班级使用默认权重
+EXECUTION_CLASS_WEIGHTS = json.loads(os.getenv("EXECUTION_CLASS_WEIGHTS", "{}"))
+EXECUTION_DEFAULT_CLASS_WEIGHT = float(os.getenv("EXECUTION_DEFAULT_CLASS_WEIGHT", "1.0"))
+# 等待执行槽位的最长时间（秒）
+EXECUTION_QUEUE_TIMEOUT = float(os.getenv("EXECUTION_QUEUE_TIMEOUT", "60"))
+
+# 缓存配置：配置REDIS_URL时使用Redis，使准入统计等状态在多个gunicorn进程间共享；否则使用进程内缓存
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# 准入控制配置：预计排队时间超过阈值时直接返回429
+# 预计等待时间上限（秒），需明显小于gunicorn的timeout
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "30"))
+# Retry-After的最大值（秒）
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "120"))
+# 在途请求租约的有效期（秒），需大于gunicorn的timeout；进程被杀时未释放的租约到期后自动失效
+ADMISSION_LEASE_SECONDS = int(os.getenv("ADMISSION_LEASE_SECONDS", "180"))
+# 各资源池的容量与在途请求数的范围一致：配置REDIS_URL时为整个部署的总容量，否则为单个进程的容量
+ADMISSION_POOLS = {
+    # 代码测试/提交（Judge0执行）
+    "execution": {
+        "capacity": int(os.getenv(
+            "ADMISSION_EXECUTION_CAPACITY",
+            str(EXECUTION_MAX_CONCURRENCY * (GUNICORN_WORKERS if REDIS_URL else 1)),
+        )),
+        "default_service_time": float(os.getenv("ADMISSION_EXECUTION_SERVICE_TIME", "10")),
+    },
+    # AI代码解析（DeepSeek）
+    "analysis": {
+        "capacity": int(os.getenv("ADMISSION_ANALYSIS_CAPACITY", "4")),
+        "default_service_time": float(os.getenv("ADMISSION_ANALYSIS_SERVICE_TIME", "30")),
+    },
+}
+
+# 快速失败模式：统计测试用例历史失败率时读取的最近测试尝试数量，以及统计结果的缓存时间（秒）
+FAILURE_HISTORY_ATTEMPTS = int(os.getenv("FAILURE_HISTORY_ATTEMPTS", "200"))
+FAILURE_HISTORY_CACHE_SECONDS = int(os.getenv("FAILURE_HISTORY_CACHE_SECONDS", "300"))
+
+# 本地预检：提交到Judge0前先做语法/编译检查，编译错误直接返回，不占用执行后端
+PREFLIGHT_ENABLED = os.getenv("PREFLIGHT_ENABLED", "True") == "True"
+# Java默认只做词法/括号检查；开启后本地有javac时再用javac做完整编译检查（在请求线程中启动JVM，
+# 每次数秒，结果按源码缓存PREFLIGHT_JAVAC_CACHE_SECONDS秒）
+PREFLIGHT_USE_JAVAC = os.getenv("PREFLIGHT_USE_JAVAC", "False") == "True"
+PREFLIGHT_JAVAC_TIMEOUT = float(os.getenv("PREFLIGHT_JAVAC_TIMEOUT", "15"))
+PREFLIGHT_JAVAC_CACHE_SECONDS = int(os.getenv("PREFLIGHT_JAVAC_CACHE_SECONDS", "3600"))
+# 与Judge0上的Java版本保持一致（OpenJDK 13），留空则不传--release
+PREFLIGHT_JAVA_RELEASE = os.getenv("PREFLIGHT_JAVA_RELEASE", "13")
+
+# 两阶段评测：截止时间前后多少分钟内视为高峰期（任务开启deferred_hidden_grading时生效）
+# 高峰期内的临时成绩由 python manage.py finalize_provisional_submissions 在低峰期补跑隐藏用例后确定
+DEFERRED_GRADING_WINDOW_MINUTES = int(os.getenv("DEFERRED_GRADING_WINDOW_MINUTES", "30"))
+
+# 每个进程后台任务线程数（推测执行、后台评测等）
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "2"))
+# 每个进程排队和运行中的后台任务数达到该值时，丢弃新的可丢弃任务（推测执行）
+BACKGROUND_MAX_PENDING = int(os.getenv("BACKGROUND_MAX_PENDING", "8"))
+# 任务作业（校准、生成期望输出、生成随机用例、测量参考答案）单独的线程数；
+# 执行作业的进程每隔多少秒刷新作业心跳，超过3个周期没有心跳的等待中/执行中作业视为中断
+TASK_JOB_WORKERS = int(os.getenv("TASK_JOB_WORKERS", "1"))
+TASK_JOB_HEARTBEAT_SECONDS = int(os.getenv("TASK_JOB_HEARTBEAT_SECONDS", "30"))
+# 推测执行：练习运行的可见用例全部通过后，后台低优先级预跑隐藏用例，提交时直接复用结果
+SPECULATIVE_EXECUTION_ENABLED = os.getenv("SPECULATIVE_EXECUTION_ENABLED", "True") == "True"
+# 推测执行结果的有效期（秒）
+SPECULATIVE_RESULT_TTL = int(os.getenv("SPECULATIVE_RESULT_TTL", "600"))
+# 推测执行从提交到全部用例等到执行槽位的总时限（秒），超时后剩余用例不再执行
+SPECULATIVE_DEADLINE = float(os.getenv("SPECULATIVE_DEADLINE", "60"))
+# 每个进程同时运行的低优先级执行数上限
+EXECUTION_LOW_PRIORITY_MAX = int(os.getenv("EXECUTION_LOW_PRIORITY_MAX", "1"))
+# 重任务：按资源限制估算的开销（默认限制为1）不小于该值的执行
+EXECUTION_HEAVY_COST = float(os.getenv("EXECUTION_HEAVY_COST", "2.5"))
+# 每个进程同时运行的重任务数上限（默认为最大并发数的一半）
+EXECUTION_MAX_HEAVY = int(os.getenv("EXECUTION_MAX_HEAVY", str(max(1, EXECUTION_MAX_CONCURRENCY // 2))))
+
+# 快速反馈（抽样）模式：默认样本量和分层数
+QUICK_FEEDBACK_SAMPLE_SIZE = int(os.getenv("QUICK_FEEDBACK_SAMPLE_SIZE", "20"))
+QUICK_FEEDBACK_STRATA = int(os.getenv("QUICK_FEEDBACK_STRATA", "4"))
+
+# 未通过用例的输出对比：首个不一致处前后显示的行数、每行最多显示的字符数、最多扫描的字符数、结果缓存时间（秒）
+OUTPUT_DIFF_CONTEXT_LINES = int(os.getenv("OUTPUT_DIFF_CONTEXT_LINES", "3"))
+OUTPUT_DIFF_MAX_LINE_CHARS = int(os.getenv("OUTPUT_DIFF_MAX_LINE_CHARS", "200"))
+OUTPUT_DIFF_MAX_SCAN_CHARS = int(os.getenv("OUTPUT_DIFF_MAX_SCAN_CHARS", "2000000"))
+OUTPUT_DIFF_CACHE_SECONDS = int(os.getenv("OUTPUT_DIFF_CACHE_SECONDS", "86400"))
+
+# 参考答案校准资源限制：每个用例执行次数、限制相对参考答案P95的倍数、CPU时间限制下限（秒）、
+# 校准执行时使用的CPU时间上限（秒）和内存上限（KB）
+CALIBRATION_RUNS = int(os.getenv("CALIBRATION_RUNS", "5"))
+CALIBRATION_TIME_MULTIPLIER = float(os.getenv("CALIBRATION_TIME_MULTIPLIER", "3.0"))
+CALIBRATION_MEMORY_MULTIPLIER = float(os.getenv("CALIBRATION_MEMORY_MULTIPLIER", "2.0"))
+CALIBRATION_MIN_CPU_TIME = float(os.getenv("CALIBRATION_MIN_CPU_TIME", "0.2"))
+CALIBRATION_MAX_CPU_TIME = float(os.getenv("CALIBRATION_MAX_CPU_TIME", "10"))
+CALIBRATION_MAX_MEMORY = int(os.getenv("CALIBRATION_MAX_MEMORY", "512000"))
+# 参考答案作业（校准、生成期望输出）同时在执行的批数
+REFERENCE_BATCH_CONCURRENCY = int(os.getenv("REFERENCE_BATCH_CONCURRENCY", "2"))
+
+# 随机用例生成脚本的运行时间上限（秒）和单次最多生成的用例数
+GENERATOR_TIMEOUT = int(os.getenv("GENERATOR_TIMEOUT", "60"))
+GENERATOR_MAX_CASES = int(os.getenv("GENERATOR_MAX_CASES", "5000"))
+
+# 时间复杂度估算：输入规模序列（JSON数组）、每个规模执行次数（取中位数）、整次测量的CPU时间上限（秒）、
+# 选择更简单的复杂度等级时允许的残差相对增幅
+COMPLEXITY_SIZES = json.loads(os.getenv("COMPLEXITY_SIZES", "[256, 512, 1024, 2048, 4096, 8192, 16384]"))
+COMPLEXITY_REPEAT = int(os.getenv("COMPLEXITY_REPEAT", "3"))
+COMPLEXITY_CPU_TIME_LIMIT = float(os.getenv("COMPLEXITY_CPU_TIME_LIMIT", "10"))
+COMPLEXITY_RESIDUAL_TOLERANCE = float(os.getenv("COMPLEXITY_RESIDUAL_TOLERANCE", "0.1"))
+
+# 速度分档计分：默认档位（JSON，[[相对参考答案的最大倍数, 得分比例], ...]）、同一用例在一次执行中重复运行的次数、
+# 计时精度（秒，运行时间低于该值时按该值计算倍数）
+SPEED_TIERS = json.loads(os.getenv("SPEED_TIERS", "[[1.5, 1.0], [3, 0.7], [10, 0.4]]"))
+SPEED_TIMING_REPEAT = int(os.getenv("SPEED_TIMING_REPEAT", "5"))
+SPEED_TIME_RESOLUTION = float(os.getenv("SPEED_TIME_RESOLUTION", "0.001"))
+
+# 测试尝试写缓冲：练习运行记录先放进进程内缓冲，由后台线程批量写入（关闭时在请求中同步写入）；
+# 测试次数和供提交复用的结果缓存仍在请求中同步更新。每攒够多少条或每隔多少毫秒写入一次
+# （进程被SIGKILL或gunicorn超时杀掉时最多丢失这段时间内的练习记录）；最近一次结果的缓存时间（秒）；
+# 写入失败和进程退出时写不进数据库的记录保存到的文件
+ATTEMPT_WRITE_BEHIND = os.getenv("ATTEMPT_WRITE_BEHIND", "True") == "True"
+ATTEMPT_BUFFER_MAX_RECORDS = int(os.getenv("ATTEMPT_BUFFER_MAX_RECORDS", "50"))
+ATTEMPT_BUFFER_FLUSH_MS = int(os.getenv("ATTEMPT_BUFFER_FLUSH_MS", "200"))
+ATTEMPT_RECENT_CACHE_SECONDS = int(os.getenv("ATTEMPT_RECENT_CACHE_SECONDS", "600"))
+ATTEMPT_SPOOL_PATH = os.getenv("ATTEMPT_SPOOL_PATH", str(BASE_DIR / "attempt_spool.jsonl"))
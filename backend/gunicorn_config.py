@@ -1,8 +1,13 @@
 import multiprocessing
+import os
 
 bind = "127.0.0.1:8000"
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+# 评测请求大部分时间在等待Judge0返回，使用线程worker让同一进程内的执行调度器能在多个请求之间公平分配槽位。
+# 调度器按进程工作：每个进程的执行并发数（EXECUTION_MAX_CONCURRENCY，默认为线程数减1）需小于线程数，
+# 否则槽位永远用不完，排队不会发生；公平分配和单个学生的并发上限也只在一个进程内生效
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
 worker_connections = 1000
 timeout = 120
 keepalive = 5
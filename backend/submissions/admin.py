@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Submission, TestResult, TestAttempt
+from .models import Submission, TestResult, TestAttempt, AttemptCounter
 
 
 class TestResultInline(admin.TabularInline):
@@ -10,10 +10,10 @@ class TestResultInline(admin.TabularInline):
 
 @admin.register(Submission)
 class SubmissionAdmin(admin.ModelAdmin):
-    list_display = ["student", "task", "language", "score", "test_count", "submitted_at"]
-    list_filter = ["language", "submitted_at"]
+    list_display = ["student", "task", "language", "score", "provisional", "test_count", "submitted_at"]
+    list_filter = ["language", "provisional", "submitted_at"]
     search_fields = ["student__username", "task__title"]
-    readonly_fields = ["submitted_at", "updated_at"]
+    readonly_fields = ["submitted_at", "updated_at", "finalized_at"]
     inlines = [TestResultInline]
 
 
@@ -30,3 +30,10 @@ class TestAttemptAdmin(admin.ModelAdmin):
     list_filter = ["language", "created_at"]
     search_fields = ["student__username", "task__title"]
     readonly_fields = ["created_at"]
+
+
+@admin.register(AttemptCounter)
+class AttemptCounterAdmin(admin.ModelAdmin):
+    list_display = ["student", "task", "count", "updated_at"]
+    search_fields = ["student__username", "task__title"]
+    readonly_fields = ["updated_at"]
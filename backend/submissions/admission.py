@@ -0,0 +1,260 @@
+"""执行类接口的准入控制：容量饱和时尽早返回429和Retry-After"""
+import math
+import threading
+import time
+import uuid
+from functools import wraps
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+
+class _LocalLeases:
+    """进程内的在途请求租约（未配置Redis时，与进程内缓存一致，只统计本进程）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> {token: 到期时间}
+        self._leases: Dict[str, Dict[str, float]] = {}
+
+    def _live(self, key: str, now: float) -> Dict[str, float]:
+        leases = self._leases.setdefault(key, {})
+        for token in [t for t, expires in leases.items() if expires <= now]:
+            del leases[token]
+        return leases
+
+    def acquire(self, key: str, token: str, ttl: float) -> int:
+        """登记租约，返回登记后的在途数（登记与计数在同一把锁内）"""
+        now = time.time()
+        with self._lock:
+            leases = self._live(key, now)
+            leases[token] = now + ttl
+            return len(leases)
+
+    def release(self, key: str, token: str) -> int:
+        with self._lock:
+            leases = self._live(key, time.time())
+            leases.pop(token, None)
+            return len(leases)
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._live(key, time.time()))
+
+
+class _RedisLeases:
+    """
+    Redis有序集合中的在途请求租约（成员为请求标识，分数为到期时间），跨进程共享
+
+    每个操作的清理、登记和计数在一个MULTI/EXEC事务中执行，登记后返回的在途数包含本次登记，
+    并发请求各自看到不同的计数。
+    """
+
+    def __init__(self, backend: RedisCache):
+        self.backend = backend
+
+    def _client(self, key: str):
+        return self.backend._cache.get_client(key, write=True)
+
+    def _run(self, key: str, operation, *args) -> int:
+        key = self.backend.make_key(key)
+        now = time.time()
+        pipe = self._client(key).pipeline(transaction=True)
+        pipe.zremrangebyscore(key, "-inf", now)
+        if operation == "acquire":
+            token, ttl = args
+            pipe.zadd(key, {token: now + ttl})
+            pipe.expire(key, int(ttl) + 60)
+        elif operation == "release":
+            pipe.zrem(key, args[0])
+        pipe.zcard(key)
+        return int(pipe.execute()[-1])
+
+    def acquire(self, key: str, token: str, ttl: float) -> int:
+        return self._run(key, "acquire", token, ttl)
+
+    def release(self, key: str, token: str) -> int:
+        return self._run(key, "release", token)
+
+    def count(self, key: str) -> int:
+        return self._run(key, "count")
+
+
+_local_leases = _LocalLeases()
+
+
+def _leases():
+    backend = caches["default"]
+    if isinstance(backend, RedisCache):
+        return _RedisLeases(backend)
+    return _local_leases
+
+
+class AdmissionController:
+    """
+    基于排队深度和近期吞吐的准入控制
+
+    在途请求数和近期完成情况记录在Django缓存中，配置共享缓存（REDIS_URL）时跨进程生效。
+    每个在途请求持有一个带到期时间的租约（ADMISSION_LEASE_SECONDS），在途数为未到期租约的个数，
+    进程被杀等原因未释放的租约到期后自动失效，不会使计数漂移。
+    预计等待时间 = 排在前面的请求数 / 近期吞吐（个/秒），超过阈值时直接拒绝，
+    避免请求挂起到gunicorn超时，同时保护数据库连接和worker槽位。
+    """
+
+    # 完成数按时间桶计数，桶宽（秒）
+    BUCKET_SECONDS = 10
+
+    def __init__(self, pool: str, capacity: int, max_wait: float, default_service_time: float, window: float = 60.0):
+        self.pool = pool
+        self.capacity = max(1, int(capacity))
+        self.max_wait = max_wait
+        self.default_service_time = default_service_time
+        self.window = window
+
+    def _key(self, suffix: str) -> str:
+        return f"admission:{self.pool}:{suffix}"
+
+    def _in_flight(self) -> int:
+        return _leases().count(self._key("in_flight"))
+
+    def _count_decision(self, decision: str):
+        """准入结果计数，记在缓存中（配置REDIS_URL时为整个部署的合计）"""
+        key = self._key(f"decisions:{decision}")
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict:
+        """准入状态：在途数、预计等待时间和各准入结果的累计数"""
+        decisions = ("admitted", "rejected")
+        counts = cache.get_many([self._key(f"decisions:{d}") for d in decisions])
+        return {
+            "in_flight": self._in_flight(),
+            "estimated_wait": round(self.estimate_wait(), 3),
+            "decisions": {d: counts.get(self._key(f"decisions:{d}"), 0) for d in decisions},
+        }
+
+    def _throughput(self) -> float:
+        """近期吞吐（请求/秒）：取实际完成速率与按平均服务时间推算的速率中较大者"""
+        now_bucket = int(time.time()) // self.BUCKET_SECONDS
+        bucket_count = max(1, int(self.window // self.BUCKET_SECONDS))
+        keys = [self._key(f"done:{now_bucket - i}") for i in range(bucket_count)]
+        completed = sum(cache.get_many(keys).values())
+        observed = completed / (bucket_count * self.BUCKET_SECONDS)
+
+        service_time = cache.get(self._key("service_time"), self.default_service_time)
+        estimated = self.capacity / max(service_time, 0.001)
+        return max(observed, estimated)
+
+    def _wait_at(self, position: int) -> float:
+        """在途请求中排第position个（含自身）的请求的预计等待时间（秒）"""
+        ahead = position - self.capacity
+        if ahead <= 0:
+            return 0.0
+        return ahead / self._throughput()
+
+    def estimate_wait(self) -> float:
+        """估算新请求的排队等待时间（秒）"""
+        return self._wait_at(self._in_flight() + 1)
+
+    def try_admit(self) -> Tuple[bool, float, str]:
+        """
+        尝试准入一个请求
+
+        先原子地登记租约并取得登记后的在途数，再按该位置判断；超过等待阈值时释放租约并拒绝。
+        检查和登记如果分开执行，并发请求会同时通过检查而超出容量。
+
+        Returns:
+            (是否准入, 预计等待秒数, 租约标识（未准入时为空）)
+        """
+        leases = _leases()
+        key = self._key("in_flight")
+        token = uuid.uuid4().hex
+        wait = self._wait_at(leases.acquire(key, token, settings.ADMISSION_LEASE_SECONDS))
+        if wait > self.max_wait:
+            leases.release(key, token)
+            self._count_decision("rejected")
+            return False, wait, ""
+
+        self._count_decision("admitted")
+        return True, wait, token
+
+    def release(self, token: str, started_at: float):
+        """请求结束，释放租约，更新完成数和平均服务时间"""
+        duration = time.monotonic() - started_at
+        _leases().release(self._key("in_flight"), token)
+
+        bucket_key = self._key(f"done:{int(time.time()) // self.BUCKET_SECONDS}")
+        cache.add(bucket_key, 0, timeout=int(self.window) + self.BUCKET_SECONDS)
+        try:
+            cache.incr(bucket_key)
+        except ValueError:
+            pass
+
+        # 指数加权平均服务时间（非原子更新，近似值即可）
+        previous = cache.get(self._key("service_time"), duration)
+        cache.set(self._key("service_time"), previous * 0.8 + duration * 0.2, timeout=3600)
+        # 请求耗时汇总只统计本进程
+        metrics.observe("admission_request_seconds", duration, pool=self.pool)
+
+
+def get_controller(pool: str) -> AdmissionController:
+    """按settings构造指定资源池的准入控制器"""
+    config = settings.ADMISSION_POOLS[pool]
+    return AdmissionController(
+        pool=pool,
+        capacity=config["capacity"],
+        max_wait=config.get("max_wait", settings.ADMISSION_MAX_WAIT),
+        default_service_time=config["default_service_time"],
+    )
+
+
+def admission_controlled(pool: str):
+    """
+    视图装饰器：对指定资源池做准入控制
+
+    需放在 @api_view / @permission_classes 之下，使认证和权限检查先于准入执行。
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            controller = get_controller(pool)
+            admitted, wait, token = controller.try_admit()
+            if not admitted:
+                retry_after = min(max(1, math.ceil(wait)), settings.ADMISSION_MAX_RETRY_AFTER)
+                return Response(
+                    {
+                        "error": "评测服务繁忙，请稍后重试",
+                        "retry_after": retry_after,
+                    },
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+            started_at = time.monotonic()
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                controller.release(token, started_at)
+        return wrapper
+    return decorator
+
+
+def shared_metrics() -> List[Tuple[str, Dict, float]]:
+    """各资源池的准入指标 [(名称, 标签, 值)]，取自缓存（配置REDIS_URL时为整个部署的合计）"""
+    values = []
+    for pool in settings.ADMISSION_POOLS:
+        stats = get_controller(pool).stats()
+        values.append(("admission_in_flight", {"pool": pool}, stats["in_flight"]))
+        values.append(("admission_estimated_wait_seconds", {"pool": pool}, stats["estimated_wait"]))
+        for decision, count in stats["decisions"].items():
+            values.append(("admission_decisions_total", {"pool": pool, "decision": decision}, count))
+    return values
@@ -0,0 +1,172 @@
+"""
+测试尝试写缓冲（write-behind）
+
+练习运行的TestAttempt（含全部用例结果的JSON）不在请求中同步写入，而是放进进程内缓冲，
+由后台线程每ATTEMPT_BUFFER_MAX_RECORDS条或每ATTEMPT_BUFFER_FLUSH_MS毫秒用一次bulk_create
+批量写入。请求中同步完成的只有：
+
+- 测试次数计数（attempts.increment_attempt_counts，一次UPDATE），所有进程立即可见
+- 把本次结果写入缓存（recent_attempt_results），配置REDIS_URL时其他进程提交同一份代码也能复用
+
+写入失败时记录追加到ATTEMPT_SPOOL_PATH（每行一条JSON），由 python manage.py replay_attempt_spool
+重新写入。进程正常退出（包括gunicorn按max_requests回收进程）时atexit写入剩余记录；进程被SIGKILL
+或gunicorn超时杀掉时atexit不会执行，最多丢失该进程最近ATTEMPT_BUFFER_FLUSH_MS毫秒内
+（不超过ATTEMPT_BUFFER_MAX_RECORDS条）的练习记录，测试次数不受影响。
+
+指标：attempt_buffer_depth（缓冲中的记录数）、attempt_flush_seconds（每次写入耗时）、
+attempts_flushed_total、attempts_spooled_total
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import metrics
+from .attempts import increment_attempt_counts, record_attempts
+from .models import TestAttempt
+
+logger = logging.getLogger(__name__)
+
+# 落盘文件中保存的字段
+SPOOL_FIELDS = ("task_id", "student_id", "code_content", "code_hash", "language", "test_results")
+
+_spool_lock = threading.Lock()
+
+
+def _to_spool_line(attempt: TestAttempt, queued_at) -> str:
+    record = {name: getattr(attempt, name) for name in SPOOL_FIELDS}
+    record["created_at"] = queued_at.isoformat()
+    return json.dumps(record, ensure_ascii=False)
+
+
+def spool_attempts(entries):
+    """把写不进数据库的 [(记录, 入队时间)] 追加到落盘文件"""
+    if not entries:
+        return
+    with _spool_lock:
+        with open(settings.ATTEMPT_SPOOL_PATH, "a", encoding="utf-8") as f:
+            for attempt, queued_at in entries:
+                f.write(_to_spool_line(attempt, queued_at) + "\n")
+    metrics.incr("attempts_spooled_total", len(entries))
+    logger.warning("%s 条测试尝试写入数据库失败，已保存到 %s", len(entries), settings.ATTEMPT_SPOOL_PATH)
+
+
+class AttemptBuffer:
+    """进程内测试尝试缓冲，后台线程按条数或时间间隔批量写入（不含测试次数，计数已在请求中递增）"""
+
+    def __init__(self, max_records: int, flush_interval: float):
+        self.max_records = max(1, max_records)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        # 等待写入的 [(记录, 入队时间)]
+        self._pending = []
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread_pid = None
+
+    def add(self, attempt: TestAttempt):
+        """放入缓冲；达到条数上限时唤醒后台线程立即写入"""
+        with self._lock:
+            self._pending.append((attempt, timezone.now()))
+            depth = len(self._pending)
+        metrics.set_gauge("attempt_buffer_depth", depth)
+        self._ensure_thread()
+        if depth >= self.max_records:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        """按进程启动后台写入线程（gunicorn preload后fork出的子进程需要各自启动）"""
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            threading.Thread(target=self._run, name="attempt-buffer", daemon=True).start()
+            self._thread_pid = pid
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("测试尝试缓冲写入失败")
+            finally:
+                close_old_connections()
+
+    def flush(self) -> int:
+        """把缓冲中的记录写入数据库，失败时落盘；返回写入（或落盘）的条数"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            metrics.set_gauge("attempt_buffer_depth", 0)
+            if not batch:
+                return 0
+            started = time.monotonic()
+            try:
+                record_attempts([attempt for attempt, _ in batch], count=False)
+            except Exception:
+                logger.exception("测试尝试批量写入失败")
+                spool_attempts(batch)
+            else:
+                metrics.incr("attempts_flushed_total", len(batch))
+            finally:
+                metrics.observe("attempt_flush_seconds", time.monotonic() - started)
+            return len(batch)
+
+    def shutdown(self):
+        """进程正常退出时写入剩余记录（数据库不可用时落盘）"""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("退出时写入测试尝试失败")
+
+
+_buffer = AttemptBuffer(
+    max_records=settings.ATTEMPT_BUFFER_MAX_RECORDS,
+    flush_interval=settings.ATTEMPT_BUFFER_FLUSH_MS / 1000,
+)
+atexit.register(_buffer.shutdown)
+
+
+def get_attempt_buffer() -> AttemptBuffer:
+    return _buffer
+
+
+def _recent_key(task_id: int, student_id: int, digest: str) -> str:
+    return f"attempt:recent:{task_id}:{student_id}:{digest}"
+
+
+def save_attempt(attempt: TestAttempt):
+    """
+    保存测试尝试：开启写缓冲时同步递增测试次数、缓存本次结果，记录本身放入缓冲；
+    否则同步写入记录和计数
+    """
+    if not settings.ATTEMPT_WRITE_BEHIND:
+        record_attempts([attempt])
+        return
+    increment_attempt_counts({(attempt.task_id, attempt.student_id): 1})
+    cache.set(
+        _recent_key(attempt.task_id, attempt.student_id, attempt.code_hash),
+        attempt.test_results,
+        timeout=settings.ATTEMPT_RECENT_CACHE_SECONDS,
+    )
+    _buffer.add(attempt)
+
+
+def recent_attempt_results(task_id: int, student_id: int, digest: str) -> Optional[Dict]:
+    """缓存中学生同一份代码最近一次练习运行的结果（可能尚未写入数据库）"""
+    if not settings.ATTEMPT_WRITE_BEHIND:
+        return None
+    return cache.get(_recent_key(task_id, student_id, digest))
@@ -0,0 +1,50 @@
+"""测试尝试记录与（任务, 学生）测试次数计数"""
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AttemptCounter, TestAttempt
+
+
+def increment_attempt_counts(counts: Dict[Tuple[int, int], int]):
+    """
+    按 {(任务ID, 学生ID): 增量} 原子递增测试次数
+
+    已有计数行用 F() 在数据库中递增；没有的先插入，并发插入冲突时改为递增。
+    """
+    for (task_id, student_id), delta in counts.items():
+        counter = AttemptCounter.objects.filter(task_id=task_id, student_id=student_id)
+        if counter.update(count=F("count") + delta, updated_at=timezone.now()):
+            continue
+        try:
+            with transaction.atomic():
+                AttemptCounter.objects.create(task_id=task_id, student_id=student_id, count=delta)
+        except IntegrityError:
+            counter.update(count=F("count") + delta, updated_at=timezone.now())
+
+
+def record_attempts(attempts: Iterable[TestAttempt], count: bool = True):
+    """批量写入测试尝试，count为True时同时递增对应的测试次数（同一事务）"""
+    attempts = list(attempts)
+    with transaction.atomic():
+        TestAttempt.objects.bulk_create(attempts)
+        if count:
+            increment_attempt_counts(Counter((a.task_id, a.student_id) for a in attempts))
+
+
+def attempt_count(task, student) -> int:
+    """学生在任务上的测试次数"""
+    count = (
+        AttemptCounter.objects.filter(task=task, student=student)
+        .values_list("count", flat=True)
+        .first()
+    )
+    return count or 0
+
+
+def attempt_counts(task) -> Dict[int, int]:
+    """任务各学生的测试次数 {学生ID: 次数}"""
+    return dict(AttemptCounter.objects.filter(task=task).values_list("student_id", "count"))
@@ -0,0 +1,86 @@
+"""进程内后台任务执行器（推测执行、后台评测等非关键路径工作）"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 线程池名称 -> 线程数配置；任务作业（校准、生成用例等耗时较长）单独使用一个线程池，
+# 与推测执行等短任务互不阻塞
+POOL_WORKERS = {
+    "background": "BACKGROUND_WORKERS",
+    "jobs": "TASK_JOB_WORKERS",
+}
+
+# 线程池名称 -> (创建时的进程号, 线程池)
+_executors = {}
+_lock = threading.Lock()
+# 后台线程池中已提交尚未结束（排队或运行中）的任务数
+_pending = 0
+
+
+def _get_executor(pool: str = "background") -> ThreadPoolExecutor:
+    """按进程懒加载线程池（gunicorn preload后fork出的子进程需要各自创建）"""
+    pid = os.getpid()
+    entry = _executors.get(pool)
+    if entry is None or entry[0] != pid:
+        with _lock:
+            entry = _executors.get(pool)
+            if entry is None or entry[0] != pid:
+                entry = _executors[pool] = (pid, ThreadPoolExecutor(
+                    max_workers=getattr(settings, POOL_WORKERS[pool]),
+                    thread_name_prefix=pool,
+                ))
+    return entry[1]
+
+
+def _run(func, args, kwargs, counted: bool = False):
+    global _pending
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("后台任务执行失败: %s", getattr(func, "__name__", func))
+    finally:
+        close_old_connections()
+        if counted:
+            with _lock:
+                _pending -= 1
+                metrics.set_gauge("background_pending", _pending)
+
+
+def submit_background(func, *args, **kwargs):
+    """提交后台任务，异常只记录日志，不影响调用方"""
+    global _pending
+    executor = _get_executor()
+    with _lock:
+        _pending += 1
+        metrics.set_gauge("background_pending", _pending)
+    return executor.submit(_run, func, args, kwargs, True)
+
+
+def submit_to_pool(pool: str, func, *args, **kwargs):
+    """提交到指定线程池（见POOL_WORKERS），异常只记录日志"""
+    return _get_executor(pool).submit(_run, func, args, kwargs)
+
+
+def try_submit_background(func, *args, **kwargs) -> bool:
+    """
+    提交可丢弃的后台任务（如推测执行）：排队和运行中的任务数达到BACKGROUND_MAX_PENDING时直接丢弃
+
+    Returns:
+        是否已提交
+    """
+    with _lock:
+        full = _pending >= settings.BACKGROUND_MAX_PENDING
+    if full:
+        metrics.incr("background_dropped_total", task=getattr(func, "__name__", str(func)))
+        return False
+    submit_background(func, *args, **kwargs)
+    return True
@@ -0,0 +1,269 @@
+"""
+参考答案相关的后台作业
+
+- 校准资源限制：参考答案对每个测试用例执行若干次，统计CPU时间和内存的中位数、P95，
+  按配置的倍数设置各用例的限制（写入测试用例的覆盖字段）
+- 生成期望输出：参考答案执行全部测试用例，输出批量写回期望输出
+- 测量运行时间：参考答案在各用例上的运行时间中位数，供速度分档计分使用
+
+都通过批量执行接口提交，同时在执行的批数有上限。
+"""
+import math
+import statistics
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from tasks.models import TestCase
+
+from .limits import ExecutionLimits
+from .plan import compile_grading_plan, get_grading_plan, skeleton
+from .services import CodeExecutionService
+
+# 判题机允许的最小内存限制（KB）
+MIN_MEMORY_LIMIT = 2048
+
+
+def _to_number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """最近秩法求百分位数"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def reference_runs(
+    task,
+    test_cases,
+    plan,
+    repeat: int = 1,
+    limits: Optional[ExecutionLimits] = None,
+    compare: bool = True,
+    timing_repeat: Optional[int] = None,
+) -> List[Dict]:
+    """
+    参考答案对各测试用例的执行参数（每个用例重复repeat次，顺序排列），供execute_batch使用
+
+    compare为False时不与期望输出比较（只要没有报错即视为通过）；
+    timing_repeat不为空时使用计时模式，在一次执行中重复运行timing_repeat次（只对函数模式有效）
+    """
+    template_skeleton = skeleton(plan, task.language)
+    runs = []
+    for test_case in test_cases:
+        case_plan = plan["cases"][str(test_case.id)]
+        run = {
+            "source_code": task.reference_solution,
+            "language": task.language,
+            "stdin": test_case.input_data,
+            "expected_output": case_plan["expected"] if compare else None,
+            "comparison_mode": case_plan["mode"],
+            "float_tolerance": case_plan["tolerance"],
+            "limits": limits or ExecutionLimits(*case_plan["limits"]),
+            "solution_mode": task.solution_mode,
+            "function_name": task.function_name,
+            "template_code": task.template_code,
+            "arguments": case_plan["args"],
+            "template_skeleton": template_skeleton,
+        }
+        if timing_repeat and task.solution_mode == "function":
+            run["timing"] = {"runs": [case_plan["args"]], "repeat": timing_repeat, "echo": True}
+        runs.extend([run] * repeat)
+    return runs
+
+
+def calibrate_task(
+    task,
+    repeat: Optional[int] = None,
+    time_multiplier: Optional[float] = None,
+    memory_multiplier: Optional[float] = None,
+    progress=None,
+) -> Dict:
+    """
+    校准任务各测试用例的资源限制
+
+    参考答案在某个用例上执行失败或输出不正确时，该用例的限制保持不变并记入报告。
+
+    Returns:
+        {"repeat", "time_multiplier", "memory_multiplier", "calibrated", "failed",
+         "cases": [{"test_case_id", "cpu_median", "cpu_p95", "memory_median", "memory_p95",
+                    "cpu_time_limit", "wall_time_limit", "memory_limit"} 或 {"test_case_id", "error"}]}
+    """
+    if not task.reference_solution:
+        raise ValueError("任务没有设置参考答案")
+    repeat = max(1, repeat or settings.CALIBRATION_RUNS)
+    time_multiplier = time_multiplier or settings.CALIBRATION_TIME_MULTIPLIER
+    memory_multiplier = memory_multiplier or settings.CALIBRATION_MEMORY_MULTIPLIER
+
+    test_cases = list(task.test_cases.all())
+    plan = get_grading_plan(task, test_cases)
+    # 校准时使用宽松的上限执行，避免参考答案被当前（可能过紧的）限制中断
+    ceiling = ExecutionLimits(
+        cpu_time=settings.CALIBRATION_MAX_CPU_TIME,
+        wall_time=settings.CALIBRATION_MAX_CPU_TIME * 2,
+        memory=settings.CALIBRATION_MAX_MEMORY,
+        output_size=task.output_limit,
+    )
+    service = CodeExecutionService(class_id=task.class_obj_id, student_id=f"reference:{task.id}")
+    results = service.execute_batch(
+        reference_runs(task, test_cases, plan, repeat=repeat, limits=ceiling),
+        progress=progress,
+        concurrency=settings.REFERENCE_BATCH_CONCURRENCY,
+    )
+
+    cases = []
+    for position, test_case in enumerate(test_cases):
+        case_results = results[position * repeat:(position + 1) * repeat]
+        failed = next((r for r in case_results if not r.get("passed")), None)
+        if failed is not None:
+            cases.append({
+                "test_case_id": test_case.id,
+                "error": failed.get("error") or "参考答案输出与期望输出不一致",
+            })
+            continue
+
+        cpu = [_to_number(r.get("time_used")) or 0.0 for r in case_results]
+        memory = [_to_number(r.get("memory_used")) or 0.0 for r in case_results]
+        cpu_p95 = percentile(cpu, 0.95)
+        memory_p95 = percentile(memory, 0.95)
+        test_case.cpu_time_limit = round(max(settings.CALIBRATION_MIN_CPU_TIME, cpu_p95 * time_multiplier), 3)
+        # 运行时间还包括进程启动、IO等待，取CPU时间限制的2倍再加1秒
+        test_case.wall_time_limit = round(test_case.cpu_time_limit * 2 + 1, 3)
+        test_case.memory_limit = max(MIN_MEMORY_LIMIT, int(memory_p95 * memory_multiplier))
+        cases.append({
+            "test_case_id": test_case.id,
+            "cpu_median": statistics.median(cpu),
+            "cpu_p95": cpu_p95,
+            "memory_median": statistics.median(memory),
+            "memory_p95": memory_p95,
+            "cpu_time_limit": test_case.cpu_time_limit,
+            "wall_time_limit": test_case.wall_time_limit,
+            "memory_limit": test_case.memory_limit,
+        })
+
+    calibrated = [tc for tc, case in zip(test_cases, cases) if "error" not in case]
+    if calibrated:
+        TestCase.objects.bulk_update(calibrated, ["cpu_time_limit", "wall_time_limit", "memory_limit"])
+        compile_grading_plan(task)
+
+    return {
+        "repeat": repeat,
+        "time_multiplier": time_multiplier,
+        "memory_multiplier": memory_multiplier,
+        "calibrated": len(calibrated),
+        "failed": len(cases) - len(calibrated),
+        "cases": cases,
+    }
+
+
+def time_reference_solution(task, repeat: Optional[int] = None, progress=None) -> Dict:
+    """
+    测量参考答案在各测试用例上的运行时间，写入用例的reference_time
+
+    每个用例执行repeat次，取判题机统计的CPU时间中位数。函数模式与学生评测一样使用计时模式，
+    每次执行重复运行SPEED_TIMING_REPEAT次，使两边的CPU时间可比（见grading.case_credit）。
+    参考答案执行失败或输出不正确的用例保持不变并记入报告。
+
+    Returns:
+        {"repeat", "timed", "failed", "cases": [{"test_case_id", "reference_time"} 或 {"test_case_id", "error"}]}
+    """
+    if not task.reference_solution:
+        raise ValueError("任务没有设置参考答案")
+    repeat = max(1, repeat or settings.SPEED_TIMING_REPEAT)
+
+    test_cases = list(task.test_cases.all())
+    plan = get_grading_plan(task, test_cases)
+    service = CodeExecutionService(class_id=task.class_obj_id, student_id=f"reference:{task.id}")
+    results = service.execute_batch(
+        reference_runs(task, test_cases, plan, repeat=repeat, timing_repeat=settings.SPEED_TIMING_REPEAT),
+        progress=progress,
+        concurrency=settings.REFERENCE_BATCH_CONCURRENCY,
+    )
+
+    cases = []
+    measured = []
+    for position, test_case in enumerate(test_cases):
+        case_results = results[position * repeat:(position + 1) * repeat]
+        failed = next((r for r in case_results if not r.get("passed")), None)
+        if failed is not None:
+            cases.append({
+                "test_case_id": test_case.id,
+                "error": failed.get("error") or "参考答案输出与期望输出不一致",
+            })
+            continue
+        reference_time = statistics.median(_to_number(r.get("time_used")) or 0.0 for r in case_results)
+        test_case.reference_time = reference_time
+        measured.append(test_case)
+        cases.append({"test_case_id": test_case.id, "reference_time": reference_time})
+
+    if measured:
+        TestCase.objects.bulk_update(measured, ["reference_time"])
+
+    return {
+        "repeat": repeat,
+        "timed": len(measured),
+        "failed": len(cases) - len(measured),
+        "cases": cases,
+    }
+
+
+def fill_expected_outputs(task, targets, test_cases, progress=None):
+    """
+    参考答案执行targets中的用例，输出批量写回期望输出（不重新构建评测计划）
+
+    Returns:
+        (已更新的用例列表, [{"test_case_id", "error"}])
+    """
+    plan = get_grading_plan(task, test_cases)
+    service = CodeExecutionService(class_id=task.class_obj_id, student_id=f"reference:{task.id}")
+    results = service.execute_batch(
+        reference_runs(task, targets, plan, compare=False),
+        progress=progress,
+        concurrency=settings.REFERENCE_BATCH_CONCURRENCY,
+    )
+
+    updated = []
+    failures = []
+    for test_case, result in zip(targets, results):
+        if result.get("success") and result.get("passed"):
+            test_case.expected_output = result.get("stdout", "")
+            updated.append(test_case)
+        else:
+            failures.append({
+                "test_case_id": test_case.id,
+                "error": result.get("error") or (result.get("stderr") or "")[:500] or "执行失败",
+            })
+
+    if updated:
+        TestCase.objects.bulk_update(updated, ["expected_output"], batch_size=500)
+    return updated, failures
+
+
+def generate_expected_outputs(task, only_empty: bool = False, progress=None) -> Dict:
+    """
+    用参考答案的输出批量生成测试用例的期望输出
+
+    参考答案执行失败（编译错误、运行错误、超时等）的用例保持不变并记入报告。
+
+    Returns:
+        {"updated", "failed", "skipped", "failures": [{"test_case_id", "error"}]}
+    """
+    if not task.reference_solution:
+        raise ValueError("任务没有设置参考答案")
+
+    test_cases = list(task.test_cases.all())
+    targets = [tc for tc in test_cases if not (only_empty and tc.expected_output)]
+    updated, failures = fill_expected_outputs(task, targets, test_cases, progress=progress)
+    if updated:
+        compile_grading_plan(task)
+
+    return {
+        "updated": len(updated),
+        "failed": len(failures),
+        "skipped": len(test_cases) - len(targets),
+        "failures": failures,
+    }
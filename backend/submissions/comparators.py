@@ -0,0 +1,144 @@
+"""
+输出比较引擎
+
+各比较方式都按行/按词逐个比较，遇到第一个不一致即返回，不会把整个（可能数MB的）输出
+规范化后再比较。期望输出在保存任务时已按比较方式规范化（见normalize_expected）。
+"""
+import math
+import re
+from collections import Counter
+from typing import Iterator, Optional
+
+EXACT = "exact"
+WHITESPACE = "whitespace"
+FLOAT = "float"
+UNORDERED_LINES = "unordered_lines"
+TOKENS = "tokens"
+
+COMPARISON_MODES = [
+    (EXACT, "精确匹配（忽略末尾空白）"),
+    (WHITESPACE, "忽略空白差异"),
+    (FLOAT, "浮点数容差"),
+    (UNORDERED_LINES, "行顺序无关"),
+    (TOKENS, "按词比较"),
+]
+
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+_TOKEN_RE = re.compile(r"\S+")
+_WHITESPACE = " \t\r\n\f\v"
+
+
+def _content_end(text: str) -> int:
+    """去除末尾空白后的长度（不复制字符串）"""
+    end = len(text)
+    while end > 0 and text[end - 1] in _WHITESPACE:
+        end -= 1
+    return end
+
+
+def iter_lines(text: str, length: Optional[int] = None) -> Iterator[str]:
+    """逐行产生（不一次性split整个输出），length限定只处理前若干个字符"""
+    start = 0
+    length = len(text) if length is None else length
+    while start < length:
+        end = text.find("\n", start, length)
+        if end < 0:
+            end = length
+        yield text[start:end]
+        start = end + 1
+
+
+def iter_normalized_lines(text: str) -> Iterator[str]:
+    """逐行产生压缩空白后的行，忽略末尾的空行"""
+    for line in iter_lines(text, _content_end(text)):
+        yield " ".join(line.split())
+
+
+def iter_tokens(text: str) -> Iterator[str]:
+    for match in _TOKEN_RE.finditer(text):
+        yield match.group()
+
+
+def normalize_expected(expected: Optional[str], mode: str) -> str:
+    """保存时规范化期望输出（规范化后的期望输出与原期望输出比较结果相同）"""
+    if not expected:
+        return ""
+    if mode == WHITESPACE:
+        return "\n".join(iter_normalized_lines(expected))
+    if mode in (TOKENS, FLOAT):
+        return " ".join(iter_tokens(expected))
+    if mode == UNORDERED_LINES:
+        return "\n".join(sorted(iter_normalized_lines(expected)))
+    return expected[:_content_end(expected)]
+
+
+def _compare_exact(actual: str, expected: str) -> bool:
+    expected_end = _content_end(expected)
+    if _content_end(actual) != expected_end:
+        return False
+    # 保存时已规范化的期望输出没有末尾空白，无需切片复制
+    prefix = expected if expected_end == len(expected) else expected[:expected_end]
+    return actual.startswith(prefix)
+
+
+def _compare_sequences(actual_items: Iterator[str], expected_items: Iterator[str], equal) -> bool:
+    sentinel = object()
+    while True:
+        a = next(actual_items, sentinel)
+        e = next(expected_items, sentinel)
+        if a is sentinel or e is sentinel:
+            return a is e
+        if not equal(a, e):
+            return False
+
+
+def _float_equal(tolerance: float):
+    def equal(a: str, e: str) -> bool:
+        if a == e:
+            return True
+        try:
+            x = float(a)
+            y = float(e)
+        except ValueError:
+            return False
+        if math.isnan(x) or math.isnan(y):
+            return math.isnan(x) and math.isnan(y)
+        # 绝对误差或相对误差在容差内即视为相等
+        return abs(x - y) <= tolerance or abs(x - y) <= tolerance * max(abs(x), abs(y))
+    return equal
+
+
+def _compare_unordered(actual: str, expected: str) -> bool:
+    remaining = Counter(iter_normalized_lines(expected))
+    total = sum(remaining.values())
+    for line in iter_normalized_lines(actual):
+        if remaining[line] <= 0:
+            return False
+        remaining[line] -= 1
+        total -= 1
+    return total == 0
+
+
+def compare(actual: Optional[str], expected: Optional[str], mode: str = EXACT, tolerance: Optional[float] = None) -> bool:
+    """
+    比较实际输出和期望输出
+
+    Args:
+        actual: 程序输出
+        expected: 期望输出（原始或已按同一方式规范化的均可）
+        mode: 比较方式
+        tolerance: 浮点数容差（FLOAT方式）
+    """
+    actual = actual or ""
+    expected = expected or ""
+    if mode == WHITESPACE:
+        return _compare_sequences(iter_normalized_lines(actual), iter_normalized_lines(expected), str.__eq__)
+    if mode == TOKENS:
+        return _compare_sequences(iter_tokens(actual), iter_tokens(expected), str.__eq__)
+    if mode == FLOAT:
+        equal = _float_equal(DEFAULT_FLOAT_TOLERANCE if tolerance is None else tolerance)
+        return _compare_sequences(iter_tokens(actual), iter_tokens(expected), equal)
+    if mode == UNORDERED_LINES:
+        return _compare_unordered(actual, expected)
+    return _compare_exact(actual, expected)
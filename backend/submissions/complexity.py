@@ -0,0 +1,202 @@
+"""
+时间复杂度估算
+
+任务开启complexity_analysis后，学生提交全部用例通过时，在后台用生成脚本的
+generate_sized(n) 为 COMPLEXITY_SIZES 中的各个规模生成输入，测量学生代码的CPU时间
+（每个规模执行COMPLEXITY_REPEAT次取中位数），再用最小二乘法拟合各复杂度等级，
+结果写入提交的complexity_class等字段。
+
+- 函数模式：全部规模的输入放进一次执行（计时模式，见services.timed_payload），
+  由包装程序在进程内逐个调用并计时，不含进程启动和编译时间
+- 完整程序：每个规模、每次重复作为一次执行，通过批量执行接口提交，使用判题机统计的CPU时间
+
+估算结果只作参考，不计入成绩：函数模式的计时由学生进程自己测量并报告，学生代码与计时代码在同一个
+解释器中运行，可以伪造计时行或替换time模块，随机标记只能防止意外混淆。complexity_ok只提示是否
+满足任务的required_complexity，不能作为强制要求。
+"""
+import hashlib
+import logging
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from tasks.models import Task
+
+from .background import submit_background
+from .limits import ExecutionLimits
+from .models import Submission
+from .plan import parse_input_data
+from .services import CodeExecutionService
+from .stress import run_script
+
+logger = logging.getLogger(__name__)
+
+# 复杂度等级，由低到高
+COMPLEXITY_CLASSES = [value for value, _ in Task.COMPLEXITY_CHOICES]
+
+# 生成的输入按生成脚本和规模缓存，同一任务的提交共用
+SIZED_INPUTS_CACHE_SECONDS = 24 * 3600
+
+
+def _basis(sizes: np.ndarray) -> np.ndarray:
+    """各复杂度等级的基函数取值，形状为 (等级数, 规模数)"""
+    log_n = np.log2(np.maximum(sizes, 2))
+    return np.vstack([
+        np.ones_like(sizes),
+        log_n,
+        sizes,
+        sizes * log_n,
+        sizes ** 2,
+        sizes ** 3,
+    ])
+
+
+def fit_complexity(sizes: List[float], times: List[float]) -> Dict:
+    """
+    对每个复杂度等级拟合 t = a + b·f(n)，选出残差最小的等级
+
+    所有等级在一次矩阵运算中求闭式最小二乘解。b为负（耗时随规模减小），或拟合出的增长
+    不超过平均耗时的COMPLEXITY_RESIDUAL_TOLERANCE倍（测量噪声）时，该等级退化为常数模型；
+    残差不超过最小残差(1 + COMPLEXITY_RESIDUAL_TOLERANCE)倍的等级中取最简单的，避免测量噪声
+    把线性等级判成更高的等级。
+
+    Returns:
+        {"complexity", "residuals": {等级: 残差平方和（耗时按最大值归一化）}}
+    """
+    tolerance = settings.COMPLEXITY_RESIDUAL_TOLERANCE
+    n = np.asarray(sizes, dtype=float)
+    t = np.asarray(times, dtype=float)
+    if t.max() > 0:
+        t = t / t.max()
+    # 按最大值归一化，避免n³数值过大
+    basis = _basis(n)
+    basis = basis / basis.max(axis=1, keepdims=True)
+
+    means = basis.mean(axis=1)
+    centered = basis - means[:, None]
+    variance = (centered ** 2).sum(axis=1)
+    slopes = np.divide(
+        centered @ (t - t.mean()), variance,
+        out=np.zeros(len(basis)), where=variance > 0,
+    )
+    growth = slopes * (basis.max(axis=1) - basis.min(axis=1))
+    slopes[(slopes < 0) | (growth <= tolerance * t.mean())] = 0.0
+    intercepts = t.mean() - slopes * means
+    predicted = intercepts[:, None] + slopes[:, None] * basis
+    residuals = ((predicted - t) ** 2).sum(axis=1)
+
+    threshold = residuals.min() * (1 + tolerance) + 1e-12
+    best = int(np.argmax(residuals <= threshold))
+    return {
+        "complexity": COMPLEXITY_CLASSES[best],
+        "residuals": dict(zip(COMPLEXITY_CLASSES, residuals.round(6).tolist())),
+    }
+
+
+def meets_requirement(complexity: Optional[str], required: Optional[str]) -> Optional[bool]:
+    """估算的复杂度是否不高于要求的复杂度（任一方缺失时为None；仅供参考，见模块说明）"""
+    if not complexity or not required:
+        return None
+    return COMPLEXITY_CLASSES.index(complexity) <= COMPLEXITY_CLASSES.index(required)
+
+
+def sized_inputs(task) -> List[str]:
+    """用生成脚本的generate_sized(n)生成各规模的输入"""
+    sizes = [int(size) for size in settings.COMPLEXITY_SIZES]
+    digest = hashlib.sha256(f"{sizes}\0{task.generator_script}".encode("utf-8")).hexdigest()
+    key = f"complexity_inputs:{task.id}:{digest}"
+    inputs = cache.get(key)
+    if inputs is None:
+        inputs = run_script(task.generator_script, "generate_sized", sizes)
+        cache.set(key, inputs, SIZED_INPUTS_CACHE_SECONDS)
+    return inputs
+
+
+def measure(task, code_content: str, language: str, service: CodeExecutionService) -> Tuple[List[int], List[float]]:
+    """
+    测量代码在各规模输入上的CPU时间（秒，各次重复的中位数）
+
+    Raises:
+        ValueError: 生成输入失败或代码执行失败
+    """
+    sizes = [int(size) for size in settings.COMPLEXITY_SIZES]
+    inputs = sized_inputs(task)
+    repeat = max(1, settings.COMPLEXITY_REPEAT)
+    limit = settings.COMPLEXITY_CPU_TIME_LIMIT
+    common = {
+        "source_code": code_content,
+        "language": language,
+        "solution_mode": task.solution_mode,
+        "function_name": task.function_name,
+        "template_code": task.template_code,
+    }
+
+    if task.solution_mode == "function":
+        runs = [parse_input_data(input_data) for input_data in inputs]
+        result = service.execute_code(
+            **common,
+            arguments=runs[0],
+            limits=ExecutionLimits(limit, limit * 2, task.memory_limit, task.output_limit),
+            timing={"runs": runs, "repeat": repeat},
+        )
+        if not result.get("success"):
+            raise ValueError(result.get("error") or "执行失败")
+        if not result.get("timings"):
+            raise ValueError("该任务的包装程序不支持计时模式")
+        return sizes, [statistics.median(times) for times in result["timings"]]
+
+    # 完整程序：每次执行一个规模的一次重复，各次执行平分CPU时间上限
+    per_run = max(limit / (len(sizes) * repeat), 1.0)
+    limits = ExecutionLimits(per_run, per_run * 2 + 1, task.memory_limit, task.output_limit)
+    runs = [
+        {**common, "stdin": input_data, "limits": limits}
+        for input_data in inputs
+        for _ in range(repeat)
+    ]
+    results = service.execute_batch(runs)
+    times = []
+    for position in range(len(sizes)):
+        size_results = results[position * repeat:(position + 1) * repeat]
+        failed = next((r for r in size_results if not r.get("success")), None)
+        if failed is not None:
+            raise ValueError(failed.get("error") or "执行失败")
+        times.append(statistics.median(float(r.get("time_used") or 0) for r in size_results))
+    return sizes, times
+
+
+def estimate_submission_complexity(submission_id: int):
+    """估算提交代码的时间复杂度并写回提交（后台执行）"""
+    submission = Submission.objects.select_related("task").get(id=submission_id)
+    task = submission.task
+    # 低优先级执行，只使用空闲槽位，不影响正常评测
+    service = CodeExecutionService(class_id=task.class_obj_id, student_id=submission.student_id, low_priority=True)
+    try:
+        sizes, times = measure(task, submission.code_content, submission.language, service)
+    except ValueError as e:
+        logger.warning("提交 %s 时间复杂度估算失败: %s", submission.id, e)
+        Submission.objects.filter(id=submission.id, code_content=submission.code_content).update(
+            complexity_class=None,
+            complexity_timings={"error": str(e)[:500]},
+            complexity_ok=None,
+        )
+        return
+
+    fit = fit_complexity(sizes, times)
+    # 估算期间学生可能重新提交，只在代码未变时写回
+    Submission.objects.filter(id=submission.id, code_content=submission.code_content).update(
+        complexity_class=fit["complexity"],
+        complexity_timings={"sizes": sizes, "times": times, "residuals": fit["residuals"]},
+        complexity_ok=meets_requirement(fit["complexity"], task.required_complexity),
+    )
+
+
+def schedule_complexity_estimate(submission, all_passed: bool) -> bool:
+    """任务开启了复杂度估算且全部用例通过时，提交到后台估算；返回是否已提交"""
+    task = submission.task
+    if not (task.complexity_analysis and task.generator_script and all_passed):
+        return False
+    submit_background(estimate_submission_complexity, submission.id)
+    return True
@@ -0,0 +1,192 @@
+"""
+未通过用例的输出对比
+
+只逐行扫描到第一个不一致处，返回其前后若干行及行内首个不同字符附近的片段；扫描的字符数、
+每行显示的字符数都有上限，无论输出多大，计算量和返回内容的大小都是有界的。
+"""
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .comparators import (
+    DEFAULT_FLOAT_TOLERANCE,
+    EXACT,
+    FLOAT,
+    TOKENS,
+    UNORDERED_LINES,
+    WHITESPACE,
+    _content_end,
+    _float_equal,
+    iter_lines,
+)
+from .plan import case_fingerprint
+
+SAME = "same"
+ACTUAL = "actual"
+EXPECTED = "expected"
+
+
+def _line_equal(mode: str, tolerance: Optional[float]):
+    """与比较方式一致的逐行相等判断"""
+    if mode in (WHITESPACE, TOKENS, UNORDERED_LINES):
+        return lambda a, e: a.split() == e.split()
+    if mode == FLOAT:
+        equal = _float_equal(DEFAULT_FLOAT_TOLERANCE if tolerance is None else tolerance)
+
+        def float_line_equal(a: str, e: str) -> bool:
+            a_tokens = a.split()
+            e_tokens = e.split()
+            return len(a_tokens) == len(e_tokens) and all(map(equal, a_tokens, e_tokens))
+        return float_line_equal
+    return str.__eq__
+
+
+def _scan_lines(text: str, max_chars: int) -> Iterator[str]:
+    return iter_lines(text, min(_content_end(text), max_chars))
+
+
+def _clip(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars] + "…"
+
+
+def _common_prefix(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _char_diff(actual: str, expected: str, max_chars: int) -> Dict:
+    """行内首个不同字符附近的片段（窗口以不同处为中心，长度不超过max_chars）"""
+    column = _common_prefix(actual, expected)
+    start = max(0, column - max_chars // 2)
+    end = start + max_chars
+    return {
+        "column": column + 1,
+        "start": start + 1,
+        "actual": actual[start:end],
+        "expected": expected[start:end],
+        "head_truncated": start > 0,
+        "tail_truncated": len(actual) > end or len(expected) > end,
+    }
+
+
+def output_diff(
+    actual: Optional[str],
+    expected: Optional[str],
+    mode: str = EXACT,
+    tolerance: Optional[float] = None,
+    context: Optional[int] = None,
+    max_line_chars: Optional[int] = None,
+    max_scan_chars: Optional[int] = None,
+) -> Dict:
+    """
+    对比实际输出与期望输出
+
+    Returns:
+        {
+            "identical": 已扫描部分是否完全一致（扫描被截断且未发现不同时为None）,
+            "first_mismatch_line": 第一个不一致的行号（从1开始）,
+            "column": 该行第一个不同字符的列号（从1开始）,
+            "truncated": 是否因超过扫描上限而未扫描完,
+            "lines": [{"line", "type": same/actual/expected, "text"}],
+            "char_diff": 行内差异片段,
+        }
+    """
+    context = settings.OUTPUT_DIFF_CONTEXT_LINES if context is None else context
+    max_line_chars = settings.OUTPUT_DIFF_MAX_LINE_CHARS if max_line_chars is None else max_line_chars
+    max_scan_chars = settings.OUTPUT_DIFF_MAX_SCAN_CHARS if max_scan_chars is None else max_scan_chars
+    actual = actual or ""
+    expected = expected or ""
+    equal = _line_equal(mode, tolerance)
+
+    if mode == UNORDERED_LINES:
+        # 行顺序无关：排序后再逐行对比（排序的行数受扫描上限约束）
+        actual_lines = iter(sorted(" ".join(line.split()) for line in _scan_lines(actual, max_scan_chars)))
+        expected_lines = iter(sorted(" ".join(line.split()) for line in _scan_lines(expected, max_scan_chars)))
+    else:
+        actual_lines = _scan_lines(actual, max_scan_chars)
+        expected_lines = _scan_lines(expected, max_scan_chars)
+    truncated = max(_content_end(actual), _content_end(expected)) > max_scan_chars
+
+    before = deque(maxlen=context)
+    lines: List[Dict] = []
+    sentinel = object()
+    line_no = 0
+    mismatch = None
+    while True:
+        a = next(actual_lines, sentinel)
+        e = next(expected_lines, sentinel)
+        if a is sentinel and e is sentinel:
+            break
+        line_no += 1
+        if a is not sentinel and e is not sentinel and equal(a, e):
+            before.append({"line": line_no, "type": SAME, "text": _clip(a, max_line_chars)})
+            continue
+        mismatch = (line_no, "" if a is sentinel else a, "" if e is sentinel else e, a is sentinel, e is sentinel)
+        break
+
+    if mismatch is None:
+        return {
+            "identical": None if truncated else True,
+            "first_mismatch_line": None,
+            "column": None,
+            "truncated": truncated,
+            "lines": [],
+            "char_diff": None,
+        }
+
+    line_no, a, e, actual_ended, expected_ended = mismatch
+    lines.extend(before)
+    if not actual_ended:
+        lines.append({"line": line_no, "type": ACTUAL, "text": _clip(a, max_line_chars)})
+    if not expected_ended:
+        lines.append({"line": line_no, "type": EXPECTED, "text": _clip(e, max_line_chars)})
+
+    # 不一致处之后的若干行
+    for offset in range(1, context + 1):
+        a = next(actual_lines, sentinel)
+        e = next(expected_lines, sentinel)
+        if a is sentinel and e is sentinel:
+            break
+        if a is not sentinel and e is not sentinel and equal(a, e):
+            lines.append({"line": line_no + offset, "type": SAME, "text": _clip(a, max_line_chars)})
+            continue
+        if a is not sentinel:
+            lines.append({"line": line_no + offset, "type": ACTUAL, "text": _clip(a, max_line_chars)})
+        if e is not sentinel:
+            lines.append({"line": line_no + offset, "type": EXPECTED, "text": _clip(e, max_line_chars)})
+
+    char_diff = None if actual_ended or expected_ended else _char_diff(mismatch[1], mismatch[2], max_line_chars)
+    return {
+        "identical": False,
+        "first_mismatch_line": line_no,
+        "column": char_diff["column"] if char_diff else 1,
+        "truncated": truncated,
+        "lines": lines,
+        "char_diff": char_diff,
+    }
+
+
+def _cache_key(test_result) -> str:
+    # 用例的期望输出、比较方式修改后指纹变化，旧的对比结果自然失效
+    return f"output_diff:{test_result.id}:{case_fingerprint(test_result.test_case)}"
+
+
+def result_diff(test_result) -> Dict:
+    """测试结果的输出对比（首次请求时计算并缓存）"""
+    key = _cache_key(test_result)
+    diff = cache.get(key)
+    if diff is None:
+        test_case = test_result.test_case
+        diff = output_diff(
+            test_result.output,
+            test_case.expected_output,
+            test_case.comparison_mode,
+            test_case.float_tolerance,
+        )
+        cache.set(key, diff, timeout=settings.OUTPUT_DIFF_CACHE_SECONDS)
+    return diff
@@ -0,0 +1,570 @@
+"""评测流程辅助：测试用例排序、批量执行、计分、两阶段评测等"""
+import hashlib
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Submission, TestResult, TestAttempt
+from .services import CodeExecutionService, median_time
+from .plan import case_fingerprint, get_grading_plan, skeleton
+from .limits import ExecutionLimits
+from .attempt_buffer import recent_attempt_results
+from .admission import get_controller
+from .background import try_submit_background
+from .complexity import schedule_complexity_estimate
+from . import metrics
+
+
+def failure_rates(task) -> Dict[int, float]:
+    """
+    统计任务各测试用例的历史失败率
+
+    数据来自正式提交的TestResult和最近若干次TestAttempt，使用拉普拉斯平滑
+    （(失败+1)/(次数+2)），避免只跑过一两次的用例得到极端值。结果按任务缓存。
+    """
+    cache_key = f"grading:failure_rates:{task.id}"
+    rates = cache.get(cache_key)
+    if rates is not None:
+        return rates
+
+    totals: Dict[int, int] = {}
+    failures: Dict[int, int] = {}
+
+    rows = (
+        TestResult.objects.filter(test_case__task=task)
+        .values("test_case_id")
+        .annotate(total=Count("id"), failed=Count("id", filter=Q(passed=False)))
+    )
+    for row in rows:
+        totals[row["test_case_id"]] = row["total"]
+        failures[row["test_case_id"]] = row["failed"]
+
+    attempts = (
+        TestAttempt.objects.filter(task=task)
+        .order_by("-created_at")
+        .values_list("test_results", flat=True)[:settings.FAILURE_HISTORY_ATTEMPTS]
+    )
+    for attempt_results in attempts:
+        for item in (attempt_results or {}).get("results", []):
+            test_case_id = item.get("test_case_id")
+            if test_case_id is None or item.get("skipped"):
+                continue
+            totals[test_case_id] = totals.get(test_case_id, 0) + 1
+            if not item.get("passed", False):
+                failures[test_case_id] = failures.get(test_case_id, 0) + 1
+
+    rates = {
+        test_case_id: (failures.get(test_case_id, 0) + 1) / (total + 2)
+        for test_case_id, total in totals.items()
+    }
+    cache.set(cache_key, rates, timeout=settings.FAILURE_HISTORY_CACHE_SECONDS)
+    return rates
+
+
+def order_by_failure_history(task, test_cases) -> List:
+    """按历史失败率从高到低排序测试用例，失败率相同时保持原有顺序"""
+    rates = failure_rates(task)
+    # 没有历史数据的用例按先验失败率0.5处理
+    return sorted(test_cases, key=lambda tc: (-rates.get(tc.id, 0.5), tc.order, tc.id))
+
+
+def run_test_cases(
+    execution_service,
+    task,
+    test_cases,
+    code_content: str,
+    language: str,
+    fail_fast: bool = False,
+    known_results: Optional[Dict[int, Dict]] = None,
+) -> List[Tuple]:
+    """
+    依次执行测试用例
+
+    Args:
+        execution_service: CodeExecutionService实例
+        task: 任务
+        test_cases: 待执行的测试用例（按执行顺序）
+        code_content: 学生代码
+        language: 编程语言
+        fail_fast: 为True时遇到第一个未通过的用例（含编译错误、运行异常）即停止
+        known_results: 已有的同一代码的执行结果 {test_case_id: result}，命中的用例不再执行
+
+    速度分档计分的函数模式任务使用计时模式：每个用例在一次执行中重复运行SPEED_TIMING_REPEAT次，
+    输出第一次的返回值用于判断是否通过，分档使用判题机统计的整次执行的CPU时间（见case_credit），
+    用例的时间限制按重复次数放大（见services.run_limits）。
+
+    Returns:
+        [(test_case, result)]，未执行的用例不在列表中
+    """
+    test_cases = list(test_cases)
+    known_results = known_results or {}
+    if not test_cases:
+        return []
+    timed = is_speed_scored(task) and task.solution_mode == "function"
+    if timed:
+        # 没有计时数据的已通过结果无法分档，重新执行
+        known_results = {
+            test_case_id: result for test_case_id, result in known_results.items()
+            if result.get("timings") or not result.get("passed")
+        }
+    
+    # 全部用例都有现成结果时无需预检
+    if all(test_case.id in known_results for test_case in test_cases):
+        return [(test_case, known_results[test_case.id]) for test_case in test_cases]
+    
+    # 每次评测只加载一次评测计划，用例的参数、期望输出和模板骨架都已预先处理好
+    plan = get_grading_plan(task, test_cases)
+    template_skeleton = skeleton(plan, language)
+    
+    # 本地预检：语法/编译错误直接返回，不占用执行后端
+    preflight_error = execution_service.preflight(
+        source_code=code_content,
+        language=language,
+        stdin=test_cases[0].input_data,
+        solution_mode=task.solution_mode,
+        function_name=task.function_name,
+        template_code=task.template_code,
+        arguments=plan["cases"][str(test_cases[0].id)]["args"],
+        template_skeleton=template_skeleton,
+    )
+    if preflight_error:
+        failed_cases = test_cases[:1] if fail_fast else test_cases
+        metrics.incr("preflight_rejections_total", language=language)
+        metrics.incr("preflight_runs_saved_total", len(failed_cases), language=language)
+        return [(test_case, dict(preflight_error)) for test_case in failed_cases]
+    
+    executed = []
+    for test_case in test_cases:
+        if test_case.id in known_results:
+            executed.append((test_case, known_results[test_case.id]))
+            if fail_fast and not known_results[test_case.id].get("passed", False):
+                break
+            continue
+        case_plan = plan["cases"][str(test_case.id)]
+        result = execution_service.execute_code(
+            source_code=code_content,
+            language=language,
+            stdin=test_case.input_data,
+            expected_output=case_plan["expected"],
+            comparison_mode=case_plan["mode"],
+            float_tolerance=case_plan["tolerance"],
+            limits=ExecutionLimits(*case_plan["limits"]),
+            solution_mode=task.solution_mode,
+            function_name=task.function_name,
+            template_code=task.template_code,
+            arguments=case_plan["args"],
+            template_skeleton=template_skeleton,
+            timing={
+                "runs": [case_plan["args"]],
+                "repeat": settings.SPEED_TIMING_REPEAT,
+                "echo": True,
+            } if timed else None,
+        )
+        executed.append((test_case, result))
+        if fail_fast and not result.get("passed", False):
+            break
+    return executed
+
+
+def preflight_saved_runs(executed) -> int:
+    """统计被本地预检拦截、因而省下的远程执行次数"""
+    return sum(1 for _, result in executed if result.get("preflight"))
+
+
+def code_hash(code_content: str, language: str) -> str:
+    """代码内容哈希（同一语言下代码完全相同即视为同一份代码）"""
+    return hashlib.sha256(f"{language}\0{code_content}".encode("utf-8")).hexdigest()
+
+
+def test_case_fingerprint(test_case) -> str:
+    """测试用例版本指纹，输入或期望输出变化后旧的执行结果即失效"""
+    return case_fingerprint(test_case)
+
+
+def is_definitive(result: Dict) -> bool:
+    """
+    执行结果是否可复用
+
+    排队超时、网络异常等基础设施错误不能代表代码本身的结果，不可缓存复用。
+    """
+    return "passed" in result or "status_id" in result
+
+
+# ---- 复用最近一次练习运行的结果 ----
+
+def attempt_results(task, student, digest: str, test_cases) -> Dict[int, Dict]:
+    """
+    取出学生同一份代码最近一次练习运行中、用例版本未变的结果 {test_case_id: result}
+    """
+    # 刚运行过的练习可能还在写缓冲中，先取缓存中的结果
+    test_results = recent_attempt_results(task.id, student.id, digest)
+    if test_results is None:
+        attempt = (
+            TestAttempt.objects.filter(task=task, student=student, code_hash=digest)
+            .order_by("-created_at")
+            .only("test_results")
+            .first()
+        )
+        if attempt is None:
+            return {}
+        test_results = attempt.test_results
+
+    fingerprints = {tc.id: test_case_fingerprint(tc) for tc in test_cases}
+    reused = {}
+    for item in (test_results or {}).get("results", []):
+        test_case_id = item.get("test_case_id")
+        if (
+            test_case_id in fingerprints
+            and not item.get("skipped")
+            and item.get("test_case_hash") == fingerprints[test_case_id]
+            and is_definitive(item)
+        ):
+            reused[test_case_id] = item
+    if reused:
+        metrics.incr("attempt_reuse_hits_total", len(reused))
+    return reused
+
+
+# ---- 推测执行：练习全部通过后在后台预跑隐藏用例 ----
+
+def _speculative_key(task_id: int, digest: str, test_case) -> str:
+    return f"speculative:{task_id}:{digest}:{test_case.id}:{test_case_fingerprint(test_case)}"
+
+
+def _cached_speculative(task, digest: str, test_cases) -> Dict[int, Dict]:
+    keys = {_speculative_key(task.id, digest, tc): tc.id for tc in test_cases}
+    return {keys[key]: result for key, result in cache.get_many(list(keys)).items()}
+
+
+def speculative_results(task, digest: str, test_cases) -> Dict[int, Dict]:
+    """取出推测执行已完成的结果 {test_case_id: result}"""
+    found = _cached_speculative(task, digest, test_cases)
+    if found:
+        metrics.incr("speculative_hits_total", len(found))
+    return found
+
+
+def run_speculative_hidden_tests(task_id: int, student_id: int, code_content: str, language: str, scheduled_at: float):
+    """
+    后台任务：以低优先级执行隐藏用例，并把结果写入缓存
+
+    整个作业从提交（scheduled_at，time.time()）起共用SPECULATIVE_DEADLINE的时限，
+    在后台队列中等待过久或等不到执行槽位时放弃剩余用例。
+    """
+    from tasks.models import Task
+
+    remaining = settings.SPECULATIVE_DEADLINE - (time.time() - scheduled_at)
+    if remaining <= 0:
+        metrics.incr("speculative_expired_total")
+        return
+    deadline = time.monotonic() + remaining
+
+    task = Task.objects.select_related("class_obj").get(id=task_id)
+    digest = code_hash(code_content, language)
+    hidden_cases = list(task.test_cases.filter(is_hidden=True).order_by("order"))
+    done = _cached_speculative(task, digest, hidden_cases)
+    pending = [tc for tc in hidden_cases if tc.id not in done]
+    if not pending:
+        return
+
+    execution_service = CodeExecutionService(
+        class_id=task.class_obj_id,
+        student_id=student_id,
+        low_priority=True,
+        deadline=deadline,
+    )
+    for test_case, result in run_test_cases(execution_service, task, pending, code_content, language):
+        metrics.incr("speculative_runs_total")
+        if is_definitive(result):
+            cache.set(_speculative_key(task.id, digest, test_case), result, timeout=settings.SPECULATIVE_RESULT_TTL)
+
+
+def schedule_speculative_hidden_run(task, student, code_content: str, language: str) -> bool:
+    """
+    练习运行全部通过后，提交后台推测执行隐藏用例
+
+    同一任务同一份代码在结果有效期内只会推测执行一次。执行服务已有排队（准入控制预计等待时间大于0）
+    或本进程后台队列已满时不提交。
+    """
+    if not settings.SPECULATIVE_EXECUTION_ENABLED:
+        return False
+    if get_controller("execution").estimate_wait() > 0:
+        metrics.incr("speculative_skipped_total", reason="load")
+        return False
+    if not task.test_cases.filter(is_hidden=True).exists():
+        return False
+    digest = code_hash(code_content, language)
+    scheduled_key = f"speculative:scheduled:{task.id}:{digest}"
+    if not cache.add(scheduled_key, 1, timeout=settings.SPECULATIVE_RESULT_TTL):
+        return False
+    if not try_submit_background(
+        run_speculative_hidden_tests, task.id, student.id, code_content, language, time.time(),
+    ):
+        # 未提交时允许之后的练习运行重新尝试
+        cache.delete(scheduled_key)
+        return False
+    metrics.incr("speculative_scheduled_total")
+    return True
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _optional_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def telemetry(result: Dict) -> Dict:
+    """执行结果中除CPU时间外的资源与耗时数据（本地预检、复用等没有的项为None）"""
+    memory = _optional_float(result.get("memory_used"))
+    return {
+        "memory_used": int(memory) if memory is not None else None,
+        "wall_time": _optional_float(result.get("wall_time_used")),
+        "queue_time": _optional_float(result.get("queue_time")),
+        "latency": _optional_float(result.get("latency")),
+        "poll_count": result.get("poll_count"),
+    }
+
+
+def result_record(test_case, result: Dict) -> Dict:
+    """把执行结果转换为TestResult的字段"""
+    return {
+        "test_case": test_case,
+        "passed": result.get("passed", False),
+        "output": result.get("stdout", ""),
+        "error_message": result.get("stderr") or result.get("compile_output") or result.get("error", ""),
+        "execution_time": _to_float(result.get("time_used")),
+        "median_time": median_time(result),
+        **telemetry(result),
+    }
+
+
+def _submission_from_row(task, student, returning, row) -> Submission:
+    """与ORM查询相同的方式转换数据库返回值（日期时间、JSON等），构造提交对象"""
+    meta = Submission._meta
+    converted = []
+    for field, value in zip(returning, row):
+        column = field.get_col(meta.db_table)
+        for converter in connection.ops.get_db_converters(column) + column.get_db_converters(connection):
+            value = converter(value, column, connection)
+        converted.append(value)
+    submission = Submission.from_db(connection.alias, [f.attname for f in returning], converted)
+    submission.task = task
+    submission.student = student
+    return submission
+
+
+def upsert_submission(task, student, fields: Dict) -> Tuple[Submission, bool]:
+    """
+    插入或更新（任务, 学生）的提交，并返回该行
+
+    - PostgreSQL：一条 INSERT ... ON CONFLICT (task_id, student_id) DO UPDATE ... RETURNING，
+      按 xmax = 0 判断是否新插入
+    - SQLite 3.35+：先 UPDATE ... RETURNING（重新提交时一条语句完成），没有该行时再
+      INSERT ... ON CONFLICT DO NOTHING RETURNING；并发插入冲突时重新更新
+    - 其他数据库或不支持RETURNING的SQLite：退回update_or_create
+
+    同一学生并发提交时不会因唯一约束报错，后写入的覆盖先写入的。
+
+    Returns:
+        (提交, 是否新建)
+    """
+    if (
+        connection.vendor not in ("postgresql", "sqlite")
+        or not connection.features.can_return_columns_from_insert
+    ):
+        return Submission.objects.update_or_create(task=task, student=student, defaults=fields)
+
+    meta = Submission._meta
+    now = timezone.now()
+    values = {**fields, "task": task.pk, "student": student.pk, "submitted_at": now, "updated_at": now}
+    # 插入时未指定的字段使用模型默认值；已有的行只更新指定的字段和更新时间（同update_or_create）
+    insert_fields = [field for field in meta.concrete_fields if not field.primary_key]
+    update_fields = [meta.get_field(name) for name in (*fields, "updated_at")]
+    returning = meta.concrete_fields
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    task_column = quote(meta.get_field("task").column)
+    student_column = quote(meta.get_field("student").column)
+    returning_sql = ", ".join(quote(f.column) for f in returning)
+    insert_sql = (
+        f"INSERT INTO {table} ({', '.join(quote(f.column) for f in insert_fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(insert_fields))}) "
+        f"ON CONFLICT ({task_column}, {student_column}) "
+    )
+    insert_params = [
+        field.get_db_prep_save(values[field.name] if field.name in values else field.get_default(), connection)
+        for field in insert_fields
+    ]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                insert_sql
+                + f"DO UPDATE SET {', '.join(f'{quote(f.column)} = EXCLUDED.{quote(f.column)}' for f in update_fields)} "
+                + f"RETURNING {returning_sql}, (xmax = 0)",
+                insert_params,
+            )
+            *row, inserted = cursor.fetchone()
+            return _submission_from_row(task, student, returning, row), bool(inserted)
+
+        update_sql = (
+            f"UPDATE {table} SET {', '.join(f'{quote(f.column)} = %s' for f in update_fields)} "
+            f"WHERE {task_column} = %s AND {student_column} = %s RETURNING {returning_sql}"
+        )
+        update_params = [f.get_db_prep_save(values[f.name], connection) for f in update_fields] + [task.pk, student.pk]
+        while True:
+            cursor.execute(update_sql, update_params)
+            row = cursor.fetchone()
+            if row is not None:
+                return _submission_from_row(task, student, returning, row), False
+            cursor.execute(insert_sql + f"DO NOTHING RETURNING {returning_sql}", insert_params)
+            row = cursor.fetchone()
+            if row is not None:
+                return _submission_from_row(task, student, returning, row), True
+
+
+def save_submission(task, student, records: List[Dict], fields: Dict) -> Tuple[Submission, bool]:
+    """
+    保存提交及其测试结果
+
+    在一个事务中更新或创建提交、删除旧的测试结果并批量插入新的结果，
+    查询次数与用例数无关，中途失败时不会留下部分结果。
+
+    Args:
+        records: result_record生成的测试结果字段
+        fields: 提交的其他字段
+
+    Returns:
+        (提交, 是否新建)
+    """
+    with transaction.atomic():
+        submission, created = upsert_submission(task, student, fields)
+        if not created:
+            TestResult.objects.filter(submission=submission).delete()
+        TestResult.objects.bulk_create([TestResult(submission=submission, **record) for record in records])
+    return submission, created
+
+
+# ---- 速度分档计分 ----
+
+def is_speed_scored(task) -> bool:
+    return task.scoring_mode == "speed_tiers"
+
+
+def speed_tiers(task) -> List[Tuple[float, float]]:
+    """任务的速度档位 [(最大倍数, 得分比例)]，按倍数从小到大"""
+    return sorted((float(ratio), float(credit)) for ratio, credit in (task.speed_tiers or settings.SPEED_TIERS))
+
+
+def case_credit(task, test_case, passed: bool, execution_time: float) -> float:
+    """
+    用例的得分比例（0-1）
+
+    按通过计分时通过即为1；速度分档计分时按判题机统计的CPU时间相对参考答案的倍数落入的档位计分，
+    比所有档位都慢得0分。学生进程自己报告的计时（timings）可以被学生代码伪造，不用于计分；
+    函数模式在一次执行中重复运行SPEED_TIMING_REPEAT次，参考答案按同样方式测量。
+    参考答案尚未测量的用例通过即为1。
+    """
+    if not passed:
+        return 0.0
+    if not is_speed_scored(task) or test_case.reference_time is None:
+        return 1.0
+    resolution = settings.SPEED_TIME_RESOLUTION
+    ratio = max(execution_time or 0.0, resolution) / max(test_case.reference_time, resolution)
+    for max_ratio, credit in speed_tiers(task):
+        if ratio <= max_ratio:
+            return credit
+    return 0.0
+
+
+def compute_score(graded: Iterable[Tuple]) -> float:
+    """
+    按测试用例权重计分
+
+    Args:
+        graded: [(test_case, 得分比例)]，得分比例为是否通过或0-1之间的数（见case_credit）
+
+    Returns:
+        0-100的得分
+    """
+    total_weight = 0.0
+    passed_weight = 0.0
+    for test_case, credit in graded:
+        total_weight += test_case.weight
+        passed_weight += test_case.weight * float(credit)
+    if total_weight > 0:
+        return (passed_weight / total_weight) * 100
+    return 0.0
+
+
+def in_peak_window(task, now=None) -> bool:
+    """当前是否处于任务截止时间前后的高峰期"""
+    if not task.deadline:
+        return False
+    now = now or timezone.now()
+    window = timedelta(minutes=settings.DEFERRED_GRADING_WINDOW_MINUTES)
+    return task.deadline - window <= now <= task.deadline + window
+
+
+def use_two_phase_grading(task, now=None) -> bool:
+    """是否对本次提交启用两阶段评测（可见用例即时评测，隐藏用例延后）"""
+    return task.deferred_hidden_grading and in_peak_window(task, now)
+
+
+def finalize_submission(submission) -> bool:
+    """
+    对临时成绩的提交补跑隐藏用例并确定最终成绩
+
+    执行期间学生如果重新提交（代码变化）或已被其他进程确定，则放弃本次结果；
+    有用例因排队超时、网络异常等基础设施错误没有得到确定结果时也放弃，保留临时成绩，下次补跑时重试。
+
+    Returns:
+        是否完成了最终评分
+    """
+    task = submission.task
+    code_content = submission.code_content
+    hidden_cases = list(task.test_cases.filter(is_hidden=True).order_by("order"))
+    execution_service = CodeExecutionService(class_id=task.class_obj_id, student_id=submission.student_id)
+    executed = run_test_cases(execution_service, task, hidden_cases, code_content, submission.language)
+    if not all(is_definitive(result) for _, result in executed):
+        metrics.incr("deferred_submissions_retried_total")
+        return False
+
+    with transaction.atomic():
+        current = Submission.objects.select_for_update().get(pk=submission.pk)
+        if not current.provisional or current.code_content != code_content:
+            return False
+
+        current.test_results.filter(test_case__is_hidden=True).delete()
+        TestResult.objects.bulk_create([
+            TestResult(submission=current, **result_record(test_case, result))
+            for test_case, result in executed
+        ])
+
+        results = list(current.test_results.select_related("test_case"))
+        graded = [
+            (r.test_case, case_credit(task, r.test_case, r.passed, r.execution_time))
+            for r in results
+        ]
+        current.score = compute_score(graded)
+        current.provisional = False
+        current.finalized_at = timezone.now()
+        current.save(update_fields=["score", "provisional", "finalized_at", "updated_at"])
+    metrics.incr("deferred_submissions_finalized_total")
+    current.task = task
+    schedule_complexity_estimate(current, all(r.passed for r in results))
+    return True
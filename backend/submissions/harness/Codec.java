@@ -0,0 +1,474 @@
+
+// ---- 自动附加的参数编解码库：从标准输入读取JSON数组作为方法参数，返回值按统一格式输出 ----
+final class Codec {
+    private final String text;
+    private int pos;
+
+    private Codec(String text) {
+        this.text = text;
+    }
+
+    static String readInput(java.io.InputStream in) throws java.io.IOException {
+        return new String(in.readAllBytes(), java.nio.charset.StandardCharsets.UTF_8).trim();
+    }
+
+    @SuppressWarnings("unchecked")
+    static java.util.List<Object> args(String raw) {
+        java.util.List<Object> args = new java.util.ArrayList<>();
+        if (raw.isEmpty()) {
+            return args;
+        }
+        Object value = new Codec(raw).parseValue();
+        if (value instanceof java.util.List) {
+            return (java.util.List<Object>) value;
+        }
+        args.add(value);
+        return args;
+    }
+
+    static java.util.List<Object> readArgs(java.io.InputStream in) throws java.io.IOException {
+        return args(readInput(in));
+    }
+
+    // ---- 计时模式：标准输入为 {"__harness_timed__": [参数数组, ...], "repeat": 次数, "echo": 是否输出第一次的结果, "nonce": 随机标记} ----
+
+    static final String TIMED_KEY = "__harness_timed__";
+    static final String TIMINGS_MARKER = "__HARNESS_TIMINGS__";
+
+    interface Decoder {
+        Object[] decode(java.util.List<Object> args);
+    }
+
+    interface Invoker {
+        String invoke(Object[] args) throws Exception;
+    }
+
+    @SuppressWarnings("unchecked")
+    static java.util.Map<String, Object> timedPayload(String raw) {
+        if (!raw.startsWith("{")) {
+            return null;
+        }
+        Object value = new Codec(raw).parseValue();
+        if (value instanceof java.util.Map && ((java.util.Map<String, Object>) value).containsKey(TIMED_KEY)) {
+            return (java.util.Map<String, Object>) value;
+        }
+        return null;
+    }
+
+    /**
+     * 每组参数执行repeat次，只统计方法调用本身的CPU时间（秒），以TIMINGS_MARKER加随机标记开头的一行写到标准错误；
+     * 重复执行时丢弃方法自己的输出，输出只与执行一次时相同
+     */
+    @SuppressWarnings("unchecked")
+    static void runTimed(java.util.Map<String, Object> payload, Decoder decoder, Invoker invoker) throws Exception {
+        int repeat = Math.max(1, payload.get("repeat") == null ? 1 : toInt(payload.get("repeat")));
+        boolean echo = payload.get("echo") != null && toBoolean(payload.get("echo"));
+        java.lang.management.ThreadMXBean bean = java.lang.management.ManagementFactory.getThreadMXBean();
+        java.io.PrintStream stdout = System.out;
+        java.io.PrintStream quiet = new java.io.PrintStream(java.io.OutputStream.nullOutputStream());
+        java.util.List<Object> timings = new java.util.ArrayList<>();
+        for (Object raw : asList(payload.get(TIMED_KEY))) {
+            java.util.List<Object> samples = new java.util.ArrayList<>();
+            for (int i = 0; i < repeat; i++) {
+                // 每次重新解码参数，避免原地修改参数的代码影响后续执行
+                Object[] decoded = decoder.decode((java.util.List<Object>) asList(raw));
+                if (i > 0) {
+                    System.setOut(quiet);
+                }
+                String out;
+                try {
+                    long start = bean.getCurrentThreadCpuTime();
+                    out = invoker.invoke(decoded);
+                    samples.add((bean.getCurrentThreadCpuTime() - start) / 1e9);
+                } finally {
+                    System.setOut(stdout);
+                }
+                if (i == 0 && echo && out != null) {
+                    System.out.println(out);
+                }
+            }
+            timings.add(samples);
+        }
+        System.out.flush();
+        System.err.println();
+        Object nonce = payload.get("nonce");
+        System.err.println(TIMINGS_MARKER + (nonce == null ? "" : nonce) + format(timings));
+    }
+
+    static Object arg(java.util.List<Object> args, int index) {
+        return index < args.size() ? args.get(index) : null;
+    }
+
+    // ---- JSON解析 ----
+
+    private void skipWhitespace() {
+        while (pos < text.length() && Character.isWhitespace(text.charAt(pos))) {
+            pos++;
+        }
+    }
+
+    private Object parseValue() {
+        skipWhitespace();
+        char c = text.charAt(pos);
+        if (c == '[') {
+            java.util.List<Object> list = new java.util.ArrayList<>();
+            pos++;
+            skipWhitespace();
+            if (text.charAt(pos) == ']') {
+                pos++;
+                return list;
+            }
+            while (true) {
+                list.add(parseValue());
+                skipWhitespace();
+                if (text.charAt(pos++) == ']') {
+                    return list;
+                }
+            }
+        }
+        if (c == '{') {
+            java.util.Map<String, Object> map = new java.util.LinkedHashMap<>();
+            pos++;
+            skipWhitespace();
+            if (text.charAt(pos) == '}') {
+                pos++;
+                return map;
+            }
+            while (true) {
+                skipWhitespace();
+                String key = parseString();
+                skipWhitespace();
+                pos++; // ':'
+                map.put(key, parseValue());
+                skipWhitespace();
+                if (text.charAt(pos++) == '}') {
+                    return map;
+                }
+            }
+        }
+        if (c == '"') {
+            return parseString();
+        }
+        if (text.startsWith("true", pos)) {
+            pos += 4;
+            return Boolean.TRUE;
+        }
+        if (text.startsWith("false", pos)) {
+            pos += 5;
+            return Boolean.FALSE;
+        }
+        if (text.startsWith("null", pos)) {
+            pos += 4;
+            return null;
+        }
+        int start = pos;
+        while (pos < text.length() && "+-0123456789.eE".indexOf(text.charAt(pos)) >= 0) {
+            pos++;
+        }
+        String number = text.substring(start, pos);
+        if (number.contains(".") || number.contains("e") || number.contains("E")) {
+            return Double.parseDouble(number);
+        }
+        try {
+            return Long.parseLong(number);
+        } catch (NumberFormatException e) {
+            return Double.parseDouble(number);
+        }
+    }
+
+    private String parseString() {
+        StringBuilder sb = new StringBuilder();
+        pos++; // '"'
+        while (true) {
+            char c = text.charAt(pos++);
+            if (c == '"') {
+                return sb.toString();
+            }
+            if (c != '\\') {
+                sb.append(c);
+                continue;
+            }
+            char e = text.charAt(pos++);
+            switch (e) {
+                case 'n': sb.append('\n'); break;
+                case 't': sb.append('\t'); break;
+                case 'r': sb.append('\r'); break;
+                case 'b': sb.append('\b'); break;
+                case 'f': sb.append('\f'); break;
+                case 'u':
+                    sb.append((char) Integer.parseInt(text.substring(pos, pos + 4), 16));
+                    pos += 4;
+                    break;
+                default: sb.append(e);
+            }
+        }
+    }
+
+    // ---- 转换为参数类型（缺少的参数使用默认值） ----
+
+    static int toInt(Object v) {
+        return v == null ? 0 : ((Number) v).intValue();
+    }
+
+    static long toLong(Object v) {
+        return v == null ? 0L : ((Number) v).longValue();
+    }
+
+    static double toDouble(Object v) {
+        return v == null ? 0.0 : ((Number) v).doubleValue();
+    }
+
+    static boolean toBoolean(Object v) {
+        return v != null && (Boolean) v;
+    }
+
+    static String toStr(Object v) {
+        return v == null ? "" : v.toString();
+    }
+
+    static char toChar(Object v) {
+        String s = toStr(v);
+        return s.isEmpty() ? '\0' : s.charAt(0);
+    }
+
+    private static java.util.List<?> asList(Object v) {
+        if (v == null) {
+            return java.util.Collections.emptyList();
+        }
+        if (v instanceof java.util.List) {
+            return (java.util.List<?>) v;
+        }
+        return java.util.Collections.singletonList(v);
+    }
+
+    static int[] toIntArray(Object v) {
+        java.util.List<?> list = asList(v);
+        int[] result = new int[list.size()];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toInt(list.get(i));
+        }
+        return result;
+    }
+
+    static long[] toLongArray(Object v) {
+        java.util.List<?> list = asList(v);
+        long[] result = new long[list.size()];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toLong(list.get(i));
+        }
+        return result;
+    }
+
+    static double[] toDoubleArray(Object v) {
+        java.util.List<?> list = asList(v);
+        double[] result = new double[list.size()];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toDouble(list.get(i));
+        }
+        return result;
+    }
+
+    static boolean[] toBooleanArray(Object v) {
+        java.util.List<?> list = asList(v);
+        boolean[] result = new boolean[list.size()];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toBoolean(list.get(i));
+        }
+        return result;
+    }
+
+    static String[] toStrArray(Object v) {
+        java.util.List<?> list = asList(v);
+        String[] result = new String[list.size()];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toStr(list.get(i));
+        }
+        return result;
+    }
+
+    static char[] toCharArray(Object v) {
+        if (v instanceof String) {
+            return ((String) v).toCharArray();
+        }
+        java.util.List<?> list = asList(v);
+        char[] result = new char[list.size()];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toChar(list.get(i));
+        }
+        return result;
+    }
+
+    static int[][] toIntMatrix(Object v) {
+        java.util.List<?> rows = asList(v);
+        int[][] result = new int[rows.size()][];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toIntArray(rows.get(i));
+        }
+        return result;
+    }
+
+    static long[][] toLongMatrix(Object v) {
+        java.util.List<?> rows = asList(v);
+        long[][] result = new long[rows.size()][];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toLongArray(rows.get(i));
+        }
+        return result;
+    }
+
+    static double[][] toDoubleMatrix(Object v) {
+        java.util.List<?> rows = asList(v);
+        double[][] result = new double[rows.size()][];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toDoubleArray(rows.get(i));
+        }
+        return result;
+    }
+
+    static char[][] toCharMatrix(Object v) {
+        java.util.List<?> rows = asList(v);
+        char[][] result = new char[rows.size()][];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toCharArray(rows.get(i));
+        }
+        return result;
+    }
+
+    static String[][] toStrMatrix(Object v) {
+        java.util.List<?> rows = asList(v);
+        String[][] result = new String[rows.size()][];
+        for (int i = 0; i < result.length; i++) {
+            result[i] = toStrArray(rows.get(i));
+        }
+        return result;
+    }
+
+    static <T> java.util.List<T> toList(Object v, java.util.function.Function<Object, T> element) {
+        java.util.List<T> result = new java.util.ArrayList<>();
+        for (Object item : asList(v)) {
+            result.add(element.apply(item));
+        }
+        return result;
+    }
+
+    static <T> java.util.Set<T> toSet(Object v, java.util.function.Function<Object, T> element) {
+        java.util.Set<T> result = new java.util.LinkedHashSet<>();
+        for (Object item : asList(v)) {
+            result.add(element.apply(item));
+        }
+        return result;
+    }
+
+    // ---- 返回值编码：标量保持Java原生输出，数组/集合/映射输出为JSON（与Python的json.dumps格式一致） ----
+
+    static String format(Object value) {
+        if (value == null || value instanceof Number || value instanceof Boolean
+                || value instanceof Character || value instanceof CharSequence) {
+            return String.valueOf(value);
+        }
+        StringBuilder sb = new StringBuilder();
+        appendJson(sb, value);
+        return sb.toString();
+    }
+
+    static String formatDouble(double d) {
+        if (Double.isNaN(d)) {
+            return "NaN";
+        }
+        if (Double.isInfinite(d)) {
+            return d > 0 ? "Infinity" : "-Infinity";
+        }
+        if (d == 0.0) {
+            return 1.0 / d < 0 ? "-0.0" : "0.0";
+        }
+        String s = Double.toString(d);
+        int e = s.indexOf('E');
+        if (e < 0) {
+            return s;
+        }
+        int exponent = Integer.parseInt(s.substring(e + 1));
+        if (exponent >= -5 && exponent < 16) {
+            String plain = new java.math.BigDecimal(s).toPlainString();
+            return plain.contains(".") ? plain : plain + ".0";
+        }
+        // 与Python的repr一致：1e-05、1.5e+16
+        String mantissa = s.substring(0, e);
+        if (mantissa.endsWith(".0")) {
+            mantissa = mantissa.substring(0, mantissa.length() - 2);
+        }
+        String sign = exponent < 0 ? "-" : "+";
+        int abs = Math.abs(exponent);
+        return mantissa + "e" + sign + (abs < 10 ? "0" + abs : String.valueOf(abs));
+    }
+
+    private static void appendString(StringBuilder sb, String s) {
+        sb.append('"');
+        for (int i = 0; i < s.length(); i++) {
+            char c = s.charAt(i);
+            switch (c) {
+                case '"': sb.append("\\\""); break;
+                case '\\': sb.append("\\\\"); break;
+                case '\n': sb.append("\\n"); break;
+                case '\r': sb.append("\\r"); break;
+                case '\t': sb.append("\\t"); break;
+                case '\b': sb.append("\\b"); break;
+                case '\f': sb.append("\\f"); break;
+                default:
+                    if (c < 0x20) {
+                        sb.append(String.format("\\u%04x", (int) c));
+                    } else {
+                        sb.append(c);
+                    }
+            }
+        }
+        sb.append('"');
+    }
+
+    private static void appendJson(StringBuilder sb, Object value) {
+        if (value == null) {
+            sb.append("null");
+        } else if (value instanceof Double || value instanceof Float) {
+            sb.append(formatDouble(((Number) value).doubleValue()));
+        } else if (value instanceof Number || value instanceof Boolean) {
+            sb.append(value);
+        } else if (value instanceof CharSequence || value instanceof Character) {
+            appendString(sb, value.toString());
+        } else if (value instanceof java.util.Map) {
+            sb.append('{');
+            boolean first = true;
+            for (java.util.Map.Entry<?, ?> entry : ((java.util.Map<?, ?>) value).entrySet()) {
+                if (!first) {
+                    sb.append(", ");
+                }
+                first = false;
+                appendString(sb, String.valueOf(entry.getKey()));
+                sb.append(": ");
+                appendJson(sb, entry.getValue());
+            }
+            sb.append('}');
+        } else if (value instanceof Iterable) {
+            sb.append('[');
+            boolean first = true;
+            for (Object item : (Iterable<?>) value) {
+                if (!first) {
+                    sb.append(", ");
+                }
+                first = false;
+                appendJson(sb, item);
+            }
+            sb.append(']');
+        } else if (value.getClass().isArray()) {
+            sb.append('[');
+            int length = java.lang.reflect.Array.getLength(value);
+            for (int i = 0; i < length; i++) {
+                if (i > 0) {
+                    sb.append(", ");
+                }
+                appendJson(sb, java.lang.reflect.Array.get(value, i));
+            }
+            sb.append(']');
+        } else {
+            appendString(sb, value.toString());
+        }
+    }
+}
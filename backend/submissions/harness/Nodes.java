@@ -0,0 +1,108 @@
+
+// ---- 自动附加的链表/二叉树定义及编解码（LeetCode约定：链表为值数组，二叉树为层序数组，空节点为null） ----
+class ListNode {
+    int val;
+    ListNode next;
+
+    ListNode() {
+    }
+
+    ListNode(int val) {
+        this.val = val;
+    }
+
+    ListNode(int val, ListNode next) {
+        this.val = val;
+        this.next = next;
+    }
+}
+
+class TreeNode {
+    int val;
+    TreeNode left;
+    TreeNode right;
+
+    TreeNode() {
+    }
+
+    TreeNode(int val) {
+        this.val = val;
+    }
+
+    TreeNode(int val, TreeNode left, TreeNode right) {
+        this.val = val;
+        this.left = left;
+        this.right = right;
+    }
+}
+
+final class NodeCodec {
+    static ListNode toListNode(Object v) {
+        ListNode dummy = new ListNode();
+        ListNode tail = dummy;
+        if (v instanceof java.util.List) {
+            for (Object item : (java.util.List<?>) v) {
+                tail.next = new ListNode(Codec.toInt(item));
+                tail = tail.next;
+            }
+        }
+        return dummy.next;
+    }
+
+    static TreeNode toTreeNode(Object v) {
+        if (!(v instanceof java.util.List) || ((java.util.List<?>) v).isEmpty()) {
+            return null;
+        }
+        java.util.List<?> values = (java.util.List<?>) v;
+        if (values.get(0) == null) {
+            return null;
+        }
+        TreeNode root = new TreeNode(Codec.toInt(values.get(0)));
+        java.util.ArrayDeque<TreeNode> queue = new java.util.ArrayDeque<>();
+        queue.add(root);
+        int i = 1;
+        while (!queue.isEmpty() && i < values.size()) {
+            TreeNode node = queue.poll();
+            if (i < values.size() && values.get(i) != null) {
+                node.left = new TreeNode(Codec.toInt(values.get(i)));
+                queue.add(node.left);
+            }
+            i++;
+            if (i < values.size() && values.get(i) != null) {
+                node.right = new TreeNode(Codec.toInt(values.get(i)));
+                queue.add(node.right);
+            }
+            i++;
+        }
+        return root;
+    }
+
+    static java.util.List<Object> fromListNode(ListNode head) {
+        java.util.List<Object> values = new java.util.ArrayList<>();
+        for (ListNode node = head; node != null; node = node.next) {
+            values.add(node.val);
+        }
+        return values;
+    }
+
+    static java.util.List<Object> fromTreeNode(TreeNode root) {
+        java.util.List<Object> values = new java.util.ArrayList<>();
+        java.util.LinkedList<TreeNode> queue = new java.util.LinkedList<>();
+        queue.add(root);
+        while (!queue.isEmpty()) {
+            TreeNode node = queue.poll();
+            if (node == null) {
+                values.add(null);
+                continue;
+            }
+            values.add(node.val);
+            queue.add(node.left);
+            queue.add(node.right);
+        }
+        // 去掉末尾的空节点
+        while (!values.isEmpty() && values.get(values.size() - 1) == null) {
+            values.remove(values.size() - 1);
+        }
+        return values;
+    }
+}
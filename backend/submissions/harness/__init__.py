@@ -0,0 +1,11 @@
+"""评测harness的辅助库源码（参数解码等），随部署发布，每个进程只读取一次"""
+from functools import lru_cache
+from pathlib import Path
+
+HARNESS_DIR = Path(__file__).resolve().parent
+
+
+@lru_cache(maxsize=None)
+def load(name: str) -> str:
+    """读取辅助库源码"""
+    return (HARNESS_DIR / name).read_text(encoding="utf-8")
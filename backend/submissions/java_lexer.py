@@ -0,0 +1,70 @@
+"""轻量Java词法分析（用于本地预检和方法签名解析）"""
+import re
+from typing import Iterator, List, NamedTuple
+
+
+class JavaLexError(ValueError):
+    """词法错误（未闭合的字符串、注释等）"""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(message)
+        self.line = line
+
+
+class Token(NamedTuple):
+    kind: str  # ident / number / string / char / op
+    text: str
+    line: int
+    start: int  # 在源码中的起始偏移
+    end: int  # 在源码中的结束偏移
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<line_comment>//[^\n]*)
+    |(?P<block_comment>/\*.*?\*/)
+    |(?P<string>"(?:[^"\\\n]|\\.)*")
+    |(?P<char>'(?:[^'\\\n]|\\.)+')
+    |(?P<ident>[A-Za-z_$][\w$]*)
+    |(?P<number>\d[\w.]*|\.\d\w*)
+    |(?P<op>[{}()\[\];,.@<>?:=!~+\-*/&|^%])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_SKIPPED = {"ws", "line_comment", "block_comment"}
+
+
+def iter_tokens(source: str) -> Iterator[Token]:
+    """
+    逐个产生Token，跳过空白和注释
+
+    Raises:
+        JavaLexError: 遇到未闭合的字符串/字符/注释或非法字符
+    """
+    pos = 0
+    line = 1
+    length = len(source)
+    while pos < length:
+        match = _TOKEN_RE.match(source, pos)
+        if match is None:
+            if source.startswith("/*", pos):
+                raise JavaLexError("注释未闭合", line)
+            if source[pos] == '"':
+                raise JavaLexError("字符串未闭合", line)
+            if source[pos] == "'":
+                raise JavaLexError("字符字面量未闭合", line)
+            raise JavaLexError(f"非法字符: {source[pos]!r}", line)
+
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind not in _SKIPPED:
+            yield Token(kind, text, line, pos, match.end())
+        line += text.count("\n")
+        pos = match.end()
+
+
+def tokenize(source: str) -> List[Token]:
+    """返回全部Token列表"""
+    return list(iter_tokens(source))
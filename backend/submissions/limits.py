@@ -0,0 +1,75 @@
+"""执行资源限制：任务级限制，可由测试用例逐项覆盖"""
+from typing import Dict, NamedTuple, Optional
+
+from django.conf import settings
+
+
+class ExecutionLimits(NamedTuple):
+    cpu_time: float  # CPU时间（秒）
+    wall_time: float  # 墙钟时间（秒）
+    memory: int  # 内存（KB）
+    output_size: int  # 输出大小（KB）
+
+
+DEFAULT_LIMITS = ExecutionLimits(cpu_time=2.0, wall_time=5.0, memory=128000, output_size=1024)
+
+# 模型字段名与ExecutionLimits字段的对应关系（任务和测试用例上同名）
+LIMIT_FIELDS = {
+    "cpu_time": "cpu_time_limit",
+    "wall_time": "wall_time_limit",
+    "memory": "memory_limit",
+    "output_size": "output_limit",
+}
+
+
+def task_limits(task) -> ExecutionLimits:
+    return ExecutionLimits(*(
+        getattr(task, field, None) or getattr(DEFAULT_LIMITS, name)
+        for name, field in LIMIT_FIELDS.items()
+    ))
+
+
+def resolve_limits(task, test_case=None) -> ExecutionLimits:
+    """测试用例上设置了的限制覆盖任务级限制"""
+    limits = task_limits(task)
+    if test_case is None:
+        return limits
+    return ExecutionLimits(*(
+        getattr(test_case, field, None) or getattr(limits, name)
+        for name, field in LIMIT_FIELDS.items()
+    ))
+
+
+def timed_limits(limits: ExecutionLimits, invocations: int) -> ExecutionLimits:
+    """
+    计时模式的限制：一次执行中函数被调用invocations次，CPU时间按次数放大，
+    运行时间在原限制上加上多出的CPU时间（进程启动只有一次）；不超过判题机允许的上限
+    """
+    invocations = max(1, invocations)
+    cpu_time = max(limits.cpu_time, min(limits.cpu_time * invocations, settings.JUDGE0_MAX_CPU_TIME_LIMIT))
+    wall_time = max(
+        limits.wall_time,
+        min(limits.wall_time + cpu_time - limits.cpu_time, settings.JUDGE0_MAX_WALL_TIME_LIMIT),
+    )
+    return limits._replace(cpu_time=cpu_time, wall_time=max(wall_time, cpu_time))
+
+
+def judge0_limits(limits: ExecutionLimits) -> Dict:
+    """转换为Judge0提交参数（max_file_size同时限制标准输出大小）"""
+    return {
+        "cpu_time_limit": limits.cpu_time,
+        "wall_time_limit": limits.wall_time,
+        "memory_limit": limits.memory,
+        "max_file_size": limits.output_size,
+    }
+
+
+def execution_cost(limits: Optional[ExecutionLimits]) -> float:
+    """
+    按声明的限制估算一次执行的开销（以默认限制为1）
+
+    调度器据此推进虚拟时间，并限制同时运行的重任务数。
+    """
+    if limits is None:
+        return 1.0
+    return max(limits.cpu_time / DEFAULT_LIMITS.cpu_time, limits.memory / DEFAULT_LIMITS.memory)
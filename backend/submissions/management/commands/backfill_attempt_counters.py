@@ -0,0 +1,35 @@
+"""按测试尝试记录重新计算（任务, 学生）的测试次数"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from submissions.models import AttemptCounter, TestAttempt
+
+
+class Command(BaseCommand):
+    help = "用一次分组统计重新计算测试次数计数（上线计数表时或计数不一致时执行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--task", type=int, action="append", dest="task_ids", help="只处理指定任务（可重复）")
+        parser.add_argument("--batch-size", type=int, default=1000, help="每批写入的计数行数")
+
+    def handle(self, *args, **options):
+        attempts = TestAttempt.objects.all()
+        if options["task_ids"]:
+            attempts = attempts.filter(task_id__in=options["task_ids"])
+        grouped = attempts.order_by().values("task_id", "student_id").annotate(total=Count("id"))
+
+        counters = [
+            AttemptCounter(task_id=row["task_id"], student_id=row["student_id"], count=row["total"])
+            for row in grouped.iterator()
+        ]
+        # 统计和写入在同一事务中；已有的计数行按统计结果覆盖
+        with transaction.atomic():
+            AttemptCounter.objects.bulk_create(
+                counters,
+                batch_size=options["batch_size"],
+                update_conflicts=True,
+                unique_fields=["task", "student"],
+                update_fields=["count", "updated_at"],
+            )
+        self.stdout.write(self.style.SUCCESS(f"已写入 {len(counters)} 个测试次数计数"))
@@ -0,0 +1,79 @@
+"""代码包装微基准：对比每个用例都重新解析签名（冷缓存）与按代码缓存解析结果（热缓存）的耗时"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from submissions import services, signatures
+from submissions.services import CodeExecutionService
+
+SAMPLES = {
+    "python": (
+        "class Solution:\n"
+        "    def twoSum(self, nums, target):\n"
+        "        seen = {}\n"
+        "        for i, n in enumerate(nums):\n"
+        "            if target - n in seen:\n"
+        "                return [seen[target - n], i]\n"
+        "            seen[n] = i\n"
+        "        return []\n"
+    ),
+    "java": (
+        "public int[] twoSum(int[] nums, int target) {\n"
+        "    Map<Integer, Integer> seen = new HashMap<>();\n"
+        "    for (int i = 0; i < nums.length; i++) {\n"
+        "        if (seen.containsKey(target - nums[i])) {\n"
+        "            return new int[]{seen.get(target - nums[i]), i};\n"
+        "        }\n"
+        "        seen.put(nums[i], i);\n"
+        "    }\n"
+        "    return new int[0];\n"
+        "}\n"
+    ),
+}
+
+
+def _clear_caches():
+    for func in (
+        services._python_harness,
+        services._java_harness,
+        services._python_program,
+        services._java_program,
+        signatures.parse_python_functions,
+        signatures.parse_java_methods,
+    ):
+        func.cache_clear()
+
+
+class Command(BaseCommand):
+    help = "测量函数模式下代码包装（签名解析+生成调用代码）的耗时"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=200, help="模拟的测试用例数")
+        parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最好的一次）")
+
+    def _measure(self, service, language, code, inputs, cold: bool) -> float:
+        best = float("inf")
+        for _ in range(self.repeat):
+            _clear_caches()
+            started = time.perf_counter()
+            for input_data in inputs:
+                if cold:
+                    _clear_caches()
+                service.wrap_user_code(code, language, function_name="twoSum", input_data=input_data)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    def handle(self, *args, **options):
+        self.repeat = max(1, options["repeat"])
+        cases = max(1, options["cases"])
+        service = CodeExecutionService()
+        inputs = [f"[[{i}, {i + 1}, {i + 2}, {i + 3}], {2 * i + 1}]" for i in range(cases)]
+
+        for language, code in SAMPLES.items():
+            cold = self._measure(service, language, code, inputs, cold=True)
+            warm = self._measure(service, language, code, inputs, cold=False)
+            self.stdout.write(
+                f"{language:<7} {cases}个用例  每次都解析: {cold * 1000:.2f}ms "
+                f"({cold / cases * 1e6:.1f}µs/用例)  缓存解析结果: {warm * 1000:.2f}ms "
+                f"({warm / cases * 1e6:.1f}µs/用例)  加速 {cold / warm:.1f}x"
+            )
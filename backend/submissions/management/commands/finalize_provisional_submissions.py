@@ -0,0 +1,35 @@
+"""补跑临时成绩提交的隐藏用例并确定最终成绩（建议由cron在低峰期执行）"""
+from django.core.management.base import BaseCommand
+
+from submissions.grading import finalize_submission, in_peak_window
+from submissions.models import Submission
+
+
+class Command(BaseCommand):
+    help = "补跑临时成绩提交的隐藏测试用例，确定最终成绩"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=0, help="本次最多处理的提交数（0表示不限制）")
+        parser.add_argument("--force", action="store_true", help="忽略高峰期判断，立即处理所有临时成绩")
+
+    def handle(self, *args, **options):
+        submissions = (
+            Submission.objects.filter(provisional=True)
+            .select_related("task", "task__class_obj")
+            .order_by("updated_at")
+        )
+        if options["limit"]:
+            submissions = submissions[:options["limit"]]
+
+        finalized = skipped = 0
+        for submission in submissions:
+            # 仍处于截止时间高峰期的任务留到下次执行
+            if not options["force"] and in_peak_window(submission.task):
+                skipped += 1
+                continue
+            if finalize_submission(submission):
+                finalized += 1
+            else:
+                skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(f"已确定 {finalized} 个提交的最终成绩，跳过 {skipped} 个"))
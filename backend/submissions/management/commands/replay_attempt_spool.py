@@ -0,0 +1,67 @@
+"""把写缓冲落盘的测试尝试重新写入数据库"""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from submissions.attempt_buffer import SPOOL_FIELDS
+from submissions.attempts import record_attempts
+from submissions.models import TestAttempt
+
+
+class Command(BaseCommand):
+    help = "重新写入写缓冲落盘的测试尝试（数据库故障恢复后执行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="落盘文件路径（默认ATTEMPT_SPOOL_PATH）")
+        parser.add_argument("--batch-size", type=int, default=500, help="每批写入的记录数")
+
+    def _restore(self, path, processing, lines):
+        """把未写入的行追加回落盘文件（期间其他进程可能已写入新的落盘记录）"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.remove(processing)
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.ATTEMPT_SPOOL_PATH
+        if not os.path.exists(path):
+            self.stdout.write("没有需要重新写入的测试尝试")
+            return
+        # 先改名再读取，运行中的进程继续落盘时写入新文件，不会丢失或重复写入
+        processing = f"{path}.{os.getpid()}.replay"
+        os.replace(path, processing)
+
+        lines, attempts, created_at = [], [], []
+        with open(processing, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    attempts.append(TestAttempt(**{name: record[name] for name in SPOOL_FIELDS}))
+                    created_at.append(parse_datetime(record["created_at"]))
+                    lines.append(line if line.endswith("\n") else line + "\n")
+                except (ValueError, KeyError) as e:
+                    f.seek(0)
+                    self._restore(path, processing, f.readlines())
+                    raise CommandError(f"第 {number} 行格式错误: {e}")
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(attempts), batch_size):
+            batch = attempts[start:start + batch_size]
+            try:
+                # 测试次数在测试时已经递增，这里只写入记录
+                record_attempts(batch, count=False)
+            except Exception:
+                # 已写入的批次不再保留，未写入的放回落盘文件，下次继续
+                self._restore(path, processing, lines[start:])
+                raise
+            # created_at为auto_now_add，写入时被改成当前时间，恢复为原来的测试时间
+            for attempt, value in zip(batch, created_at[start:start + batch_size]):
+                attempt.created_at = value
+            TestAttempt.objects.bulk_update(batch, ["created_at"])
+
+        os.remove(processing)
+        self.stdout.write(self.style.SUCCESS(f"已重新写入 {len(attempts)} 条测试尝试"))
@@ -0,0 +1,78 @@
+"""
+进程内运行指标（计数器、仪表、汇总），可导出为Prometheus文本格式
+
+指标按gunicorn进程各自统计，一次抓取只反映处理该请求的进程；需要整个部署合计的数据
+（如准入控制的在途数和准入结果）记在共享缓存中，导出时作为shared传入。
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_lock = threading.Lock()
+_counters: Dict = {}
+_gauges: Dict = {}
+# key -> [count, sum, max]
+_summaries: Dict = {}
+
+
+def _key(name: str, labels: Dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def incr(name: str, value: float = 1, **labels):
+    """计数器累加"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels):
+    """设置仪表当前值"""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name: str, value: float, **labels):
+    """记录一次观测值（统计次数、总和、最大值）"""
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.setdefault(key, [0, 0.0, 0.0])
+        summary[0] += 1
+        summary[1] += value
+        summary[2] = max(summary[2], value)
+
+
+def _format(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{name}{{{inner}}}"
+
+
+def snapshot(shared: Optional[List[Tuple[str, Dict, float]]] = None) -> Dict:
+    """返回当前所有指标的字典快照（shared为 [(名称, 标签, 值)] 形式的共享指标）"""
+    with _lock:
+        return {
+            "shared": {_format(*_key(name, labels)): value for name, labels, value in shared or []},
+            "counters": {_format(*k): v for k, v in _counters.items()},
+            "gauges": {_format(*k): v for k, v in _gauges.items()},
+            "summaries": {
+                _format(*k): {"count": c, "sum": s, "max": m}
+                for k, (c, s, m) in _summaries.items()
+            },
+        }
+
+
+def render_prometheus(shared: Optional[List[Tuple[str, Dict, float]]] = None) -> str:
+    """按Prometheus文本格式导出（shared同snapshot）"""
+    lines = [f"{_format(*_key(name, labels))} {value}" for name, labels, value in shared or []]
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"{_format(name, labels)} {value}")
+        for (name, labels), value in sorted(_gauges.items()):
+            lines.append(f"{_format(name, labels)} {value}")
+        for (name, labels), (count, total, maximum) in sorted(_summaries.items()):
+            lines.append(f"{_format(name + '_count', labels)} {count}")
+            lines.append(f"{_format(name + '_sum', labels)} {total}")
+            lines.append(f"{_format(name + '_max', labels)} {maximum}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='finalized_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='成绩确定时间'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='provisional',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='临时成绩'),
+        ),
+    ]
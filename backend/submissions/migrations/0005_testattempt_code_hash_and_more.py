@@ -0,0 +1,22 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0004_submission_finalized_at_submission_provisional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testattempt',
+            name='code_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='代码哈希'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['task', 'student', 'code_hash', '-created_at'], name='test_attempt_code_lookup'),
+        ),
+    ]
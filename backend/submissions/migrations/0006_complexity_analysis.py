@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0005_testattempt_code_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='complexity_class',
+            field=models.CharField(blank=True, max_length=20, null=True, verbose_name='估算时间复杂度'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='complexity_ok',
+            field=models.BooleanField(blank=True, null=True, verbose_name='满足复杂度要求'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='complexity_timings',
+            field=models.JSONField(blank=True, null=True, verbose_name='复杂度测量数据'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0006_complexity_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='median_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='运行时间中位数（秒）'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0007_speed_tiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='latency',
+            field=models.FloatField(blank=True, null=True, verbose_name='端到端耗时（秒）'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='memory_used',
+            field=models.IntegerField(blank=True, null=True, verbose_name='内存（KB）'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='poll_count',
+            field=models.IntegerField(blank=True, null=True, verbose_name='轮询次数'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='queue_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='排队时间（秒）'),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='wall_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='运行时间（秒）'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['created_at'], name='test_attempt_created_at'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['created_at'], name='test_result_created_at'),
+        ),
+    ]
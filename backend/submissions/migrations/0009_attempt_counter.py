@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0012_speed_tiers'),
+        ('submissions', '0008_execution_telemetry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='测试次数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_counters', to=settings.AUTH_USER_MODEL, verbose_name='学生')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_counters', to='tasks.task', verbose_name='任务')),
+            ],
+            options={
+                'verbose_name': '测试次数',
+                'verbose_name_plural': '测试次数',
+                'db_table': 'attempt_counters',
+                'unique_together': {('task', 'student')},
+            },
+        ),
+    ]
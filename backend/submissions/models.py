@@ -25,6 +25,13 @@ class Submission(models.Model):
     score = models.FloatField(default=0.0, verbose_name="得分")
     test_count = models.IntegerField(default=0, verbose_name="测试次数")
     total_time = models.FloatField(default=0.0, verbose_name="总耗时（秒）")
+    # 两阶段评测：隐藏用例尚未评测时为临时成绩
+    provisional = models.BooleanField(default=False, db_index=True, verbose_name="临时成绩")
+    finalized_at = models.DateTimeField(null=True, blank=True, verbose_name="成绩确定时间")
+    # 时间复杂度估算（任务开启complexity_analysis时在后台填写）
+    complexity_class = models.CharField(max_length=20, null=True, blank=True, verbose_name="估算时间复杂度")
+    complexity_timings = models.JSONField(null=True, blank=True, verbose_name="复杂度测量数据")
+    complexity_ok = models.BooleanField(null=True, blank=True, verbose_name="满足复杂度要求")
     submitted_at = models.DateTimeField(auto_now_add=True, verbose_name="提交时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
     
@@ -58,12 +65,24 @@ class TestResult(models.Model):
     output = models.TextField(blank=True, null=True, verbose_name="输出")
     error_message = models.TextField(blank=True, null=True, verbose_name="错误信息")
     execution_time = models.FloatField(default=0.0, verbose_name="执行时间（秒）")
+    # 速度分档计分的任务：同一用例在一次执行中重复运行多次的运行时间中位数
+    median_time = models.FloatField(null=True, blank=True, verbose_name="运行时间中位数（秒）")
+    # 执行遥测（本地预检拦截等未实际执行的结果为空）
+    memory_used = models.IntegerField(null=True, blank=True, verbose_name="内存（KB）")
+    wall_time = models.FloatField(null=True, blank=True, verbose_name="运行时间（秒）")
+    queue_time = models.FloatField(null=True, blank=True, verbose_name="排队时间（秒）")
+    latency = models.FloatField(null=True, blank=True, verbose_name="端到端耗时（秒）")
+    poll_count = models.IntegerField(null=True, blank=True, verbose_name="轮询次数")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     
     class Meta:
         verbose_name = "测试结果"
         verbose_name_plural = "测试结果"
         db_table = "test_results"
+        indexes = [
+            # 按时间窗口汇总执行遥测
+            models.Index(fields=["created_at"], name="test_result_created_at"),
+        ]
     
     def __str__(self):
         return f"{self.submission} - Test Case {self.test_case.id} - {'通过' if self.passed else '失败'}"
@@ -85,6 +104,7 @@ class TestAttempt(models.Model):
         verbose_name="学生"
     )
     code_content = models.TextField(verbose_name="代码内容")
+    code_hash = models.CharField(max_length=64, blank=True, default="", verbose_name="代码哈希")
     language = models.CharField(max_length=10, verbose_name="编程语言")
     test_results = models.JSONField(default=dict, verbose_name="测试结果")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="测试时间")
@@ -94,6 +114,40 @@ class TestAttempt(models.Model):
         verbose_name_plural = "测试尝试"
         db_table = "test_attempts"
         ordering = ["-created_at"]
+        indexes = [
+            # 提交时查找同一份代码最近一次的练习结果
+            models.Index(fields=["task", "student", "code_hash", "-created_at"], name="test_attempt_code_lookup"),
+            # 按时间窗口汇总执行遥测
+            models.Index(fields=["created_at"], name="test_attempt_created_at"),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.task.title} - {self.created_at}"
+
+
+class AttemptCounter(models.Model):
+    """（任务, 学生）的测试次数计数，记录测试尝试时原子递增，避免每次统计都COUNT测试尝试表"""
+    
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name="attempt_counters",
+        verbose_name="任务"
+    )
+    student = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="attempt_counters",
+        verbose_name="学生"
+    )
+    count = models.IntegerField(default=0, verbose_name="测试次数")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    
+    class Meta:
+        verbose_name = "测试次数"
+        verbose_name_plural = "测试次数"
+        db_table = "attempt_counters"
+        unique_together = [["task", "student"]]
+    
+    def __str__(self):
+        return f"{self.student.username} - {self.task.title}: {self.count}"
@@ -0,0 +1,180 @@
+"""
+任务评测计划：在保存任务/测试用例时预先解析输入、规范化期望输出、拆分模板，
+评测时直接使用，不再对每个用例重复解析
+"""
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+from .comparators import normalize_expected
+from .limits import resolve_limits, task_limits
+from .signatures import java_template_skeleton, python_template_skeleton
+
+# 计划结构变化时递增，使已保存的旧计划失效
+PLAN_FORMAT = 3
+PLAN_CACHE_SECONDS = 3600
+
+
+def _parse_scalar(text: str):
+    try:
+        if '.' in text:
+            return float(text)
+        return int(text)
+    except ValueError:
+        return text
+
+
+def parse_input_data(input_data: str) -> List:
+    """解析输入数据，支持多种格式（JSON、多行、空格分隔、单个值）"""
+    if not input_data or not input_data.strip():
+        return []
+
+    # 尝试解析为JSON
+    try:
+        inputs = json.loads(input_data)
+        if isinstance(inputs, list):
+            return inputs
+        # 字典或单个值作为唯一参数
+        return [inputs]
+    except ValueError:
+        pass
+
+    # 尝试按行分割，多行输入逐行转换类型
+    lines = [line.strip() for line in input_data.strip().split('\n') if line.strip()]
+    if len(lines) > 1:
+        return [_parse_scalar(line) for line in lines]
+
+    # 单行输入，按空格分割
+    parts = input_data.strip().split()
+    if len(parts) > 1:
+        return [_parse_scalar(part) for part in parts]
+
+    # 单个值
+    return [_parse_scalar(input_data)]
+
+
+def output_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def case_fingerprint(test_case) -> str:
+    """测试用例版本指纹，输入、期望输出、比较方式或资源限制变化后对应的计划条目即失效"""
+    raw = (
+        f"{test_case.id}\0{test_case.input_data}\0{test_case.expected_output}"
+        f"\0{test_case.comparison_mode}\0{test_case.float_tolerance}"
+        f"\0{test_case.cpu_time_limit}\0{test_case.wall_time_limit}"
+        f"\0{test_case.memory_limit}\0{test_case.output_limit}"
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def task_fingerprint(task) -> str:
+    """任务中影响代码包装和资源限制的字段的指纹"""
+    raw = (
+        f"{PLAN_FORMAT}\0{task.language}\0{task.solution_mode}\0{task.function_name}\0{task.template_code}"
+        f"\0{tuple(task_limits(task))}"
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _templates(task) -> Dict:
+    """
+    各语言的模板骨架
+
+    任务未指定函数名时，函数名要从学生代码中检测，模板中要替换的函数无法预先确定，
+    此时不预先拆分（记为None），由执行时现场拆分。
+    """
+    if task.template_code and not task.function_name and "{{user_code}}" not in task.template_code:
+        return {"python": None, "java": None}
+    return {
+        "python": python_template_skeleton(task.template_code, task.function_name or "solve"),
+        "java": java_template_skeleton(task.template_code, task.function_name or "solution"),
+    }
+
+
+def build_grading_plan(task, test_cases=None) -> Dict:
+    """
+    构建评测计划
+
+    Returns:
+        {
+            "version": 计划整体版本哈希,
+            "task": 任务字段指纹,
+            "templates": {"python": 模板骨架, "java": 模板骨架},
+            "cases": {"<test_case_id>": {"fingerprint", "args", "expected"（按比较方式规范化）,
+                                         "expected_hash", "mode", "tolerance",
+                                         "limits"（任务限制与用例覆盖合并后的ExecutionLimits）}},
+        }
+    """
+    if test_cases is None:
+        test_cases = task.test_cases.all()
+
+    cases = {}
+    for test_case in test_cases:
+        expected = normalize_expected(test_case.expected_output, test_case.comparison_mode)
+        cases[str(test_case.id)] = {
+            "fingerprint": case_fingerprint(test_case),
+            "args": parse_input_data(test_case.input_data),
+            "expected": expected,
+            "expected_hash": output_hash(expected),
+            "mode": test_case.comparison_mode,
+            "tolerance": test_case.float_tolerance,
+            "limits": list(resolve_limits(task, test_case)),
+        }
+
+    task_hash = task_fingerprint(task)
+    raw = task_hash + "".join(sorted(case["fingerprint"] for case in cases.values()))
+    return {
+        "version": hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16],
+        "task": task_hash,
+        "templates": _templates(task),
+        "cases": cases,
+    }
+
+
+def _cache_key(task) -> str:
+    return f"grading_plan:{task.id}"
+
+
+def compile_grading_plan(task) -> Dict:
+    """构建并保存任务的评测计划（任务或测试用例保存后调用）"""
+    plan = build_grading_plan(task)
+    task.grading_plan = plan
+    task.save(update_fields=["grading_plan"])
+    cache.set(_cache_key(task), plan, timeout=PLAN_CACHE_SECONDS)
+    return plan
+
+
+def _is_current(plan: Optional[Dict], task, test_cases) -> bool:
+    if not plan or plan.get("task") != task_fingerprint(task):
+        return False
+    cases = plan.get("cases", {})
+    return all(
+        str(tc.id) in cases and cases[str(tc.id)]["fingerprint"] == case_fingerprint(tc)
+        for tc in test_cases
+    )
+
+
+def get_grading_plan(task, test_cases) -> Dict:
+    """
+    取出任务的评测计划，每次评测调用一次
+
+    依次使用缓存、任务上保存的计划；与本次要执行的用例不一致（如通过后台直接修改了用例）
+    时重新构建并保存。
+    """
+    test_cases = list(test_cases)
+    plan = cache.get(_cache_key(task))
+    if _is_current(plan, task, test_cases):
+        return plan
+    if _is_current(task.grading_plan, task, test_cases):
+        cache.set(_cache_key(task), task.grading_plan, timeout=PLAN_CACHE_SECONDS)
+        return task.grading_plan
+    return compile_grading_plan(task)
+
+
+def skeleton(plan: Dict, language: str):
+    """取出计划中某语言的模板骨架（JSON中的列表转换为可哈希的元组）"""
+    raw = plan["templates"].get(language.lower())
+    return tuple(raw) if raw is not None else None
@@ -0,0 +1,227 @@
+"""本地预检：在提交到执行后端之前做语法/编译检查"""
+import ast
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .java_lexer import JavaLexError, iter_tokens
+
+# Judge0上的Python版本为3.8，按3.8语法解析，避免本地更新的语法被误判为合法
+PYTHON_FEATURE_VERSION = (3, 8)
+
+_JAVAC_ERROR_RE = re.compile(r"^(?P<file>[\w$]+\.java):(?P<line>\d+): error: (?P<message>.*)$", re.MULTILINE)
+_PUBLIC_CLASS_RE = re.compile(r"public\s+(?:final\s+|abstract\s+)*class\s+(\w+)")
+
+# 运行时错误回溯中主程序的帧（Judge0把源码保存为script.py执行）
+_PYTHON_FRAME_RE = re.compile(r'File "(?P<file>(?:[^"]*/)?script\.py)", line (?P<line>\d+)')
+
+_BRACKET_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+
+def _user_line(wrapped_source: str, user_code: str, line: int) -> Tuple[int, bool]:
+    """
+    把包装后源码中的行号映射回学生代码的行号
+
+    Returns:
+        (行号, 是否位于学生代码内)
+    """
+    snippet = user_code.strip()
+    index = wrapped_source.find(snippet) if snippet else -1
+    if index < 0:
+        # 包装时重新缩进过（如Java方法体），按行内容在学生代码中唯一匹配
+        wrapped_lines = wrapped_source.split("\n")
+        if not 0 < line <= len(wrapped_lines):
+            return line, False
+        text = wrapped_lines[line - 1].strip()
+        matches = [i for i, l in enumerate(user_code.split("\n"), 1) if text and l.strip() == text]
+        if len(matches) == 1:
+            return matches[0], True
+        return line, False
+    # 学生代码去掉了开头空行，补回偏移
+    leading = user_code[:user_code.find(snippet)].count("\n")
+    offset = wrapped_source.count("\n", 0, index)
+    mapped = line - offset + leading
+    if leading < mapped <= leading + snippet.count("\n") + 1:
+        return mapped, True
+    return line, False
+
+
+def remap_python_traceback(stderr: str, wrapped_source: str, user_code: str) -> str:
+    """
+    把运行时错误回溯中主程序的行号映射回学生代码的行号
+
+    包装时编解码库放在学生代码前面，不映射时学生看到的行号都偏移了一百多行；
+    位于自动生成代码中的帧保持原样。
+    """
+    if not stderr or wrapped_source == user_code:
+        return stderr
+    mapped_lines = {}
+
+    def replace(match):
+        line = int(match.group("line"))
+        if line not in mapped_lines:
+            mapped_lines[line] = _user_line(wrapped_source, user_code, line)
+        mapped, in_user_code = mapped_lines[line]
+        if not in_user_code:
+            return match.group(0)
+        return f'File "{match.group("file")}", line {mapped}'
+
+    return _PYTHON_FRAME_RE.sub(replace, stderr)
+
+
+def _error_result(message: str, line: Optional[int]) -> Dict:
+    """构造与执行后端编译错误格式一致的结果"""
+    return {
+        "success": False,
+        "passed": False,
+        "stdout": "",
+        "stderr": "",
+        "compile_output": message,
+        "error": f"编译错误: {message[:200]}",
+        "time_used": "",
+        "memory_used": "",
+        "preflight": True,
+        "line": line,
+    }
+
+
+def _describe(message: str, wrapped_source: str, user_code: str, line: Optional[int]) -> Tuple[str, Optional[int]]:
+    if not line:
+        return message, None
+    mapped, in_user_code = _user_line(wrapped_source, user_code, line)
+    if in_user_code:
+        return f"第{mapped}行: {message}", mapped
+    return f"（自动生成的代码）第{line}行: {message}", None
+
+
+def check_python(wrapped_source: str, user_code: str) -> Optional[Dict]:
+    """Python语法与编译检查，无错误返回None"""
+    try:
+        ast.parse(wrapped_source, feature_version=PYTHON_FEATURE_VERSION)
+        compile(wrapped_source, "<main>", "exec", dont_inherit=True)
+    except SyntaxError as e:
+        message = f"{type(e).__name__}: {e.msg}"
+        if e.text:
+            message += f"\n    {e.text.rstrip()}"
+        return _error_result(*_describe(message, wrapped_source, user_code, e.lineno))
+    except (ValueError, RecursionError, MemoryError):
+        # 源码含空字节、嵌套过深等情况交给执行后端处理
+        return None
+    return None
+
+
+def _check_java_brackets(wrapped_source: str, user_code: str) -> Optional[Dict]:
+    """不依赖javac的轻量检查：词法错误与括号配对"""
+    stack = []
+    try:
+        for token in iter_tokens(wrapped_source):
+            if token.kind != "op":
+                continue
+            if token.text in "([{":
+                stack.append(token)
+            elif token.text in _BRACKET_PAIRS:
+                if not stack or stack[-1].text != _BRACKET_PAIRS[token.text]:
+                    return _error_result(*_describe(f"多余或不匹配的 '{token.text}'", wrapped_source, user_code, token.line))
+                stack.pop()
+    except JavaLexError as e:
+        return _error_result(*_describe(str(e), wrapped_source, user_code, e.line))
+
+    if stack:
+        token = stack[-1]
+        return _error_result(*_describe(f"'{token.text}' 未闭合", wrapped_source, user_code, token.line))
+    return None
+
+
+def _javac_path() -> Optional[str]:
+    if not settings.PREFLIGHT_USE_JAVAC:
+        return None
+    return shutil.which("javac")
+
+
+def _check_java_javac(javac: str, wrapped_source: str, user_code: str) -> Optional[Dict]:
+    """
+    调用本地javac编译
+
+    只有输出中能解析出明确的 "文件:行: error:" 时才判定为编译错误；
+    超时、javac不支持--release等情况视为无法判断，交给执行后端。
+    """
+    class_match = _PUBLIC_CLASS_RE.search(wrapped_source)
+    file_name = f"{class_match.group(1) if class_match else 'Main'}.java"
+
+    with tempfile.TemporaryDirectory(prefix="preflight_") as workdir:
+        path = os.path.join(workdir, file_name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(wrapped_source)
+        command = [javac, "-encoding", "UTF-8", "-nowarn", "-proc:none", "-d", workdir]
+        if settings.PREFLIGHT_JAVA_RELEASE:
+            command += ["--release", str(settings.PREFLIGHT_JAVA_RELEASE)]
+        try:
+            completed = subprocess.run(
+                command + [file_name],
+                cwd=workdir,
+                capture_output=True,
+                text=True,
+                timeout=settings.PREFLIGHT_JAVAC_TIMEOUT,
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+
+    if completed.returncode == 0:
+        return None
+    output = completed.stdout + completed.stderr
+    match = _JAVAC_ERROR_RE.search(output)
+    if not match:
+        return None
+    line = int(match.group("line"))
+    return _error_result(*_describe(match.group("message"), wrapped_source, user_code, line))
+
+
+# javac检查通过的缓存值（缓存中取不到时为None，需与之区分）
+_JAVAC_OK = "ok"
+
+
+def _check_java_javac_cached(javac: str, wrapped_source: str, user_code: str) -> Optional[Dict]:
+    """按源码哈希缓存javac的检查结果，同一份代码反复测试/提交时不再启动JVM"""
+    raw = f"{settings.PREFLIGHT_JAVA_RELEASE}\0{wrapped_source}\0{user_code}".encode("utf-8")
+    key = f"preflight:javac:{hashlib.sha256(raw).hexdigest()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return None if cached == _JAVAC_OK else cached
+    error = _check_java_javac(javac, wrapped_source, user_code)
+    cache.set(key, error or _JAVAC_OK, timeout=settings.PREFLIGHT_JAVAC_CACHE_SECONDS)
+    return error
+
+
+def check_java(wrapped_source: str, user_code: str) -> Optional[Dict]:
+    """
+    Java编译检查：默认只做轻量词法/括号检查
+
+    开启PREFLIGHT_USE_JAVAC且本地有javac时再用javac完整编译（在请求线程中启动JVM，
+    耗时较长，结果按源码缓存）。
+    """
+    error = _check_java_brackets(wrapped_source, user_code)
+    if error:
+        return error
+    javac = _javac_path()
+    if javac:
+        return _check_java_javac_cached(javac, wrapped_source, user_code)
+    return None
+
+
+def check_source(wrapped_source: str, user_code: str, language: str) -> Optional[Dict]:
+    """按语言做本地预检，发现错误时返回编译错误结果，否则返回None"""
+    if not settings.PREFLIGHT_ENABLED:
+        return None
+    language = language.lower()
+    if language == "python":
+        return check_python(wrapped_source, user_code)
+    if language == "java":
+        return check_java(wrapped_source, user_code)
+    return None
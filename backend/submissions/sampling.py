@@ -0,0 +1,131 @@
+"""快速反馈模式：对大型测试集做加权分层抽样，并估计通过率"""
+import hashlib
+import math
+import random
+from typing import Dict, List, Tuple
+
+# 95%置信区间对应的z值
+Z_95 = 1.96
+
+
+def sample_seed(task_id: int, student_id: int, digest: str) -> int:
+    """同一学生同一份代码得到相同的抽样结果"""
+    raw = f"{task_id}:{student_id}:{digest}".encode("utf-8")
+    return int(hashlib.sha256(raw).hexdigest()[:16], 16)
+
+
+def _weight(test_case) -> float:
+    return max(test_case.weight, 1e-6)
+
+
+def _build_strata(test_cases, strata_count: int) -> List[List]:
+    """按输入数据长度等分为若干层，使小/中/大规模输入都能被抽到"""
+    ordered = sorted(test_cases, key=lambda tc: (len(tc.input_data or ""), tc.order, tc.id))
+    strata_count = max(1, min(strata_count, len(ordered)))
+    size, extra = divmod(len(ordered), strata_count)
+    strata = []
+    start = 0
+    for i in range(strata_count):
+        end = start + size + (1 if i < extra else 0)
+        strata.append(ordered[start:end])
+        start = end
+    return strata
+
+
+def _allocate(strata: List[List], sample_size: int) -> List[int]:
+    """按各层权重比例分配样本量（最大余数法），总数不超过sample_size，样本量够用时每层至少1个"""
+    total_weight = sum(_weight(tc) for stratum in strata for tc in stratum)
+    quotas = [sample_size * sum(_weight(tc) for tc in stratum) / total_weight for stratum in strata]
+    allocation = [min(len(stratum), int(q)) for stratum, q in zip(strata, quotas)]
+
+    remaining = sample_size - sum(allocation)
+    # 先给没有分到的层各补1个（配额大的优先）
+    for i in sorted(range(len(strata)), key=lambda i: quotas[i], reverse=True):
+        if remaining <= 0:
+            break
+        if allocation[i] == 0 and strata[i]:
+            allocation[i] = 1
+            remaining -= 1
+    order = sorted(range(len(strata)), key=lambda i: quotas[i] - int(quotas[i]), reverse=True)
+    while remaining > 0:
+        progressed = False
+        for i in order:
+            if remaining <= 0:
+                break
+            if allocation[i] < len(strata[i]):
+                allocation[i] += 1
+                remaining -= 1
+                progressed = True
+        if not progressed:
+            break
+    return allocation
+
+
+def stratified_sample(test_cases, sample_size: int, seed: int, strata_count: int = 4) -> Tuple[List, List[Dict]]:
+    """
+    加权分层抽样
+
+    层内按权重做不放回加权抽样（Efraimidis-Spirakis：取 u^(1/w) 最大的若干个），
+    权重越大的用例越容易被抽中。
+
+    Returns:
+        (抽中的用例（按原顺序）, 各层信息 [{"cases": 层内全部用例, "sampled": 抽中用例}])
+    """
+    test_cases = list(test_cases)
+    rng = random.Random(seed)
+    sample_size = min(sample_size, len(test_cases))
+    # 层数不超过样本量，否则每层至少抽1个会超出请求的样本量
+    strata = _build_strata(test_cases, min(strata_count, max(1, sample_size)))
+    allocation = _allocate(strata, sample_size)
+
+    layers = []
+    sampled_ids = set()
+    for stratum, n in zip(strata, allocation):
+        keyed = sorted(stratum, key=lambda tc: rng.random() ** (1.0 / _weight(tc)), reverse=True)
+        chosen = keyed[:n]
+        sampled_ids.update(tc.id for tc in chosen)
+        layers.append({"cases": stratum, "sampled": chosen})
+
+    sample = [tc for tc in sorted(test_cases, key=lambda tc: (tc.order, tc.id)) if tc.id in sampled_ids]
+    return sample, layers
+
+
+def estimate_pass_rate(layers: List[Dict], passed: Dict[int, bool]) -> Dict:
+    """
+    根据抽样结果估计按权重计的整体通过率及95%置信区间
+
+    各层按层权重占比加权合并；方差使用有限总体校正，层内全部抽中时该层无抽样误差。
+    为避免样本全部通过/全部失败时方差为0，方差计算中对通过率做 (x+0.5)/(n+1) 平滑。
+
+    Args:
+        layers: stratified_sample返回的各层信息
+        passed: {test_case_id: 是否通过}，未执行（如快速失败跳过）的用例不计入，
+            对应层按已覆盖的层重新归一
+    """
+    total_weight = sum(_weight(tc) for layer in layers for tc in layer["cases"])
+    estimate = 0.0
+    variance = 0.0
+    covered = 0.0
+    for layer in layers:
+        observed = [passed[tc.id] for tc in layer["sampled"] if tc.id in passed]
+        if not observed:
+            continue
+        share = sum(_weight(tc) for tc in layer["cases"]) / total_weight
+        covered += share
+        n = len(observed)
+        population = len(layer["cases"])
+        successes = sum(1 for p in observed if p)
+        estimate += share * successes / n
+        smoothed = (successes + 0.5) / (n + 1)
+        fpc = 1 - n / population
+        variance += share ** 2 * smoothed * (1 - smoothed) / n * fpc
+
+    # 某些层没有执行结果时，按已覆盖的层重新归一
+    if covered > 0:
+        estimate /= covered
+        variance /= covered ** 2
+    margin = Z_95 * math.sqrt(variance)
+    return {
+        "estimated_pass_rate": round(estimate, 4),
+        "confidence_interval": [round(max(0.0, estimate - margin), 4), round(min(1.0, estimate + margin), 4)],
+    }
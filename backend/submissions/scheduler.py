@@ -0,0 +1,323 @@
+"""代码执行调度：按班级、学生两级加权公平排队"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+
+class SchedulerTimeout(Exception):
+    """等待执行槽位超时"""
+
+
+class _Flow:
+    """一个排队流（班级或学生），记录虚拟时间和在途任务数"""
+
+    __slots__ = ("key", "weight", "vtime", "running", "waiting")
+
+    def __init__(self, key, weight: float):
+        self.key = key
+        self.weight = weight
+        self.vtime = 0.0
+        self.running = 0
+        self.waiting = 0
+
+
+class _Ticket:
+    """一次执行请求的排队凭证"""
+
+    __slots__ = ("class_key", "student_key", "cost", "heavy", "low_priority", "granted", "enqueued_at")
+
+    def __init__(self, class_key, student_key, cost: float, low_priority: bool = False, heavy: bool = False):
+        self.class_key = class_key
+        self.student_key = student_key
+        self.cost = cost
+        self.heavy = heavy
+        self.low_priority = low_priority
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class FairShareScheduler:
+    """
+    两级加权公平排队调度器
+
+    第一级在班级之间按权重分配执行槽位，第二级在班级内部按学生分配。
+    每个流维护虚拟时间（已获得的服务量/权重），每次空出槽位时选择虚拟时间最小的
+    班级，再选择该班级中虚拟时间最小且未超过并发上限的学生，学生内部先来先服务。
+    新加入（或空闲后重新加入）的流从当前最小虚拟时间开始计算，不能攒积分，
+    因此任何班级/学生的等待时间都有上界。
+
+    低优先级任务（如推测执行）单独排队，只在没有普通任务等待时才使用空闲槽位，
+    且同时运行的数量受 max_low_priority 限制。
+
+    开销不小于 heavy_cost 的任务（资源限制较大）为重任务，同时运行的重任务数受
+    max_heavy 限制，避免少数重任务长时间占满槽位；轮到的重任务超限时先调度其他学生的任务。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_per_student: int = 2,
+        class_weights: Optional[Dict] = None,
+        default_class_weight: float = 1.0,
+        default_student_weight: float = 1.0,
+        max_low_priority: int = 1,
+        heavy_cost: float = 2.5,
+        max_heavy: Optional[int] = None,
+    ):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_per_student = max(1, int(max_per_student))
+        self.class_weights = {str(k): float(v) for k, v in (class_weights or {}).items()}
+        self.default_class_weight = default_class_weight
+        self.default_student_weight = default_student_weight
+        self.max_low_priority = max(0, int(max_low_priority))
+        self.heavy_cost = float(heavy_cost)
+        # 未指定时为总并发数的一半
+        self.max_heavy = max(1, int(max_heavy) if max_heavy is not None else self.max_concurrency // 2)
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._running = 0
+        self._classes: Dict = {}
+        # (class_key, student_key) -> _Flow
+        self._students: Dict = {}
+        # class_key -> {student_key: deque[_Ticket]}
+        self._queues: Dict = {}
+        self._low_queue = deque()
+        self._low_running = 0
+        self._heavy_running = 0
+
+    # ---- 状态查询 ----
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(q) for class_queues in self._queues.values() for q in class_queues.values()) + len(self._low_queue)
+
+    # ---- 内部实现 ----
+
+    def _admissible(self, ticket: _Ticket) -> bool:
+        return not ticket.heavy or self._heavy_running < self.max_heavy
+
+    def _class_weight(self, class_key) -> float:
+        return self.class_weights.get(str(class_key), self.default_class_weight)
+
+    @staticmethod
+    def _catch_up(flow: _Flow, peers):
+        """空闲流重新加入时把虚拟时间拉到活跃同级流的最小值，避免攒积分"""
+        active = [f.vtime for f in peers if f is not flow and (f.running or f.waiting)]
+        if active:
+            flow.vtime = max(flow.vtime, min(active))
+
+    def _activate_class(self, class_key) -> _Flow:
+        flow = self._classes.get(class_key)
+        if flow is None:
+            flow = self._classes[class_key] = _Flow(class_key, self._class_weight(class_key))
+        if not flow.running and not flow.waiting:
+            self._catch_up(flow, self._classes.values())
+        return flow
+
+    def _activate_student(self, class_key, student_key) -> _Flow:
+        flow = self._students.get((class_key, student_key))
+        if flow is None:
+            flow = self._students[(class_key, student_key)] = _Flow(student_key, self.default_student_weight)
+        if not flow.running and not flow.waiting:
+            self._catch_up(flow, (f for (ck, _), f in self._students.items() if ck == class_key))
+        return flow
+
+    def _forget_idle(self, class_key, student_key):
+        """回收既无等待也无运行任务的学生流、班级流，避免字典无限增长（重新加入时从活跃流的最小虚拟时间开始）"""
+        student_flow = self._students.get((class_key, student_key))
+        if student_flow and not student_flow.running and not student_flow.waiting:
+            del self._students[(class_key, student_key)]
+        class_flow = self._classes.get(class_key)
+        if class_flow and not class_flow.running and not class_flow.waiting:
+            del self._classes[class_key]
+
+    def _pick(self):
+        """选出下一个应获得槽位的（班级流, 学生流）"""
+        for class_flow in sorted(
+            (f for f in self._classes.values() if f.waiting),
+            key=lambda f: f.vtime,
+        ):
+            candidates = [
+                self._students[(class_flow.key, student_key)]
+                for student_key, queue in self._queues.get(class_flow.key, {}).items()
+                if queue
+                and self._students[(class_flow.key, student_key)].running < self.max_per_student
+                and self._admissible(queue[0])
+            ]
+            if candidates:
+                return class_flow, min(candidates, key=lambda f: f.vtime)
+        return None
+
+    def _dispatch(self):
+        """在持锁状态下尽可能多地发放槽位"""
+        granted = False
+        while self._running < self.max_concurrency:
+            picked = self._pick()
+            if picked is None:
+                break
+
+            class_flow, student_flow = picked
+            class_queues = self._queues[class_flow.key]
+            ticket = class_queues[student_flow.key].popleft()
+            self._drop_empty_queue(class_flow.key, student_flow.key)
+
+            ticket.granted = True
+            self._running += 1
+            self._heavy_running += ticket.heavy
+            class_flow.waiting -= 1
+            class_flow.running += 1
+            student_flow.waiting -= 1
+            student_flow.running += 1
+            class_flow.vtime += ticket.cost / class_flow.weight
+            student_flow.vtime += ticket.cost / student_flow.weight
+            granted = True
+
+        # 没有普通任务等待时，空闲槽位分给低优先级任务
+        has_normal_waiting = any(f.waiting for f in self._classes.values())
+        while (
+            not has_normal_waiting
+            and self._low_queue
+            and self._running < self.max_concurrency
+            and self._low_running < self.max_low_priority
+            and self._admissible(self._low_queue[0])
+        ):
+            ticket = self._low_queue.popleft()
+            ticket.granted = True
+            self._running += 1
+            self._heavy_running += ticket.heavy
+            self._low_running += 1
+            granted = True
+
+        if granted:
+            self._cond.notify_all()
+
+    def _drop_empty_queue(self, class_key, student_key):
+        class_queues = self._queues.get(class_key)
+        if class_queues is not None and not class_queues.get(student_key):
+            class_queues.pop(student_key, None)
+            if not class_queues:
+                del self._queues[class_key]
+
+    # ---- 对外接口 ----
+
+    def _acquire_low_priority(self, ticket: _Ticket, deadline: Optional[float]) -> _Ticket:
+        with self._cond:
+            self._low_queue.append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._low_queue.remove(ticket)
+                    raise SchedulerTimeout("等待执行槽位超时")
+                self._cond.wait(remaining)
+        return ticket
+
+    def acquire(
+        self,
+        class_key=None,
+        student_key=None,
+        cost: float = 1.0,
+        timeout: Optional[float] = None,
+        low_priority: bool = False,
+    ) -> _Ticket:
+        """
+        申请一个执行槽位，阻塞直到获得或超时
+
+        Args:
+            class_key: 班级标识
+            student_key: 学生标识
+            cost: 本次执行的预计开销（用于推进虚拟时间、判断是否为重任务）
+            timeout: 最长等待秒数，None表示一直等待
+            low_priority: 是否为低优先级任务
+
+        Raises:
+            SchedulerTimeout: 超时仍未获得槽位
+        """
+        cost = max(float(cost), 0.01)
+        ticket = _Ticket(class_key, student_key, cost, low_priority, heavy=cost >= self.heavy_cost)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if low_priority:
+            return self._acquire_low_priority(ticket, deadline)
+
+        with self._cond:
+            class_flow = self._activate_class(class_key)
+            student_flow = self._activate_student(class_key, student_key)
+            class_flow.waiting += 1
+            student_flow.waiting += 1
+            self._queues.setdefault(class_key, {}).setdefault(student_key, deque()).append(ticket)
+            self._dispatch()
+
+            while not ticket.granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._queues[class_key][student_key].remove(ticket)
+                    self._drop_empty_queue(class_key, student_key)
+                    class_flow.waiting -= 1
+                    student_flow.waiting -= 1
+                    self._forget_idle(class_key, student_key)
+                    raise SchedulerTimeout("等待执行槽位超时")
+                self._cond.wait(remaining)
+
+        return ticket
+
+    def release(self, ticket: _Ticket):
+        """归还执行槽位"""
+        with self._cond:
+            self._running -= 1
+            self._heavy_running -= ticket.heavy
+            if ticket.low_priority:
+                self._low_running -= 1
+                self._dispatch()
+                return
+            self._classes[ticket.class_key].running -= 1
+            self._students[(ticket.class_key, ticket.student_key)].running -= 1
+            self._forget_idle(ticket.class_key, ticket.student_key)
+            self._dispatch()
+
+    @contextmanager
+    def slot(
+        self,
+        class_key=None,
+        student_key=None,
+        cost: float = 1.0,
+        timeout: Optional[float] = None,
+        low_priority: bool = False,
+    ):
+        """以上下文管理器方式占用一个执行槽位"""
+        ticket = self.acquire(class_key, student_key, cost=cost, timeout=timeout, low_priority=low_priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairShareScheduler:
+    """获取当前进程的调度器（按settings懒加载；排队和公平分配只在本进程内生效）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairShareScheduler(
+                    max_concurrency=settings.EXECUTION_MAX_CONCURRENCY,
+                    max_per_student=settings.EXECUTION_MAX_CONCURRENT_PER_STUDENT,
+                    class_weights=settings.EXECUTION_CLASS_WEIGHTS,
+                    default_class_weight=settings.EXECUTION_DEFAULT_CLASS_WEIGHT,
+                    max_low_priority=settings.EXECUTION_LOW_PRIORITY_MAX,
+                    heavy_cost=settings.EXECUTION_HEAVY_COST,
+                    max_heavy=settings.EXECUTION_MAX_HEAVY,
+                )
+    return _scheduler
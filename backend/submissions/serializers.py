@@ -12,7 +12,8 @@ class TestResultSerializer(serializers.ModelSerializer):
         model = TestResult
         fields = [
             "id", "test_case", "test_case_info", "passed", "output",
-            "error_message", "execution_time", "created_at"
+            "error_message", "execution_time", "median_time", "memory_used",
+            "wall_time", "queue_time", "latency", "poll_count", "created_at"
         ]
         read_only_fields = ["id", "created_at"]
     
@@ -26,6 +27,13 @@ class TestResultSerializer(serializers.ModelSerializer):
         return None
 
 
+# 复杂度估算基于学生进程自己报告的计时，可被学生代码伪造，只作参考（见submissions.complexity）
+COMPLEXITY_EXTRA_KWARGS = {
+    "complexity_class": {"help_text": "估算的时间复杂度（仅供参考，不计入成绩）"},
+    "complexity_ok": {"help_text": "估算的复杂度是否满足任务要求（仅供参考，不作为强制要求）"},
+}
+
+
 class SubmissionSerializer(serializers.ModelSerializer):
     """提交序列化器"""
     
@@ -37,9 +45,11 @@ class SubmissionSerializer(serializers.ModelSerializer):
         fields = [
             "id", "task", "task_title", "student", "student_name",
             "code_content", "language", "score", "test_count",
-            "total_time", "submitted_at", "updated_at"
+            "total_time", "provisional", "finalized_at", "complexity_class",
+            "complexity_ok", "submitted_at", "updated_at"
         ]
-        read_only_fields = ["id", "submitted_at", "updated_at"]
+        read_only_fields = ["id", "complexity_class", "complexity_ok", "submitted_at", "updated_at"]
+        extra_kwargs = COMPLEXITY_EXTRA_KWARGS
 
 
 class SubmissionDetailSerializer(serializers.ModelSerializer):
@@ -54,9 +64,14 @@ class SubmissionDetailSerializer(serializers.ModelSerializer):
         fields = [
             "id", "task", "task_title", "student", "student_name",
             "code_content", "language", "score", "test_count",
-            "total_time", "test_results", "submitted_at", "updated_at"
+            "total_time", "provisional", "finalized_at", "test_results",
+            "complexity_class", "complexity_timings", "complexity_ok",
+            "submitted_at", "updated_at"
+        ]
+        read_only_fields = [
+            "id", "complexity_class", "complexity_timings", "complexity_ok", "submitted_at", "updated_at"
         ]
-        read_only_fields = ["id", "submitted_at", "updated_at"]
+        extra_kwargs = COMPLEXITY_EXTRA_KWARGS
 
 
 class TestCodeSerializer(serializers.Serializer):
@@ -64,6 +79,9 @@ class TestCodeSerializer(serializers.Serializer):
     
     code_content = serializers.CharField(required=True)
     language = serializers.ChoiceField(choices=["java", "python"], required=True)
+    fail_fast = serializers.BooleanField(required=False, default=False, help_text="快速失败：按历史失败率排序，遇到第一个未通过的用例即停止")
+    mode = serializers.ChoiceField(choices=["full", "sample"], required=False, default="full", help_text="full: 运行全部可见用例；sample: 加权分层抽样运行，并估计整体通过率")
+    sample_size = serializers.IntegerField(required=False, allow_null=True, min_value=1, help_text="抽样模式下的样本量，默认使用系统配置")
 
 
 class SubmitCodeSerializer(serializers.Serializer):
@@ -3,9 +3,361 @@ import requests
 import time
 import json
 import re
-import ast
+import secrets
+import statistics
+import textwrap
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from django.conf import settings
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .scheduler import get_scheduler, SchedulerTimeout
+from .limits import DEFAULT_LIMITS, ExecutionLimits, execution_cost, judge0_limits, timed_limits
+from .preflight import check_source, remap_python_traceback
+from .signatures import (
+    apply_java_skeleton,
+    apply_python_skeleton,
+    find_java_method,
+    find_python_function,
+    java_declared_locals,
+    java_identifiers,
+    java_template_skeleton,
+    parse_java_methods,
+    python_template_skeleton,
+)
+from .plan import parse_input_data
+from . import harness as harness_lib
+from .comparators import EXACT, compare
+from . import metrics
+
+
+# ---- 代码包装：签名解析与模板合并只与代码有关，按代码内容缓存 ----
+
+class PythonHarness(NamedTuple):
+    source: str  # 合并模板后的代码（不含调用部分）
+    call: str  # 调用表达式，如 twoSum 或 Solution().twoSum
+    param_count: Optional[int]  # 需要传入的参数个数，None表示按输入数量传参
+    annotations: Tuple[Optional[str], ...] = ()  # 参数类型注解（用于解码链表、二叉树）
+
+
+class JavaHarness(NamedTuple):
+    source: str  # complete为True时是完整程序，否则是不含main方法的类定义前半部分
+    complete: bool
+    function_name: str
+    param_vars: Tuple[Tuple[str, str], ...]  # ((类型, 参数名), ...)
+    return_type: str = "int"
+
+
+@lru_cache(maxsize=512)
+def _python_harness(user_code: str, function_name: str, skeleton: Tuple) -> PythonHarness:
+    # 合并模板（模板按占位符/同名函数预先拆分好），没有模板时直接使用学生代码
+    wrapped = apply_python_skeleton(skeleton, user_code)
+    
+    function = find_python_function(wrapped, function_name)
+    # 编解码库放在最前面：提供json、typing中的常用类型以及ListNode/TreeNode定义，学生代码可覆盖
+    wrapped = harness_lib.load("codec.py") + "\n" + wrapped
+    if function is None:
+        return PythonHarness(wrapped, function_name, None)
+    call = f"{function.class_name}().{function.name}" if function.class_name else function.name
+    return PythonHarness(
+        wrapped, call, None if function.variadic else function.required_count, function.annotations
+    )
+
+
+def _input_kinds(inputs) -> Tuple[str, ...]:
+    """输入值的Java类型，作为缓存键的一部分（只有方法体代码需要据此推断参数）"""
+    kinds = []
+    for value in inputs:
+        if isinstance(value, list) and value and isinstance(value[0], list):
+            kinds.append("int[][]")
+        elif isinstance(value, list) and value and isinstance(value[0], str):
+            kinds.append("String[]")
+        elif isinstance(value, list) and value and isinstance(value[0], float):
+            kinds.append("double[]")
+        elif isinstance(value, list):
+            kinds.append("int[]")
+        elif isinstance(value, str):
+            kinds.append("String")
+        elif isinstance(value, float):
+            kinds.append("double")
+        else:
+            kinds.append("int")
+    return tuple(kinds)
+
+
+def _java_static_method(method, source: str) -> str:
+    body = textwrap.dedent(source[method.body_start:method.body_end]).strip("\n")
+    indented_body = "\n".join("        " + line.rstrip() for line in body.split("\n") if line.strip())
+    return f"    public static {method.return_type} {method.name}({method.params_source}) {{\n{indented_body}\n    }}\n"
+
+
+@lru_cache(maxsize=512)
+def _java_harness(user_code: str, function_name: str, skeleton: Tuple, input_kinds: Tuple[str, ...]) -> JavaHarness:
+    # 如果有模板代码，使用模板（模板自带main方法）
+    wrapped = apply_java_skeleton(skeleton, user_code, function_name)
+    if wrapped is not None:
+        return JavaHarness(wrapped, True, function_name, ())
+    
+    # 检查用户代码是否已经包含完整的类定义和main方法
+    methods = parse_java_methods(user_code)
+    has_main = any(m.name == "main" for m in methods) or "public static void main" in user_code
+    if has_main and "class " in user_code:
+        # 完整的可执行代码，直接使用（不包装）
+        return JavaHarness(user_code, True, function_name, ())
+    
+    # 自动生成类和方法
+    # Judge0要求类名必须是Main，否则会报编译错误（类名与文件名不匹配）
+    wrapped = "import java.util.*;\nimport java.util.Arrays;\n\n"
+    wrapped += "public class Main {\n"
+    
+    target = find_java_method(user_code, function_name) or find_java_method(user_code, public_first=True)
+    if target is not None:
+        # 学生写了方法定义：保留全部方法（含辅助方法），统一改为static
+        for method in methods:
+            if method.name != "main":
+                wrapped += _java_static_method(method, user_code)
+        return JavaHarness(wrapped, False, target.name, target.params, target.return_type)
+    
+    # 没有方法定义，视为方法体：按输入数据类型推断参数，参数名优先使用代码中未声明的变量名
+    common_names = ['a', 'b', 'c', 'x', 'y', 'z', 'n', 'm', 'num', 'nums', 'str', 's', 'arr']
+    declared = set(java_declared_locals(user_code))
+    code_vars = [name for name in java_identifiers(user_code) if name not in declared]
+    single_names = {"int[]": "nums", "double[]": "nums", "String[]": "words", "int[][]": "grid", "String": "s", "double": "num"}
+    if len(input_kinds) == 1 and input_kinds[0] in single_names:
+        names = [single_names[input_kinds[0]]]
+    elif len(input_kinds) == 1:
+        names = code_vars[:1] or ["num"]
+    elif len(code_vars) >= len(input_kinds):
+        names = code_vars[:len(input_kinds)]
+    else:
+        names = [common_names[min(i, len(common_names) - 1)] for i in range(len(input_kinds))]
+    param_vars = tuple(zip(input_kinds, names))
+    params_str = ", ".join(f"{t} {n}" for t, n in param_vars)
+    
+    wrapped += f"    public static int {function_name}({params_str}) {{\n"
+    body_lines = user_code.strip().split('\n')
+    wrapped += '\n'.join('        ' + line.rstrip() for line in body_lines if line.strip())
+    wrapped += "\n    }\n"
+    return JavaHarness(wrapped, False, function_name, param_vars)
+
+
+# ---- 生成调用代码：参数以JSON形式从标准输入读取，生成的程序对同一份代码保持不变 ----
+
+@lru_cache(maxsize=512)
+def _python_program(user_code: str, function_name: str, skeleton: Tuple) -> str:
+    harness = _python_harness(user_code, function_name, skeleton)
+    
+    main_code = "\n# 自动生成的测试代码（老师设置的输入以JSON数组形式从标准输入读取）\n"
+    main_code += "def _harness_prepare(_args):\n"
+    if harness.param_count is not None:
+        # 按必填参数数量传参，输入数据不足时用None填充
+        main_code += f"    _args = (_args + [None] * {harness.param_count})[:{harness.param_count}]\n"
+    if any(a and ("ListNode" in a or "TreeNode" in a) for a in harness.annotations):
+        # 按类型注解把数组解码为链表/二叉树
+        main_code += f"    _types = {list(harness.annotations)!r}\n"
+        main_code += "    _args = [_harness_decode(v, t) for v, t in zip(_args, _types)] + _args[len(_types):]\n"
+    main_code += "    return _args\n\n\n"
+    main_code += "def _harness_invoke(_args):\n"
+    main_code += f"    return {harness.call}(*_args)\n\n\n"
+    main_code += "if __name__ == '__main__':\n"
+    main_code += "    import sys\n"
+    main_code += "    _payload = json.loads(sys.stdin.read() or '[]')\n"
+    main_code += "    if isinstance(_payload, dict) and TIMED_KEY in _payload:\n"
+    main_code += "        _harness_timed(_payload, _harness_prepare, _harness_invoke)\n"
+    main_code += "    else:\n"
+    main_code += "        _harness_print(_harness_invoke(_harness_prepare(_payload)))\n"
+    return harness.source + main_code
+
+
+# 参数类型 -> Codec中的解码调用（缺少的参数解码为默认值）
+_JAVA_DECODERS = {
+    "char[]": "Codec.toCharArray({})",
+    "int[][]": "Codec.toIntMatrix({})",
+    "long[][]": "Codec.toLongMatrix({})",
+    "double[][]": "Codec.toDoubleMatrix({})",
+    "char[][]": "Codec.toCharMatrix({})",
+    "String[][]": "Codec.toStrMatrix({})",
+    "ListNode": "NodeCodec.toListNode({})",
+    "TreeNode": "NodeCodec.toTreeNode({})",
+    "int": "Codec.toInt({})",
+    "Integer": "Codec.toInt({})",
+    "long": "Codec.toLong({})",
+    "Long": "Codec.toLong({})",
+    "double": "Codec.toDouble({})",
+    "Double": "Codec.toDouble({})",
+    "float": "(float) Codec.toDouble({})",
+    "Float": "(float) Codec.toDouble({})",
+    "boolean": "Codec.toBoolean({})",
+    "Boolean": "Codec.toBoolean({})",
+    "char": "Codec.toChar({})",
+    "Character": "Codec.toChar({})",
+    "String": "Codec.toStr({})",
+    "int[]": "Codec.toIntArray({})",
+    "long[]": "Codec.toLongArray({})",
+    "double[]": "Codec.toDoubleArray({})",
+    "boolean[]": "Codec.toBooleanArray({})",
+    "String[]": "Codec.toStrArray({})",
+}
+
+
+_JAVA_COLLECTION_RE = re.compile(
+    r"^(?:java\.util\.)?(List|ArrayList|LinkedList|Collection|Iterable|Set|HashSet|LinkedHashSet|TreeSet)<(.+)>$"
+)
+
+
+def _java_decoder(java_type: str, raw: str, depth: int = 0) -> str:
+    """生成把JSON值解码为指定Java类型的表达式，集合类型按元素类型递归生成"""
+    if java_type in _JAVA_DECODERS:
+        return _JAVA_DECODERS[java_type].format(raw)
+    match = _JAVA_COLLECTION_RE.match(java_type)
+    if match:
+        container, element = match.groups()
+        factory = "toSet" if "Set" in container else "toList"
+        var = f"__e{depth}"
+        return f"Codec.{factory}({raw}, {var} -> {_java_decoder(element, var, depth + 1)})"
+    # 未知类型：直接转换（如Object、Map等）
+    return f"({java_type}) {raw}"
+
+
+def _java_encoder(java_type: str, call: str) -> str:
+    """生成输出返回值的表达式"""
+    if java_type == "ListNode":
+        return f"Codec.format(NodeCodec.fromListNode({call}))"
+    if java_type == "TreeNode":
+        return f"Codec.format(NodeCodec.fromTreeNode({call}))"
+    return f"Codec.format({call})"
+
+
+@lru_cache(maxsize=512)
+def _java_program(user_code: str, function_name: str, skeleton: Tuple, input_kinds: Tuple[str, ...]) -> Tuple[str, bool]:
+    """
+    Returns:
+        (完整程序, 是否从标准输入读取JSON参数)；模板和完整程序原样使用，不读取JSON参数
+    """
+    harness = _java_harness(user_code, function_name, skeleton, input_kinds)
+    if harness.complete:
+        return harness.source, False
+    
+    # 参数解码与方法调用分开生成，计时模式只统计调用本身
+    decoded_args = [
+        _java_decoder(param_type, f"Codec.arg(__args, {index})")
+        for index, (param_type, _) in enumerate(harness.param_vars)
+    ]
+    call_args = [
+        f"({param_type}) __a[{index}]"
+        for index, (param_type, _) in enumerate(harness.param_vars)
+    ]
+    call = f"{harness.function_name}({', '.join(call_args)})"
+    
+    wrapped = harness.source
+    wrapped += "\n"
+    wrapped += "    static Object[] __decode(java.util.List<Object> __args) {\n"
+    wrapped += f"        return new Object[]{{{', '.join(decoded_args)}}};\n"
+    wrapped += "    }\n"
+    wrapped += "\n"
+    wrapped += "    @SuppressWarnings(\"unchecked\")\n"
+    wrapped += "    static String __invoke(Object[] __a) throws Exception {\n"
+    if harness.return_type == "void":
+        wrapped += f"        {call};\n"
+        wrapped += "        return null;\n"
+    else:
+        wrapped += f"        return {_java_encoder(harness.return_type, call)};\n"
+    wrapped += "    }\n"
+    wrapped += "\n"
+    wrapped += "    public static void main(String[] __argv) throws Exception {\n"
+    wrapped += "        String __raw = Codec.readInput(System.in);\n"
+    wrapped += "        java.util.Map<String, Object> __timed = Codec.timedPayload(__raw);\n"
+    wrapped += "        if (__timed != null) {\n"
+    wrapped += "            Codec.runTimed(__timed, __args -> __decode(__args), __a -> __invoke(__a));\n"
+    wrapped += "            return;\n"
+    wrapped += "        }\n"
+    wrapped += "        String __out = __invoke(__decode(Codec.args(__raw)));\n"
+    wrapped += "        if (__out != null) {\n"
+    wrapped += "            System.out.println(__out);\n"
+    wrapped += "        }\n"
+    wrapped += "    }\n"
+    wrapped += "}\n"
+    wrapped += harness_lib.load("Codec.java")
+    # 用到链表/二叉树时附加节点定义（学生代码中的类不会被保留，不会重复定义）
+    if "ListNode" in harness.source or "TreeNode" in harness.source:
+        wrapped += harness_lib.load("Nodes.java")
+    return wrapped, True
+
+
+def encode_arguments(arguments: List) -> str:
+    """把参数编码为harness从标准输入读取的JSON"""
+    return json.dumps(arguments, ensure_ascii=False, separators=(",", ":"))
+
+
+# 计时模式的输入键和输出标记，与harness/codec.py、harness/Codec.java中一致
+TIMED_KEY = "__harness_timed__"
+TIMINGS_MARKER = "__HARNESS_TIMINGS__"
+
+
+def timed_payload(timing: Dict) -> Dict:
+    """
+    计时模式的标准输入
+
+    Args:
+        timing: {"runs": [参数数组, ...], "repeat": 每组参数执行次数, "echo": 是否输出第一次执行的返回值,
+                 "nonce": 本次执行的随机标记（harness输出计时结果时附在标记后面）}
+    """
+    return {
+        TIMED_KEY: timing["runs"],
+        "repeat": timing.get("repeat", 1),
+        "echo": bool(timing.get("echo")),
+        "nonce": timing.get("nonce", ""),
+    }
+
+
+def run_limits(limits: Optional[ExecutionLimits], timing: Optional[Dict]) -> ExecutionLimits:
+    """
+    一次执行实际使用的限制
+
+    用例的限制按单次调用校准，计时模式一次执行中每组参数调用repeat次，限制按总调用次数放大，
+    否则与参考答案一样快的代码也会超时。
+    """
+    limits = limits or DEFAULT_LIMITS
+    if not timing:
+        return limits
+    invocations = max(1, int(timing.get("repeat") or 1)) * max(1, len(timing.get("runs") or ()))
+    return timed_limits(limits, invocations)
+
+
+def split_timings(stderr: str, nonce: Optional[str]) -> Tuple[str, Optional[List[List[float]]]]:
+    """
+    从标准错误中取出计时结果（每组参数各次执行的CPU时间，秒），返回(其余标准错误, 计时结果)
+
+    只接受带本次执行随机标记的一行，学生代码伪造的计时行不会被采用。计时结果由学生进程自己报告，
+    只用于复杂度估算等参考信息，不用于计分（速度分档使用判题机统计的CPU时间）。
+    """
+    if not nonce or not stderr:
+        return stderr, None
+    marker = TIMINGS_MARKER + nonce
+    index = stderr.find(marker)
+    if index < 0:
+        return stderr, None
+    line_end = stderr.find("\n", index)
+    line_end = len(stderr) if line_end < 0 else line_end
+    try:
+        timings = json.loads(stderr[index + len(marker):line_end])
+    except ValueError:
+        return stderr, None
+    return (stderr[:index] + stderr[line_end + 1:]).strip(), timings
+
+
+def user_stderr(stderr: str, source_map: Optional[Tuple[str, str]]) -> str:
+    """把标准错误中回溯的行号映射回学生代码（source_map为(包装后的源码, 学生代码)）"""
+    if not stderr or not source_map:
+        return stderr
+    return remap_python_traceback(stderr, *source_map)
+
+
+def median_time(result: Dict) -> Optional[float]:
+    """计时模式下第一组参数各次执行时间的中位数，非计时模式的结果为None"""
+    timings = result.get("timings")
+    if not timings or not timings[0]:
+        return None
+    return statistics.median(timings[0])
 
 
 class CodeExecutionService:
@@ -16,7 +368,23 @@ class CodeExecutionService:
         "python": 71,  # Python (3.8.1)
     }
     
-    def __init__(self):
+    # 查询执行结果时返回的字段（默认字段不含运行时间wall_time）
+    RESULT_FIELDS = "token,stdout,stderr,compile_output,message,status,time,wall_time,memory"
+    
+    def __init__(self, class_id=None, student_id=None, low_priority=False, deadline: Optional[float] = None):
+        """
+        Args:
+            class_id: 发起执行的班级ID（用于公平调度）
+            student_id: 发起执行的学生ID（用于公平调度和单人并发限制）
+            low_priority: 是否为低优先级执行（如推测执行，只使用空闲槽位）
+            deadline: 整个作业等待执行槽位的截止时间（time.monotonic()），不为空时各次执行共用，
+                      否则每次执行最多等待EXECUTION_QUEUE_TIMEOUT秒
+        """
+        self.class_id = class_id
+        self.student_id = student_id
+        self.low_priority = low_priority
+        self.deadline = deadline
+        self.scheduler = get_scheduler()
         self.api_url = settings.JUDGE0_API_URL
         self.api_key = settings.JUDGE0_API_KEY
         self.rapidapi_host = settings.JUDGE0_RAPIDAPI_HOST
@@ -39,460 +407,72 @@ class CodeExecutionService:
         # Judge0 CE公共实例不需要认证头
         return headers
     
-    def _parse_input_data(self, input_data: str):
-        """解析输入数据，支持多种格式"""
-        if not input_data or not input_data.strip():
-            return []
-        
-        # 尝试解析为JSON
-        try:
-            inputs = json.loads(input_data)
-            if isinstance(inputs, list):
-                return inputs
-            elif isinstance(inputs, dict):
-                # 如果是字典，转为列表
-                return [inputs]
-            else:
-                return [inputs]
-        except:
-            pass
-        
-        # 尝试按行分割
-        lines = [line.strip() for line in input_data.strip().split('\n') if line.strip()]
-        if len(lines) > 1:
-            # 多行输入，尝试转换每行的类型
-            parsed = []
-            for line in lines:
-                # 尝试解析为数字
-                try:
-                    if '.' in line:
-                        parsed.append(float(line))
-                    else:
-                        parsed.append(int(line))
-                except:
-                    # 保持为字符串
-                    parsed.append(line)
-            return parsed
-        
-        # 单行输入，按空格分割
-        parts = input_data.strip().split()
-        if len(parts) > 1:
-            # 多个值，尝试转换类型
-            parsed = []
-            for part in parts:
-                try:
-                    if '.' in part:
-                        parsed.append(float(part))
-                    else:
-                        parsed.append(int(part))
-                except:
-                    parsed.append(part)
-            return parsed
-        
-        # 单个值
-        try:
-            if '.' in input_data:
-                return [float(input_data)]
-            else:
-                return [int(input_data)]
-        except:
-            return [input_data]
-    
-    def _parse_input_data(self, input_data: str):
-        """解析输入数据，支持多种格式"""
-        if not input_data or not input_data.strip():
-            return []
-        
-        # 尝试解析为JSON
-        try:
-            inputs = json.loads(input_data)
-            if isinstance(inputs, list):
-                return inputs
-            elif isinstance(inputs, dict):
-                # 如果是字典，转为列表
-                return [inputs]
-            else:
-                return [inputs]
-        except:
-            pass
-        
-        # 尝试按行分割
-        lines = [line.strip() for line in input_data.strip().split('\n') if line.strip()]
-        if len(lines) > 1:
-            # 多行输入，尝试转换每行的类型
-            parsed = []
-            for line in lines:
-                # 尝试解析为数字
-                try:
-                    if '.' in line:
-                        parsed.append(float(line))
-                    else:
-                        parsed.append(int(line))
-                except:
-                    # 保持为字符串
-                    parsed.append(line)
-            return parsed
-        
-        # 单行输入，按空格分割
-        parts = input_data.strip().split()
-        if len(parts) > 1:
-            # 多个值，尝试转换类型
-            parsed = []
-            for part in parts:
-                try:
-                    if '.' in part:
-                        parsed.append(float(part))
-                    else:
-                        parsed.append(int(part))
-                except:
-                    parsed.append(part)
-            return parsed
-        
-        # 单个值
-        try:
-            if '.' in input_data:
-                return [float(input_data)]
-            else:
-                return [int(input_data)]
-        except:
-            return [input_data]
+    def _wrap_python_function(
+        self,
+        user_code: str,
+        function_name: str,
+        template_code: str,
+        template_skeleton: Optional[Tuple] = None,
+    ) -> str:
+        """包装Python函数为完整可执行程序（LeetCode风格），参数从标准输入以JSON读取"""
+        # 评测计划中预先拆分的模板骨架优先，否则现场拆分
+        if template_skeleton is None:
+            template_skeleton = python_template_skeleton(template_code, function_name)
+        # 生成的程序只与代码有关，按代码缓存，不随测试用例变化
+        return _python_program(user_code, function_name, template_skeleton)
     
-    def _wrap_python_function(self, user_code: str, function_name: str, template_code: str, input_data: str) -> str:
-        """包装Python函数为完整可执行程序（LeetCode风格）"""
-        # 解析输入数据
-        inputs = self._parse_input_data(input_data)
-        
-        # 如果有模板代码，使用模板；否则自动生成
-        if template_code:
-            # 在模板中查找占位符，如果没有则尝试替换函数体
-            if "{{user_code}}" in template_code:
-                wrapped = template_code.replace("{{user_code}}", user_code)
-            elif f"def {function_name}" in template_code:
-                # 替换模板中的函数定义
-                pattern = f"def {function_name}[^:]*:.*?(?=\\n\\n|\\ndef |\\nclass |$)"
-                wrapped = re.sub(pattern, user_code.strip(), template_code, flags=re.DOTALL)
-            else:
-                wrapped = template_code + "\n\n" + user_code
-        else:
-            # 自动生成包装代码
-            wrapped = user_code + "\n\n"
-        
-        # 生成main函数来调用学生代码
-        main_code = "\n# 自动生成的测试代码（使用老师设置的输入和输出）\n"
-        main_code += "if __name__ == '__main__':\n"
-        
-        # 根据函数签名确定参数数量
-        # 尝试从用户代码中提取函数参数
-        function_match = re.search(rf'def\s+{re.escape(function_name)}\s*\(([^)]*)\)', wrapped)
-        param_count = 0
-        if function_match:
-            params = function_match.group(1).strip()
-            if params:
-                # 计算参数数量（考虑默认值）
-                param_count = len([p for p in params.split(',') if p.strip() and '=' not in p.strip()])
-            
-            # 根据参数数量调用函数
-            if param_count == 0:
-                main_code += f"    result = {function_name}()\n"
-            elif param_count == 1:
-                # 单个参数
-                if len(inputs) > 0:
-                    input_str = repr(inputs[0])
-                    main_code += f"    result = {function_name}({input_str})\n"
-                else:
-                    main_code += f"    result = {function_name}(None)\n"
-            elif param_count > 1:
-                # 多个参数，使用输入数据填充
-                if len(inputs) >= param_count:
-                    args_str = ", ".join(repr(arg) for arg in inputs[:param_count])
-                    main_code += f"    result = {function_name}({args_str})\n"
-                else:
-                    # 输入数据不足，用None填充
-                    args_list = [repr(arg) for arg in inputs]
-                    args_list.extend(["None"] * (param_count - len(inputs)))
-                    args_str = ", ".join(args_list)
-                    main_code += f"    result = {function_name}({args_str})\n"
-        else:
-            # 无法提取函数签名，根据输入数量推断
-            if len(inputs) == 0:
-                main_code += f"    result = {function_name}()\n"
-            elif len(inputs) == 1:
-                input_str = repr(inputs[0])
-                main_code += f"    result = {function_name}({input_str})\n"
-            else:
-                args_str = ", ".join(repr(arg) for arg in inputs)
-                main_code += f"    result = {function_name}({args_str})\n"
-        
-        main_code += "    if isinstance(result, (list, dict)):\n"
-        main_code += "        print(json.dumps(result, ensure_ascii=False))\n"
-        main_code += "    else:\n"
-        main_code += "        print(result)\n"
-        
-        # 如果使用了json，确保导入
-        if "json.dumps" in main_code or "json.loads" in main_code:
-            if "import json" not in wrapped:
-                wrapped = "import json\n" + wrapped
+    def _wrap_java_function(
+        self,
+        user_code: str,
+        function_name: str,
+        template_code: str,
+        inputs: List,
+        template_skeleton: Optional[Tuple] = None,
+    ) -> Tuple[str, bool]:
+        """
+        包装Java函数为完整可执行程序（LeetCode风格）
         
-        return wrapped + main_code
+        Returns:
+            (完整程序, 是否从标准输入读取JSON参数)
+        """
+        if template_skeleton is None:
+            template_skeleton = java_template_skeleton(template_code, function_name)
+        # 输入类型只在学生只写了方法体、需要推断参数时使用
+        return _java_program(user_code, function_name, template_skeleton, _input_kinds(inputs))
     
-    def _wrap_java_function(self, user_code: str, function_name: str, template_code: str, input_data: str, class_name: str = "Main") -> str:
-        """包装Java函数为完整可执行程序（LeetCode风格）"""
-        # 解析输入数据（使用统一的解析方法）
-        inputs = self._parse_input_data(input_data)
+    def _wrap_program(
+        self,
+        user_code: str,
+        language: str,
+        function_name: str = None,
+        template_code: str = None,
+        input_data: str = "",
+        arguments: Optional[List] = None,
+        template_skeleton: Optional[Tuple] = None,
+        timing: Optional[Dict] = None,
+    ) -> Tuple[str, Optional[str]]:
+        """
+        包装用户代码
         
-        # 如果有模板代码，使用模板
-        if template_code:
-            if "{{user_code}}" in template_code:
-                wrapped = template_code.replace("{{user_code}}", user_code)
-            else:
-                # 尝试在模板中找到方法定义并替换
-                # 转义函数名中的特殊字符
-                escaped_function_name = re.escape(function_name)
-                # 使用原始字符串避免转义问题
-                pattern = r"(public\s+(static\s+)?[^\s]+\s+" + escaped_function_name + r"\s*\([^\)]*\)[^{]*)\{\s*[^\}]*\}"
-                wrapped = re.sub(pattern, lambda m: m.group(1) + "{\n" + user_code.strip() + "\n    }", template_code, flags=re.DOTALL)
+        Returns:
+            (完整程序, 标准输入)：生成的调用代码从标准输入读取JSON参数（timing不为空时为计时模式的输入）；
+            模板自带main方法或不支持的语言时原样使用测试输入
+        """
+        # 评测计划中已解析好的参数优先，否则现场解析
+        inputs = arguments if arguments is not None else parse_input_data(input_data)
+        payload = timed_payload(timing) if timing else inputs
+        if language.lower() == "python":
+            function_name = function_name or "solve"
+            source = self._wrap_python_function(user_code, function_name, template_code or "", template_skeleton)
+            return source, encode_arguments(payload)
+        elif language.lower() == "java":
+            function_name = function_name or "solution"
+            source, reads_json = self._wrap_java_function(
+                user_code, function_name, template_code or "", inputs, template_skeleton
+            )
+            return source, encode_arguments(payload) if reads_json else input_data
         else:
-            # 检查用户代码是否已经包含完整的类定义和main方法
-            has_class_def = re.search(r'public\s+class\s+\w+', user_code)
-            has_main = 'public static void main' in user_code
-            if has_class_def and has_main:
-                # 完整的可执行代码，直接使用（不包装）
-                return user_code
-            
-            # 自动生成类和方法
-            # Judge0要求类名必须是Main，否则会报编译错误（类名与文件名不匹配）
-            wrapped = "import java.util.*;\nimport java.util.Arrays;\n\n"
-            wrapped += "public class Main {\n"
-            
-            # 尝试从用户代码中提取方法签名和返回类型
-            method_match = re.search(r'public\s+(static\s+)?([^\s]+)\s+(\w+)\s*\(([^)]*)\)', user_code)
-            if method_match:
-                is_static = method_match.group(1) is not None
-                return_type = method_match.group(2)
-                detected_function_name = method_match.group(3)
-                params_str = method_match.group(4)
-                
-                # 提取方法体 - 使用更精确的匹配（匹配第一个{到对应的}）
-                # 找到方法签名后的第一个{和对应的}
-                method_start = method_match.end()
-                brace_count = 0
-                body_start = -1
-                body_end = -1
-                
-                for i in range(method_start, len(user_code)):
-                    if user_code[i] == '{':
-                        if brace_count == 0:
-                            body_start = i + 1
-                        brace_count += 1
-                    elif user_code[i] == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            body_end = i
-                            break
-                
-                if body_start != -1 and body_end != -1:
-                    body = user_code[body_start:body_end].strip()
-                    # 确保方法是static的
-                    static_modifier = "static "
-                    wrapped += f"    public {static_modifier}{return_type} {detected_function_name}({params_str}) {{\n"
-                    # 添加缩进
-                    body_lines = body.split('\n')
-                    indented_body = '\n'.join('        ' + line.rstrip() for line in body_lines)
-                    wrapped += indented_body + "\n    }\n"
-                else:
-                    # 无法精确提取方法体，尝试使用正则（作为后备）
-                    body_match = re.search(r'\{(.*?)\}', user_code, re.DOTALL)
-                    if body_match:
-                        body = body_match.group(1).strip()
-                        static_modifier = "static "
-                        wrapped += f"    public {static_modifier}{return_type} {detected_function_name}({params_str}) {{\n"
-                        body_lines = body.split('\n')
-                        indented_body = '\n'.join('        ' + line.rstrip() for line in body_lines)
-                        wrapped += indented_body + "\n    }\n"
-                    else:
-                        # 最后的后备方案：跳过方法签名行
-                        static_modifier = "static "
-                        wrapped += f"    public {static_modifier}{return_type} {detected_function_name}({params_str}) {{\n"
-                        body_lines = user_code.strip().split('\n')
-                        # 跳过方法签名行
-                        body_lines = [line for line in body_lines if not re.match(r'^\s*public\s+.*\{?\s*$', line.strip())]
-                        indented_body = '\n'.join('        ' + line.rstrip() for line in body_lines if line.strip())
-                        wrapped += indented_body + "\n    }\n"
-                function_name = detected_function_name  # 使用检测到的函数名
-            else:
-                # 如果没有找到完整的方法签名，尝试查找类名
-                class_match = re.search(r'public\s+class\s+(\w+)', user_code)
-                if class_match and 'main' not in user_code.lower():
-                    # 用户可能提交了完整类，尝试提取方法
-                    method_in_class = re.search(r'public\s+(static\s+)?([^\s]+)\s+(\w+)\s*\([^)]*\)\s*\{', user_code, re.DOTALL)
-                    if method_in_class:
-                        return_type = method_in_class.group(2)
-                        detected_function_name = method_in_class.group(3)
-                        # 提取方法体
-                        start_idx = user_code.find('{')
-                        end_idx = user_code.rfind('}')
-                        if start_idx != -1 and end_idx != -1:
-                            body = user_code[start_idx+1:end_idx].strip()
-                            # 移除方法签名行
-                            lines = body.split('\n')
-                            lines = [line for line in lines if not re.match(r'\s*public\s+.*', line.strip())]
-                            body = '\n'.join(lines)
-                            wrapped += f"    public static {return_type} {detected_function_name}(int[] nums) {{\n"
-                            body_lines = body.split('\n')
-                            indented_body = '\n'.join('        ' + line.rstrip() for line in body_lines if line.strip())
-                            wrapped += indented_body + "\n    }\n"
-                            function_name = detected_function_name
-                    else:
-                        # 默认方法签名
-                        wrapped += f"    public static int {function_name}(int[] nums) {{\n"
-                        # 假设整个代码是方法体
-                        body_lines = user_code.strip().split('\n')
-                        # 过滤掉类定义等
-                        body_lines = [line for line in body_lines if 'public class' not in line and '{' not in line.strip()]
-                        indented_body = '\n'.join('        ' + line.rstrip() for line in body_lines if line.strip())
-                        wrapped += indented_body + "\n    }\n"
-                else:
-                    # 如果没有找到类名或包含main，使用默认方法签名（假设是方法体）
-                    # 尝试从代码中提取使用的变量名
-                    # 常见变量名模式
-                    common_names = ['a', 'b', 'c', 'x', 'y', 'z', 'n', 'm', 'num', 'nums', 'str', 's', 'arr']
-                    
-                    # 从代码中查找可能使用的变量名
-                    code_vars = set()
-                    # 查找常见的变量使用模式：变量名后面跟空格、逗号、运算符等
-                    var_pattern = r'\b([a-z][a-zA-Z0-9]*)\b'
-                    matches = re.findall(var_pattern, user_code)
-                    for match in matches:
-                        # 过滤掉关键字和常见的方法名
-                        if match not in ['int', 'return', 'if', 'for', 'while', 'public', 'static', 'void', 'main', 'class', 'System', 'out', 'println']:
-                            code_vars.add(match)
-                    
-                    # 根据输入数据数量推断参数类型和名称
-                    if len(inputs) == 0:
-                        params_str = ""
-                    elif len(inputs) == 1:
-                        # 单个参数，根据类型推断
-                        if isinstance(inputs[0], list):
-                            params_str = "int[] nums"
-                        elif isinstance(inputs[0], str):
-                            params_str = "String s"
-                        elif isinstance(inputs[0], float):
-                            params_str = "double num"
-                        else:
-                            # 尝试使用代码中的变量名，如果没有则使用默认名
-                            if code_vars:
-                                params_str = f"int {list(code_vars)[0]}"
-                            else:
-                                params_str = "int num"
-                    else:
-                        # 多个参数，尝试使用代码中的变量名
-                        if len(code_vars) >= len(inputs):
-                            # 使用代码中出现的变量名
-                            var_list = list(code_vars)[:len(inputs)]
-                            # 根据输入类型确定参数类型
-                            param_list = []
-                            for i, var_name in enumerate(var_list):
-                                if i < len(inputs):
-                                    if isinstance(inputs[i], list):
-                                        param_list.append(f"int[] {var_name}")
-                                    elif isinstance(inputs[i], str):
-                                        param_list.append(f"String {var_name}")
-                                    elif isinstance(inputs[i], float):
-                                        param_list.append(f"double {var_name}")
-                                    else:
-                                        param_list.append(f"int {var_name}")
-                            params_str = ", ".join(param_list)
-                        else:
-                            # 使用常见的参数名（a, b, c等）
-                            param_list = []
-                            for i in range(len(inputs)):
-                                if isinstance(inputs[i], list):
-                                    param_list.append(f"int[] {common_names[min(i, len(common_names)-1)]}")
-                                elif isinstance(inputs[i], str):
-                                    param_list.append(f"String {common_names[min(i, len(common_names)-1)]}")
-                                elif isinstance(inputs[i], float):
-                                    param_list.append(f"double {common_names[min(i, len(common_names)-1)]}")
-                                else:
-                                    param_list.append(f"int {common_names[min(i, len(common_names)-1)]}")
-                            params_str = ", ".join(param_list)
-                    
-                    wrapped += f"    public static int {function_name}({params_str}) {{\n"
-                    body_lines = user_code.strip().split('\n')
-                    indented_body = '\n'.join('        ' + line.rstrip() for line in body_lines if line.strip())
-                    wrapped += indented_body + "\n    }\n"
-            
-            wrapped += "\n"
-            wrapped += "    public static void main(String[] args) {\n"
-            
-            # 从已生成的方法中提取参数信息
-            method_match_final = re.search(rf'public\s+static\s+[^\s]+\s+{re.escape(function_name)}\s*\(([^)]*)\)', wrapped)
-            if method_match_final:
-                params_str_final = method_match_final.group(1).strip()
-                if params_str_final:
-                    # 解析参数：提取参数名和类型
-                    param_parts = [p.strip() for p in params_str_final.split(',')]
-                    param_vars = []
-                    for param in param_parts:
-                        parts = param.split()
-                        if len(parts) >= 2:
-                            param_type = parts[0]
-                            param_name = parts[-1]
-                            param_vars.append((param_type, param_name))
-                else:
-                    param_vars = []
-            else:
-                param_vars = []
-            
-            # 生成测试代码（自动生成的测试代码，使用老师设置的输入）
-            if len(inputs) == 0 or not param_vars:
-                wrapped += f"        System.out.println({function_name}());\n"
-            elif len(param_vars) == 1:
-                # 单个参数
-                param_type, param_name = param_vars[0]
-                input_val = inputs[0]
-                if param_type == "int[]":
-                    arr_str = ", ".join(str(x) for x in (input_val if isinstance(input_val, list) else [input_val]))
-                    wrapped += f"        int[] {param_name} = {{{arr_str}}};\n"
-                    wrapped += f"        System.out.println({function_name}({param_name}));\n"
-                elif param_type == "String":
-                    wrapped += f"        String {param_name} = \"{input_val}\";\n"
-                    wrapped += f"        System.out.println({function_name}({param_name}));\n"
-                else:
-                    wrapped += f"        {param_type} {param_name} = {input_val};\n"
-                    wrapped += f"        System.out.println({function_name}({param_name}));\n"
-            else:
-                # 多个参数
-                call_args = []
-                for i, (param_type, param_name) in enumerate(param_vars):
-                    if i < len(inputs):
-                        input_val = inputs[i]
-                        if param_type == "int[]":
-                            arr_str = ", ".join(str(x) for x in (input_val if isinstance(input_val, list) else [input_val]))
-                            wrapped += f"        int[] {param_name} = {{{arr_str}}};\n"
-                            call_args.append(param_name)
-                        elif param_type == "String":
-                            wrapped += f"        String {param_name} = \"{input_val}\";\n"
-                            call_args.append(param_name)
-                        else:
-                            wrapped += f"        {param_type} {param_name} = {input_val};\n"
-                            call_args.append(param_name)
-                    else:
-                        # 参数不足，使用默认值
-                        if param_type == "int[]":
-                            wrapped += f"        int[] {param_name} = {{}};\n"
-                        elif param_type == "String":
-                            wrapped += f"        String {param_name} = \"\";\n"
-                        else:
-                            wrapped += f"        {param_type} {param_name} = 0;\n"
-                        call_args.append(param_name)
-                
-                args_str = ", ".join(call_args)
-                wrapped += f"        System.out.println({function_name}({args_str}));\n"
-            
-            wrapped += "    }\n"
-            wrapped += "}\n"
-        
-        return wrapped
+            return user_code, input_data  # 不支持的语言，直接返回原代码
     
     def wrap_user_code(
         self,
@@ -501,6 +481,8 @@ class CodeExecutionService:
         function_name: str = None,
         template_code: str = None,
         input_data: str = "",
+        arguments: Optional[List] = None,
+        template_skeleton: Optional[Tuple] = None,
     ) -> str:
         """
         包装用户代码为完整可执行程序（LeetCode模式）
@@ -510,59 +492,43 @@ class CodeExecutionService:
             language: 编程语言
             function_name: 函数名称
             template_code: 模板代码（可选）
-            input_data: 输入数据（用于生成测试代码）
+            input_data: 输入数据（用于推断只写了方法体时的参数类型）
+            arguments: 评测计划中已解析的参数（可选，提供时不再解析input_data）
+            template_skeleton: 评测计划中预先拆分的模板（可选）
         
         Returns:
             包装后的完整代码
         """
-        if language.lower() == "python":
-            function_name = function_name or "solve"
-            return self._wrap_python_function(user_code, function_name, template_code or "", input_data)
-        elif language.lower() == "java":
-            function_name = function_name or "solution"
-            return self._wrap_java_function(user_code, function_name, template_code or "", input_data)
-        else:
-            return user_code  # 不支持的语言，直接返回原代码
+        return self._wrap_program(
+            user_code, language, function_name, template_code, input_data, arguments, template_skeleton
+        )[0]
     
-    def execute_code(
+    def _prepare_source(
         self,
         source_code: str,
         language: str,
         stdin: str = "",
-        expected_output: Optional[str] = None,
-        cpu_time_limit: int = 2,
-        memory_limit: int = 128000,
         solution_mode: str = "full",
         function_name: str = None,
         template_code: str = None,
-    ) -> Dict:
+        arguments: Optional[List] = None,
+        template_skeleton: Optional[Tuple] = None,
+        timing: Optional[Dict] = None,
+    ):
         """
-        执行代码
+        生成实际提交执行的源代码（函数模式下自动包装）
         
-        Args:
-            source_code: 源代码（函数模式时是函数代码，完整模式时是完整程序）
-            language: 编程语言 (java, python)
-            stdin: 标准输入
-            expected_output: 期望输出（可选）
-            cpu_time_limit: CPU时间限制（秒）
-            memory_limit: 内存限制（KB）
-            solution_mode: 代码模式 ("full" 完整程序, "function" 函数模式)
-            function_name: 函数名称（函数模式必需）
-            template_code: 模板代码（函数模式可选）
+        arguments/template_skeleton 为评测计划中预先解析的参数和模板骨架（可选），
+        timing 为计时模式参数（见timed_payload，只对读取JSON参数的包装程序有效）
         
         Returns:
-            执行结果字典
+            (最终源代码, 标准输入, 错误结果)，包装失败时最终源代码为None；
+            包装后的程序从标准输入读取JSON参数，完整程序使用原始测试输入
         """
-        language_id = self.LANGUAGE_IDS.get(language.lower())
-        if not language_id:
-            return {
-                "success": False,
-                "error": f"不支持的语言: {language}",
-            }
-        
         # Python和Java代码都自动使用函数模式处理（无论是否设置为函数模式）
         # 系统会自动检测函数名或使用指定的函数名，将老师设置的输入作为函数参数
         final_source_code = source_code
+        program_stdin = stdin
         if language.lower() == "python":
             # Python代码总是使用函数模式
             # 1. 优先使用任务指定的函数名
@@ -571,9 +537,9 @@ class CodeExecutionService:
             detected_function_name = function_name
             if not detected_function_name:
                 # 尝试从代码中自动检测函数名
-                func_match = re.search(r'def\s+(\w+)\s*\(', source_code)
-                if func_match:
-                    detected_function_name = func_match.group(1)
+                function = find_python_function(source_code)
+                if function:
+                    detected_function_name = function.name
                 else:
                     # 如果代码中没有函数定义，假设学生写的是函数体
                     # 使用默认函数名，系统会自动包装成函数
@@ -590,15 +556,18 @@ class CodeExecutionService:
             else:
                 # 函数模式：包装代码
                 try:
-                    final_source_code = self.wrap_user_code(
+                    final_source_code, program_stdin = self._wrap_program(
                         user_code=source_code,
                         language=language,
                         function_name=detected_function_name,
                         template_code=template_code,
-                        input_data=stdin,  # 使用stdin作为输入数据来生成测试代码
+                        input_data=stdin,
+                        arguments=arguments,
+                        template_skeleton=template_skeleton,
+                        timing=timing,
                     )
                 except Exception as e:
-                    return {
+                    return None, None, {
                         "success": False,
                         "error": f"代码包装失败: {str(e)}。提示：Python代码应该编写函数，不需要处理输入输出。",
                     }
@@ -610,9 +579,9 @@ class CodeExecutionService:
             detected_function_name = function_name
             if not detected_function_name:
                 # 尝试从代码中自动检测函数名
-                method_match = re.search(r'public\s+(static\s+)?[^\s]+\s+(\w+)\s*\(', source_code)
-                if method_match:
-                    detected_function_name = method_match.group(2)
+                method = find_java_method(source_code, public_first=True)
+                if method:
+                    detected_function_name = method.name
                 else:
                     # 如果代码中没有方法定义，使用默认函数名
                     detected_function_name = "solution"
@@ -622,59 +591,248 @@ class CodeExecutionService:
                                   "Scanner" in source_code or
                                   "System.in" in source_code)
             
-            if has_main_or_scanner and not re.search(r'public\s+(static\s+)?[^\s]+\s+\w+\s*\([^)]*\)\s*\{', source_code):
+            if has_main_or_scanner and not any("public" in m.modifiers for m in parse_java_methods(source_code)):
                 # 完整程序，直接使用（向后兼容）
                 final_source_code = source_code
             else:
                 # 函数模式：包装代码
                 try:
-                    final_source_code = self.wrap_user_code(
+                    final_source_code, program_stdin = self._wrap_program(
                         user_code=source_code,
                         language=language,
                         function_name=detected_function_name,
                         template_code=template_code,
-                        input_data=stdin,  # 使用stdin作为输入数据来生成测试代码
+                        input_data=stdin,
+                        arguments=arguments,
+                        template_skeleton=template_skeleton,
+                        timing=timing,
                     )
                 except Exception as e:
-                    return {
+                    return None, None, {
                         "success": False,
                         "error": f"代码包装失败: {str(e)}。提示：Java代码应该编写方法，不需要处理输入输出（不需要Scanner或main方法）。",
                     }
         elif solution_mode == "function":
             # 其他语言只在函数模式下包装
             if not function_name:
-                return {
+                return None, None, {
                     "success": False,
                     "error": "函数模式需要指定函数名称",
                 }
             try:
-                final_source_code = self.wrap_user_code(
+                final_source_code, program_stdin = self._wrap_program(
                     user_code=source_code,
                     language=language,
                     function_name=function_name,
                     template_code=template_code,
-                    input_data=stdin,  # 使用stdin作为输入数据来生成测试代码
+                    input_data=stdin,
+                    arguments=arguments,
+                    template_skeleton=template_skeleton,
+                    timing=timing,
                 )
             except Exception as e:
-                return {
+                return None, None, {
                     "success": False,
                     "error": f"代码包装失败: {str(e)}",
                 }
         
+        return final_source_code, program_stdin, None
+    
+    def preflight(
+        self,
+        source_code: str,
+        language: str,
+        stdin: str = "",
+        solution_mode: str = "full",
+        function_name: str = None,
+        template_code: str = None,
+        arguments: Optional[List] = None,
+        template_skeleton: Optional[Tuple] = None,
+    ) -> Optional[Dict]:
+        """
+        本地预检（语法/编译检查），不访问执行后端
+        
+        Returns:
+            发现错误时返回与编译错误格式一致的结果（含行号），否则返回None
+        """
+        final_source_code, program_stdin, error = self._prepare_source(
+            source_code=source_code,
+            language=language,
+            stdin=stdin,
+            solution_mode=solution_mode,
+            function_name=function_name,
+            template_code=template_code,
+            arguments=arguments,
+            template_skeleton=template_skeleton,
+        )
+        if error:
+            return None
+        return check_source(final_source_code, source_code, language)
+    
+    def execute_code(
+        self,
+        source_code: str,
+        language: str,
+        stdin: str = "",
+        expected_output: Optional[str] = None,
+        limits: Optional[ExecutionLimits] = None,
+        solution_mode: str = "full",
+        function_name: str = None,
+        template_code: str = None,
+        arguments: Optional[List] = None,
+        template_skeleton: Optional[Tuple] = None,
+        comparison_mode: str = EXACT,
+        float_tolerance: Optional[float] = None,
+        timing: Optional[Dict] = None,
+    ) -> Dict:
+        """
+        执行代码
+        
+        Args:
+            source_code: 源代码（函数模式时是函数代码，完整模式时是完整程序）
+            language: 编程语言 (java, python)
+            stdin: 标准输入
+            expected_output: 期望输出（可选）
+            limits: 资源限制（CPU时间、运行时间、内存、输出大小），默认使用DEFAULT_LIMITS
+            solution_mode: 代码模式 ("full" 完整程序, "function" 函数模式)
+            function_name: 函数名称（函数模式必需）
+            template_code: 模板代码（函数模式可选）
+            arguments: 评测计划中已解析的参数（可选）
+            template_skeleton: 评测计划中预先拆分的模板（可选）
+            comparison_mode: 输出比较方式（见comparators）
+            float_tolerance: 浮点数容差（浮点比较方式使用）
+            timing: 计时模式参数（见timed_payload），结果中的timings为各组参数每次执行的CPU时间，
+                    CPU时间和运行时间限制按调用次数放大（见run_limits）
+        
+        Returns:
+            执行结果字典
+        """
+        submission_data, comparison, error = self._build_submission(
+            source_code=source_code,
+            language=language,
+            stdin=stdin,
+            expected_output=expected_output,
+            limits=limits,
+            solution_mode=solution_mode,
+            function_name=function_name,
+            template_code=template_code,
+            arguments=arguments,
+            template_skeleton=template_skeleton,
+            comparison_mode=comparison_mode,
+            float_tolerance=float_tolerance,
+            timing=timing,
+        )
+        if error:
+            return error
+        
+        # 按班级、学生公平排队获取执行槽位，避免单个班级或学生占满执行能力；
+        # 开销按声明的资源限制估算，限制较大的任务推进更多虚拟时间，且同时运行的数量受限
+        requested_at = time.monotonic()
+        try:
+            with self.scheduler.slot(
+                class_key=self.class_id,
+                student_key=self.student_id,
+                cost=execution_cost(run_limits(limits, timing)),
+                timeout=self._queue_timeout(),
+                low_priority=self.low_priority,
+            ):
+                queue_time = time.monotonic() - requested_at
+                result = self._run_on_judge0(submission_data, comparison)
+        except SchedulerTimeout:
+            return {
+                "success": False,
+                "error": "执行队列繁忙，请稍后重试",
+            }
+        self._record_timing([result], queue_time, time.monotonic() - requested_at)
+        return result
+    
+    def _queue_timeout(self) -> float:
+        """本次执行等待槽位的最长时间（秒），不超过作业的截止时间"""
+        if self.deadline is None:
+            return settings.EXECUTION_QUEUE_TIMEOUT
+        return max(0.0, min(settings.EXECUTION_QUEUE_TIMEOUT, self.deadline - time.monotonic()))
+    
+    @staticmethod
+    def _record_timing(results: List[Dict], queue_time: float, latency: float):
+        """在执行结果中记录排队时间和端到端耗时（秒），并计入运行指标"""
+        for result in results:
+            result["queue_time"] = round(queue_time, 4)
+            result["latency"] = round(latency, 4)
+        metrics.observe("execution_queue_seconds", queue_time)
+        metrics.observe("execution_latency_seconds", latency)
+    
+    def _build_submission(
+        self,
+        source_code: str,
+        language: str,
+        stdin: str = "",
+        expected_output: Optional[str] = None,
+        limits: Optional[ExecutionLimits] = None,
+        solution_mode: str = "full",
+        function_name: str = None,
+        template_code: str = None,
+        arguments: Optional[List] = None,
+        template_skeleton: Optional[Tuple] = None,
+        comparison_mode: str = EXACT,
+        float_tolerance: Optional[float] = None,
+        timing: Optional[Dict] = None,
+    ):
+        """
+        生成提交给Judge0的数据（参数同execute_code）
+        
+        Returns:
+            (提交数据, (期望输出, 比较方式, 浮点数容差, 计时标记, 行号映射), 错误结果)，
+            行号映射为(包装后的源码, 学生代码)，只有包装过的Python代码才有
+        """
+        language_id = self.LANGUAGE_IDS.get(language.lower())
+        if not language_id:
+            return None, None, {
+                "success": False,
+                "error": f"不支持的语言: {language}",
+            }
+        
+        # 计时模式：每次执行使用新的随机标记，只接受带该标记的计时结果
+        nonce = None
+        if timing:
+            nonce = secrets.token_hex(16)
+            timing = {**timing, "nonce": nonce}
+        final_source_code, program_stdin, error = self._prepare_source(
+            source_code=source_code,
+            language=language,
+            stdin=stdin,
+            solution_mode=solution_mode,
+            function_name=function_name,
+            template_code=template_code,
+            arguments=arguments,
+            template_skeleton=template_skeleton,
+            timing=timing,
+        )
+        if error:
+            return None, None, error
+        
+        limits = run_limits(limits, timing)
         # 准备提交数据
-        # Python和Java代码总是使用函数模式，不使用stdin；直接在代码中处理输入
-        use_function_mode = (language.lower() == "python") or (language.lower() == "java") or (solution_mode == "function")
+        # 函数模式下参数以JSON形式通过stdin传入，生成的程序对同一份代码不变；完整程序使用原始输入
         submission_data = {
             "source_code": final_source_code,
             "language_id": language_id,
-            "stdin": "" if use_function_mode else stdin,  # 函数模式下不使用stdin，直接在代码中处理输入
-            "cpu_time_limit": cpu_time_limit,
-            "memory_limit": memory_limit,
+            "stdin": program_stdin,
+            **judge0_limits(limits),
         }
+        # 期望输出不再交给Judge0比较，执行完成后在本地按测试用例的比较方式判断
+        source_map = None
+        if language.lower() == "python" and final_source_code != source_code:
+            source_map = (final_source_code, source_code)
+        comparison = (expected_output, comparison_mode, float_tolerance, nonce, source_map)
+        return submission_data, comparison, None
+    
+    def _run_on_judge0(self, submission_data: Dict, comparison: Optional[Tuple] = None) -> Dict:
+        """
+        提交到Judge0并轮询结果
         
-        if expected_output:
-            submission_data["expected_output"] = expected_output
-        
+        Args:
+            comparison: (期望输出, 比较方式, 浮点数容差, 计时标记, 行号映射)
+        """
         try:
             # 获取请求头
             try:
@@ -722,14 +880,15 @@ class CodeExecutionService:
                     "error": "未获取到执行token",
                 }
             
-            # 轮询获取结果
-            max_attempts = 30
+            # 轮询获取结果（运行时间限制较长时相应延长轮询次数）
+            max_attempts = max(30, int(submission_data.get("wall_time_limit", 0)) + 20)
             attempt = 0
             
             while attempt < max_attempts:
                 time.sleep(1)
                 result_response = requests.get(
                     f"{self.api_url}/submissions/{token}",
+                    params={"fields": self.RESULT_FIELDS},
                     headers=self._get_headers(),
                     timeout=10,
                 )
@@ -748,43 +907,16 @@ class CodeExecutionService:
                         "details": error_details,
                     }
                 
-                result = result_response.json()
-                status_id = result.get("status", {}).get("id")
-                
-                # 状态ID: 1=排队中, 2=处理中, 3=已完成
-                if status_id == 3:
-                    # 执行完成
-                    return self._parse_result(result, expected_output)
-                elif status_id in [4, 5, 6, 7, 8, 9, 10, 11, 12]:
-                    # 错误状态（编译错误、运行时错误等）
-                    compile_output = result.get("compile_output", "")
-                    stderr = result.get("stderr", "")
-                    stdout = result.get("stdout", "")
-                    error_description = result.get("status", {}).get("description", "执行失败")
-                    
-                    # 组合错误信息
-                    error_msg = error_description
-                    if compile_output:
-                        compile_clean = compile_output.rstrip() if compile_output else ""
-                        error_msg += f": {compile_clean[:500]}"  # 限制长度
-                    elif stderr:
-                        stderr_clean = stderr.rstrip() if stderr else ""
-                        error_msg += f": {stderr_clean[:500]}"
-                    
-                    return {
-                        "success": False,
-                        "error": error_msg,
-                        "status_id": status_id,
-                        "stdout": stdout,
-                        "stderr": stderr,
-                        "compile_output": compile_output,
-                    }
-                
                 attempt += 1
+                finished = self._finished_result(result_response.json(), comparison)
+                if finished is not None:
+                    finished["poll_count"] = attempt
+                    return finished
             
             return {
                 "success": False,
                 "error": "执行超时",
+                "poll_count": attempt,
             }
         
         except requests.exceptions.RequestException as e:
@@ -798,17 +930,180 @@ class CodeExecutionService:
                 "error": f"执行异常: {str(e)}",
             }
     
-    def _parse_result(self, result: Dict, expected_output: Optional[str] = None) -> Dict:
-        """解析执行结果"""
+    def execute_batch(self, runs: List[Dict], progress=None, concurrency: int = 1) -> List[Dict]:
+        """
+        批量执行（使用Judge0的批量提交接口，每批一次提交、每轮一次轮询）
+        
+        Args:
+            runs: 每项为execute_code的关键字参数
+            progress: 可选回调 progress(已完成数, 总数)，每批完成后在调用线程中调用
+            concurrency: 同时在执行的批数（仍受调度器的单人并发上限约束）
+        
+        Returns:
+            与runs一一对应的执行结果列表
+        """
+        results: List[Optional[Dict]] = [None] * len(runs)
+        pending = []
+        for index, run in enumerate(runs):
+            submission_data, comparison, error = self._build_submission(**run)
+            if error:
+                results[index] = error
+            else:
+                pending.append((index, submission_data, comparison, execution_cost(run_limits(run.get("limits"), run.get("timing")))))
+        
+        done = len(runs) - len(pending)
+        batch_size = max(1, settings.JUDGE0_BATCH_SIZE)
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="judge0-batch") as executor:
+            futures = {executor.submit(self._run_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                for (index, _, _, _), result in zip(batch, future.result()):
+                    results[index] = result
+                done += len(batch)
+                if progress:
+                    progress(done, len(runs))
+        return results
+    
+    def _run_batch(self, batch: List[Tuple]) -> List[Dict]:
+        requested_at = time.monotonic()
+        try:
+            # 一批占用一个槽位，开销为批内各次执行之和
+            with self.scheduler.slot(
+                class_key=self.class_id,
+                student_key=self.student_id,
+                cost=sum(item[3] for item in batch),
+                timeout=self._queue_timeout(),
+                low_priority=self.low_priority,
+            ):
+                queue_time = time.monotonic() - requested_at
+                results = self._run_batch_on_judge0(batch)
+        except SchedulerTimeout:
+            return [{"success": False, "error": "执行队列繁忙，请稍后重试"} for _ in batch]
+        self._record_timing(results, queue_time, time.monotonic() - requested_at)
+        return results
+    
+    def _run_batch_on_judge0(self, batch: List[Tuple]) -> List[Dict]:
+        """批量提交一批执行并轮询到全部完成，batch中每项为(序号, 提交数据, 比较参数, 开销)"""
+        try:
+            headers = self._get_headers()
+            response = requests.post(
+                f"{self.api_url}/submissions/batch",
+                json={"submissions": [item[1] for item in batch]},
+                headers=headers,
+                timeout=30,
+            )
+            if response.status_code != 201:
+                return [{
+                    "success": False,
+                    "error": f"API请求失败: {response.status_code}",
+                    "details": response.text[:500],
+                } for _ in batch]
+            
+            results: List[Optional[Dict]] = [None] * len(batch)
+            tokens = {}
+            for position, item in enumerate(response.json()):
+                if item.get("token"):
+                    tokens[item["token"]] = position
+                else:
+                    results[position] = {"success": False, "error": f"提交失败: {item}"}
+            
+            max_wall_time = max(item[1].get("wall_time_limit", 0) for item in batch)
+            max_attempts = max(30, int(max_wall_time) + 20)
+            attempt = 0
+            while tokens and attempt < max_attempts:
+                time.sleep(1)
+                result_response = requests.get(
+                    f"{self.api_url}/submissions/batch",
+                    params={"tokens": ",".join(tokens), "fields": self.RESULT_FIELDS},
+                    headers=headers,
+                    timeout=10,
+                )
+                attempt += 1
+                if result_response.status_code != 200:
+                    break
+                for record in result_response.json().get("submissions", []):
+                    position = tokens.get(record.get("token"))
+                    if position is None:
+                        continue
+                    finished = self._finished_result(record, batch[position][2])
+                    if finished is not None:
+                        finished["poll_count"] = attempt
+                        results[position] = finished
+                        del tokens[record["token"]]
+            
+            return [result or {"success": False, "error": "执行超时", "poll_count": attempt} for result in results]
+        
+        except ValueError as e:
+            return [{"success": False, "error": str(e)} for _ in batch]
+        except requests.exceptions.RequestException as e:
+            return [{"success": False, "error": f"网络请求异常: {str(e)}"} for _ in batch]
+    
+    def _finished_result(self, result: Dict, comparison: Optional[Tuple] = None) -> Optional[Dict]:
+        """把Judge0的执行记录转换为执行结果，仍在排队或处理中时返回None"""
+        status_id = result.get("status", {}).get("id")
+        
+        # 状态ID: 1=排队中, 2=处理中, 3=已完成
+        if status_id == 3:
+            # 执行完成
+            return self._parse_result(result, *(comparison or ()))
+        elif status_id in [4, 5, 6, 7, 8, 9, 10, 11, 12]:
+            # 错误状态（编译错误、运行时错误等）
+            compile_output = result.get("compile_output", "")
+            stderr = user_stderr(result.get("stderr", ""), comparison[4] if comparison else None)
+            stdout = result.get("stdout", "")
+            error_description = result.get("status", {}).get("description", "执行失败")
+            
+            # 组合错误信息
+            error_msg = error_description
+            if compile_output:
+                compile_clean = compile_output.rstrip() if compile_output else ""
+                error_msg += f": {compile_clean[:500]}"  # 限制长度
+            elif stderr:
+                stderr_clean = stderr.rstrip() if stderr else ""
+                error_msg += f": {stderr_clean[:500]}"
+            
+            return {
+                "success": False,
+                "error": error_msg,
+                "status_id": status_id,
+                "stdout": stdout,
+                "stderr": stderr,
+                "compile_output": compile_output,
+                "time_used": result.get("time", ""),
+                "wall_time_used": result.get("wall_time", ""),
+                "memory_used": result.get("memory", ""),
+            }
+        return None
+    
+    def _parse_result(
+        self,
+        result: Dict,
+        expected_output: Optional[str] = None,
+        comparison_mode: str = EXACT,
+        float_tolerance: Optional[float] = None,
+        timing_nonce: Optional[str] = None,
+        source_map: Optional[Tuple[str, str]] = None,
+    ) -> Dict:
+        """
+        解析执行结果，按比较方式判断输出是否正确
+
+        timing_nonce为计时模式本次执行的随机标记，source_map为(包装后的源码, 学生代码)，用于映射回溯的行号
+        """
         stdout = result.get("stdout", "")
         stderr = result.get("stderr", "")
         compile_output = result.get("compile_output", "")
         time_used = result.get("time", "")
+        wall_time_used = result.get("wall_time", "")
         memory_used = result.get("memory", "")
         
+        # 计时模式的计时结果写在标准错误中，取出后不影响是否通过的判断
+        stderr, timings = split_timings(stderr, timing_nonce)
+        stderr = user_stderr(stderr, source_map)
+        
         # 清理输出（去除末尾换行）
         stdout = stdout.rstrip() if stdout else ""
-        expected_output = expected_output.rstrip() if expected_output else ""
+        expected_output = expected_output or ""
         
         # 如果编译失败，错误信息在compile_output中
         if compile_output:
@@ -822,6 +1117,7 @@ class CodeExecutionService:
                 "compile_output": compile_output_clean,
                 "error": f"编译错误: {compile_output_clean[:200]}",  # 限制长度
                 "time_used": time_used,
+                "wall_time_used": wall_time_used,
                 "memory_used": memory_used,
                 "expected_output": expected_output,
             }
@@ -829,7 +1125,7 @@ class CodeExecutionService:
         # 判断是否通过
         passed = False
         if expected_output:
-            passed = stdout == expected_output
+            passed = compare(stdout, expected_output, comparison_mode, float_tolerance)
         else:
             # 如果没有期望输出，只要没有错误就算通过
             passed = not stderr
@@ -841,8 +1137,10 @@ class CodeExecutionService:
             "stderr": stderr,
             "compile_output": compile_output,
             "time_used": time_used,
+            "wall_time_used": wall_time_used,
             "memory_used": memory_used,
             "expected_output": expected_output,
+            "timings": timings,
         }
     
     def test_code(
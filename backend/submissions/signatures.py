@@ -0,0 +1,414 @@
+"""函数/方法签名解析：Python基于ast，Java基于词法分析；解析结果按代码内容缓存"""
+import ast
+import textwrap
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from .java_lexer import JavaLexError, tokenize
+
+
+# ---- Python ----
+
+class PythonFunction(NamedTuple):
+    name: str
+    class_name: Optional[str]  # 定义在类中时为类名（如LeetCode风格的Solution）
+    params: Tuple[str, ...]  # 位置参数名（方法不含self/cls）
+    annotations: Tuple[Optional[str], ...]  # 各参数的类型注解源码
+    required_count: int  # 没有默认值的位置参数个数
+    variadic: bool  # 是否有*args
+    return_annotation: Optional[str]
+    start_line: int  # 含装饰器的起始行（从1开始）
+    end_line: int
+    col_offset: int
+
+
+def _annotation_source(code: str, annotation) -> Optional[str]:
+    """类型注解的源码（多行注解合并为一行；不用ast.unparse以兼容Python 3.8）"""
+    if annotation is None:
+        return None
+    segment = ast.get_source_segment(code, annotation)
+    return " ".join(segment.split()) if segment else None
+
+
+def _python_function(node, class_name: Optional[str], code: str) -> PythonFunction:
+    positional = list(node.args.posonlyargs) + list(node.args.args)
+    is_method = class_name is not None and not any(
+        isinstance(d, ast.Name) and d.id == "staticmethod" for d in node.decorator_list
+    )
+    if is_method and positional:
+        positional = positional[1:]
+    required = max(0, len(positional) - len(node.args.defaults))
+    return PythonFunction(
+        name=node.name,
+        class_name=class_name if is_method else None,
+        params=tuple(arg.arg for arg in positional),
+        annotations=tuple(_annotation_source(code, arg.annotation) for arg in positional),
+        required_count=required,
+        variadic=node.args.vararg is not None,
+        return_annotation=_annotation_source(code, node.returns),
+        start_line=min([node.lineno] + [d.lineno for d in node.decorator_list]),
+        end_line=node.end_lineno,
+        col_offset=node.col_offset,
+    )
+
+
+@lru_cache(maxsize=1024)
+def parse_python_functions(code: str) -> Optional[Tuple[PythonFunction, ...]]:
+    """
+    解析模块顶层函数和顶层类中的方法
+
+    Returns:
+        按出现顺序排列的函数列表；代码有语法错误时返回None
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    functions = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(_python_function(node, None, code))
+        elif isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    functions.append(_python_function(item, node.name, code))
+    return tuple(functions)
+
+
+def find_python_function(code: str, name: Optional[str] = None) -> Optional[PythonFunction]:
+    """查找指定名称的函数（未指定名称时取第一个）；顶层函数优先于类中的方法"""
+    functions = parse_python_functions(code)
+    if not functions:
+        return None
+    if name is None:
+        return functions[0]
+    matches = [f for f in functions if f.name == name]
+    matches.sort(key=lambda f: f.class_name is not None)
+    return matches[0] if matches else None
+
+
+def python_template_skeleton(template_code: Optional[str], function_name: str) -> Tuple:
+    """
+    预先拆分模板，之后合并学生代码只需拼接字符串
+
+    Returns:
+        ("none",) 无模板；("placeholder", 片段...) 按{{user_code}}拆分；
+        ("function", 前半部分, 后半部分, 缩进) 替换同名函数；("append", 模板) 追加在模板之后
+    """
+    if not template_code:
+        return ("none",)
+    if "{{user_code}}" in template_code:
+        return ("placeholder",) + tuple(template_code.split("{{user_code}}"))
+    function = find_python_function(template_code, function_name)
+    if function is None:
+        return ("append", template_code)
+    lines = template_code.split("\n")
+    before = "\n".join(lines[:function.start_line - 1] + [""])
+    after = "\n".join([""] + lines[function.end_line:])
+    return ("function", before, after, function.col_offset)
+
+
+def apply_python_skeleton(skeleton: Tuple, user_code: str) -> str:
+    kind = skeleton[0]
+    if kind == "placeholder":
+        return user_code.join(skeleton[1:])
+    if kind == "function":
+        _, before, after, indent = skeleton
+        return before + textwrap.indent(textwrap.dedent(user_code).strip("\n"), " " * indent) + after
+    if kind == "append":
+        return skeleton[1] + "\n\n" + user_code
+    return user_code + "\n\n"
+
+
+# ---- Java ----
+
+JAVA_MODIFIERS = {
+    "public", "private", "protected", "static", "final", "abstract",
+    "synchronized", "native", "strictfp", "default",
+}
+JAVA_KEYWORDS = JAVA_MODIFIERS | {
+    "if", "else", "for", "while", "do", "switch", "case", "return", "new", "throw", "throws",
+    "try", "catch", "finally", "class", "interface", "enum", "extends", "implements", "import",
+    "package", "this", "super", "break", "continue", "instanceof", "assert", "var",
+    "true", "false", "null",
+}
+
+
+class JavaMethod(NamedTuple):
+    modifiers: Tuple[str, ...]
+    return_type: str
+    name: str
+    params: Tuple[Tuple[str, str], ...]  # ((类型, 参数名), ...)
+    start: int  # 声明在源码中的起始偏移（第一个修饰符或返回类型）
+    body_start: int  # 方法体 '{' 之后的偏移
+    body_end: int  # 方法体结束 '}' 的偏移
+    end: int  # 方法声明结束（'}' 之后）的偏移
+
+    @property
+    def is_static(self) -> bool:
+        return "static" in self.modifiers
+
+    @property
+    def params_source(self) -> str:
+        return ", ".join(f"{t} {n}" for t, n in self.params)
+
+
+def _skip_generic(tokens, i: int) -> int:
+    """tokens[i] 为 '<'，返回与之配对的 '>' 之后的位置；不配对时返回-1"""
+    depth = 0
+    while i < len(tokens):
+        text = tokens[i].text
+        if text == "<":
+            depth += 1
+        elif text == ">":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        elif text in ("{", "}", ";", "(", ")"):
+            return -1
+        i += 1
+    return -1
+
+
+def _parse_type(tokens, i: int) -> Tuple[Optional[str], int]:
+    """从tokens[i]开始解析一个类型（限定名、泛型、数组、可变参数），返回(类型源码, 下一位置)"""
+    if i >= len(tokens) or tokens[i].kind != "ident" or tokens[i].text in JAVA_KEYWORDS:
+        return None, i
+    start = i
+    i += 1
+    while i + 1 < len(tokens) and tokens[i].text == "." and tokens[i + 1].kind == "ident":
+        i += 2
+    if i < len(tokens) and tokens[i].text == "<":
+        i = _skip_generic(tokens, i)
+        if i < 0:
+            return None, start
+    while i + 1 < len(tokens) and tokens[i].text == "[" and tokens[i + 1].text == "]":
+        i += 2
+    if i + 2 < len(tokens) and tokens[i].text == "." and tokens[i + 1].text == "." and tokens[i + 2].text == ".":
+        i += 3
+    return "".join(t.text for t in tokens[start:i]).replace("...", "[]"), i
+
+
+def _parse_params(tokens) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """解析括号内的参数列表"""
+    params = []
+    i = 0
+    while i < len(tokens):
+        while i < len(tokens) and (tokens[i].text == "final" or tokens[i].text == "@"):
+            i += 2 if tokens[i].text == "@" else 1
+        param_type, i = _parse_type(tokens, i)
+        if param_type is None or i >= len(tokens) or tokens[i].kind != "ident":
+            return None
+        name = tokens[i].text
+        i += 1
+        while i + 1 < len(tokens) and tokens[i].text == "[" and tokens[i + 1].text == "]":
+            param_type += "[]"
+            i += 2
+        params.append((param_type, name))
+        if i < len(tokens):
+            if tokens[i].text != ",":
+                return None
+            i += 1
+    return tuple(params)
+
+
+def _match_brace(tokens, i: int) -> int:
+    """tokens[i] 为 '{'，返回配对 '}' 的下标；不配对时返回-1"""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j].text == "{":
+            depth += 1
+        elif tokens[j].text == "}":
+            depth -= 1
+            if depth == 0:
+                return j
+    return -1
+
+
+def _try_method(tokens, i: int) -> Optional[Tuple[JavaMethod, int]]:
+    """尝试从tokens[i]开始解析一个带方法体的方法声明，成功时返回(方法, '}'的下标)"""
+    start = i
+    modifiers = []
+    while i < len(tokens) and tokens[i].text in JAVA_MODIFIERS:
+        modifiers.append(tokens[i].text)
+        i += 1
+    if i < len(tokens) and tokens[i].text == "<":
+        i = _skip_generic(tokens, i)
+        if i < 0:
+            return None
+    return_type, i = _parse_type(tokens, i)
+    if return_type is None:
+        return None
+    if i + 1 >= len(tokens) or tokens[i].kind != "ident" or tokens[i].text in JAVA_KEYWORDS or tokens[i + 1].text != "(":
+        return None
+    name = tokens[i].text
+
+    # 参数列表
+    depth = 0
+    j = i + 1
+    while j < len(tokens):
+        if tokens[j].text == "(":
+            depth += 1
+        elif tokens[j].text == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        j += 1
+    if j >= len(tokens):
+        return None
+    params = _parse_params(tokens[i + 2:j])
+    if params is None:
+        return None
+
+    # throws 子句
+    k = j + 1
+    if k < len(tokens) and tokens[k].text == "throws":
+        k += 1
+        while k < len(tokens) and tokens[k].text not in ("{", ";"):
+            k += 1
+    if k >= len(tokens) or tokens[k].text != "{":
+        return None
+    close = _match_brace(tokens, k)
+    if close < 0:
+        return None
+
+    method = JavaMethod(
+        modifiers=tuple(modifiers),
+        return_type=return_type,
+        name=name,
+        params=params,
+        start=tokens[start].start,
+        body_start=tokens[k].end,
+        body_end=tokens[close].start,
+        end=tokens[close].end,
+    )
+    return method, close
+
+
+@lru_cache(maxsize=1024)
+def parse_java_methods(code: str) -> Tuple[JavaMethod, ...]:
+    """
+    解析代码中所有带方法体的方法声明（不进入方法体内部查找）
+
+    只在语句边界（代码开头、'{'、'}'、';' 之后）尝试匹配声明，方法体内的调用、
+    局部变量声明等不会被误判为方法。词法错误时返回空元组。
+    """
+    try:
+        tokens = tokenize(code)
+    except JavaLexError:
+        return ()
+
+    methods = []
+    i = 0
+    while i < len(tokens):
+        at_boundary = i == 0 or tokens[i - 1].text in ("{", "}", ";") or (
+            i >= 2 and tokens[i - 2].text == "@"
+        )
+        if at_boundary:
+            found = _try_method(tokens, i)
+            if found:
+                method, close = found
+                methods.append(method)
+                i = close + 1
+                continue
+        i += 1
+    return tuple(methods)
+
+
+def find_java_method(code: str, name: Optional[str] = None, public_first: bool = False) -> Optional[JavaMethod]:
+    """
+    查找方法（main方法除外）
+
+    Args:
+        name: 方法名，未指定时取第一个
+        public_first: 未指定名称时优先取第一个public方法
+    """
+    methods = [m for m in parse_java_methods(code) if m.name != "main"]
+    if name is not None:
+        methods = [m for m in methods if m.name == name]
+    if public_first:
+        methods.sort(key=lambda m: "public" not in m.modifiers)
+    return methods[0] if methods else None
+
+
+def java_identifiers(code: str) -> Tuple[str, ...]:
+    """按首次出现顺序返回代码中的小写开头标识符（不含关键字）"""
+    try:
+        tokens = tokenize(code)
+    except JavaLexError:
+        return ()
+    seen = []
+    for index, token in enumerate(tokens):
+        if token.kind != "ident" or token.text in JAVA_KEYWORDS or not token.text[0].islower():
+            continue
+        # 跳过方法调用和成员访问
+        if index + 1 < len(tokens) and tokens[index + 1].text == "(":
+            continue
+        if index > 0 and tokens[index - 1].text == ".":
+            continue
+        if token.text not in seen:
+            seen.append(token.text)
+    return tuple(seen)
+
+
+def java_declared_locals(code: str) -> Tuple[str, ...]:
+    """返回代码中声明的局部变量名（类型之后紧跟的标识符）"""
+    try:
+        tokens = tokenize(code)
+    except JavaLexError:
+        return ()
+    names = []
+    i = 0
+    while i < len(tokens):
+        if i == 0 or tokens[i - 1].text in ("{", "}", ";", "(", ","):
+            var_type, j = _parse_type(tokens, i)
+            if var_type is not None and j < len(tokens) and tokens[j].kind == "ident" \
+                    and j + 1 < len(tokens) and tokens[j + 1].text in ("=", ";", ":", ","):
+                names.append(tokens[j].text)
+                i = j + 1
+                continue
+        i += 1
+    return tuple(names)
+
+
+def java_template_skeleton(template_code: Optional[str], function_name: str) -> Tuple:
+    """
+    预先拆分Java模板
+
+    Returns:
+        ("none",) 无模板；("placeholder", 片段...) 按{{user_code}}拆分；
+        ("method", 方法前, 方法头(含'{'), 方法体之后(从'}'开始), 方法之后) 替换同名方法；
+        ("verbatim", 模板) 模板中没有该方法，原样使用
+    """
+    if not template_code:
+        return ("none",)
+    if "{{user_code}}" in template_code:
+        return ("placeholder",) + tuple(template_code.split("{{user_code}}"))
+    target = find_java_method(template_code, function_name)
+    if target is None:
+        return ("verbatim", template_code)
+    return (
+        "method",
+        template_code[:target.start],
+        template_code[target.start:target.body_start],
+        template_code[target.body_end:],
+        template_code[target.end:],
+    )
+
+
+def apply_java_skeleton(skeleton: Tuple, user_code: str, function_name: str) -> Optional[str]:
+    """合并学生代码与模板；无模板时返回None"""
+    kind = skeleton[0]
+    if kind == "placeholder":
+        return user_code.join(skeleton[1:])
+    if kind == "verbatim":
+        return skeleton[1]
+    if kind == "method":
+        _, before, header, body_tail, tail = skeleton
+        if find_java_method(user_code, function_name) is not None:
+            # 学生提交了完整方法定义，替换模板中的整个方法
+            return before + user_code.strip() + tail
+        # 学生只写了方法体，替换模板中的方法体
+        return before + header + "\n" + user_code.strip() + "\n    " + body_tail
+    return None
@@ -0,0 +1,119 @@
+"""
+随机压力测试用例生成
+
+教师在任务上配置生成脚本（可信的Python代码，在本地执行），脚本定义 generate(seed)，
+返回一个用例的输入：字符串原样作为输入数据，其他值序列化为JSON（函数模式的参数列表）。
+估算时间复杂度时使用脚本中的 generate_sized(n)，返回规模为n的输入（见complexity）。
+一次本地进程生成全部输入，批量创建为隐藏用例，再由参考答案批量执行得到期望输出。
+"""
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import Max
+
+from tasks.models import TestCase
+
+from .calibration import fill_expected_outputs
+from .plan import compile_grading_plan
+
+# 在子进程中对每个参数调用生成脚本中的指定函数，每行输出一个用例输入（JSON字符串）
+_GENERATOR_RUNNER = """
+import json, sys
+namespace = {"__name__": "__generator__"}
+exec(compile(sys.stdin.read(), "<generator>", "exec"), namespace)
+if sys.argv[1] not in namespace:
+    sys.exit("生成脚本中没有定义" + sys.argv[1] + "函数")
+func = namespace[sys.argv[1]]
+for arg in json.loads(sys.argv[2]):
+    value = func(arg)
+    sys.stdout.write(json.dumps(value if isinstance(value, str) else json.dumps(value)) + "\\n")
+"""
+
+
+def run_script(script: str, function: str, args: List[int]) -> List[str]:
+    """在本地子进程中对args中每个值调用生成脚本的function函数，返回对应的输入数据"""
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-c", _GENERATOR_RUNNER, function, json.dumps(args)],
+            input=script,
+            capture_output=True,
+            text=True,
+            timeout=settings.GENERATOR_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        raise ValueError(f"生成脚本运行超过{settings.GENERATOR_TIMEOUT}秒")
+    if completed.returncode != 0:
+        raise ValueError(f"生成脚本运行失败: {completed.stderr.strip()[-500:]}")
+    return [json.loads(line) for line in completed.stdout.splitlines() if line]
+
+
+def run_generator(script: str, seed_start: int, count: int) -> List[str]:
+    """运行生成脚本的generate(seed)，返回seed_start起count个种子对应的输入数据"""
+    return run_script(script, "generate", list(range(seed_start, seed_start + count)))
+
+
+def generate_stress_tests(
+    task,
+    count: int,
+    seed_start: int = 0,
+    replace: bool = False,
+    progress=None,
+) -> Dict:
+    """
+    生成随机隐藏用例
+
+    Args:
+        count: 生成的用例数（不超过GENERATOR_MAX_CASES）
+        seed_start: 起始种子
+        replace: 是否先删除之前生成的用例（有种子的用例）
+
+    参考答案执行失败的输入不保留，记入报告。
+
+    Returns:
+        {"created", "failed", "duplicates", "failures": [{"seed", "error"}]}
+    """
+    if not task.generator_script:
+        raise ValueError("任务没有设置生成脚本")
+    if not task.reference_solution:
+        raise ValueError("任务没有设置参考答案")
+    count = min(count, settings.GENERATOR_MAX_CASES)
+
+    inputs = run_generator(task.generator_script, seed_start, count)
+    if replace:
+        task.test_cases.filter(seed__isnull=False).delete()
+
+    # 重复的输入只保留一个
+    existing = set(task.test_cases.values_list("input_data", flat=True))
+    order = (task.test_cases.aggregate(Max("order"))["order__max"] or 0) + 1
+    new_cases = []
+    for seed, input_data in enumerate(inputs, start=seed_start):
+        if input_data in existing:
+            continue
+        existing.add(input_data)
+        new_cases.append(TestCase(
+            task=task,
+            input_data=input_data,
+            expected_output="",
+            is_hidden=True,
+            order=order + len(new_cases),
+            seed=seed,
+        ))
+    # PostgreSQL、SQLite下bulk_create会回填主键
+    created = TestCase.objects.bulk_create(new_cases, batch_size=500)
+
+    _, failures = fill_expected_outputs(task, created, task.test_cases.all(), progress=progress)
+    failed_ids = {failure["test_case_id"] for failure in failures}
+    seeds = {tc.id: tc.seed for tc in created}
+    if failed_ids:
+        TestCase.objects.filter(id__in=failed_ids).delete()
+    compile_grading_plan(task)
+
+    return {
+        "created": len(created) - len(failed_ids),
+        "failed": len(failed_ids),
+        "duplicates": len(inputs) - len(new_cases),
+        "failures": [{"seed": seeds[f["test_case_id"]], "error": f["error"]} for f in failures],
+    }
@@ -0,0 +1,128 @@
+"""
+执行遥测汇总
+
+按（时间桶, 任务, 语言）分组统计CPU时间、内存、排队时间和端到端耗时的百分位数，
+用于容量规划和发现异常耗时的任务。数据来源为提交的测试结果或练习运行记录
+（练习运行的每个用例结果保存在TestAttempt的JSON中）。
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .calibration import percentile
+from .grading import telemetry
+from .models import TestAttempt, TestResult
+
+# 统计的指标和百分位
+METRICS = ("cpu_time", "memory_used", "queue_time", "latency")
+PERCENTILES = (50, 90, 99)
+# 查询的时间窗口上限（天）
+MAX_WINDOW_DAYS = 90
+
+BUCKETS = {
+    "hour": TruncHour,
+    "day": TruncDay,
+}
+
+
+def _to_number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _summary(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    return {f"p{p}": percentile(values, p / 100) for p in PERCENTILES}
+
+
+def _result_rows(queryset):
+    """提交测试结果：(时间桶, 任务ID, 语言, 各指标)"""
+    rows = queryset.values_list(
+        "bucket", "submission__task_id", "submission__language",
+        "execution_time", "memory_used", "queue_time", "latency",
+    )
+    for bucket, task_id, language, cpu_time, memory_used, queue_time, latency in rows.iterator():
+        # 未实际执行（本地预检拦截）的结果不计入
+        if latency is None:
+            continue
+        yield bucket, task_id, language, (cpu_time, memory_used, queue_time, latency)
+
+
+def _attempt_rows(queryset):
+    """练习运行记录：每个已执行用例一行"""
+    rows = queryset.values_list("bucket", "task_id", "language", "test_results")
+    for bucket, task_id, language, test_results in rows.iterator():
+        for item in (test_results or {}).get("results", []):
+            data = item.get("telemetry") or telemetry(item)
+            if data.get("latency") is None:
+                continue
+            yield bucket, task_id, language, (
+                _to_number(item.get("time_used")),
+                data["memory_used"],
+                data["queue_time"],
+                data["latency"],
+            )
+
+
+def aggregate_telemetry(
+    task_ids=None,
+    language: Optional[str] = None,
+    days: int = 7,
+    bucket: str = "day",
+    source: str = "submissions",
+) -> List[Dict]:
+    """
+    汇总执行遥测
+
+    Args:
+        task_ids: 限定的任务ID（None表示不限）
+        language: 限定的编程语言
+        days: 统计最近多少天（不超过MAX_WINDOW_DAYS）
+        bucket: 时间桶粒度（hour/day）
+        source: 数据来源（submissions 提交的测试结果, practice 练习运行）
+
+    Returns:
+        [{"bucket", "task_id", "language", "count",
+          "cpu_time"/"memory_used"/"queue_time"/"latency": {"p50", "p90", "p99"} 或 None}]，
+        按时间桶、任务排序
+    """
+    since = timezone.now() - timedelta(days=min(days, MAX_WINDOW_DAYS))
+    trunc = BUCKETS[bucket]
+    if source == "practice":
+        queryset = TestAttempt.objects.filter(created_at__gte=since)
+        if task_ids is not None:
+            queryset = queryset.filter(task_id__in=task_ids)
+        if language:
+            queryset = queryset.filter(language=language)
+        rows = _attempt_rows(queryset.annotate(bucket=trunc("created_at")).order_by())
+    else:
+        queryset = TestResult.objects.filter(created_at__gte=since)
+        if task_ids is not None:
+            queryset = queryset.filter(submission__task_id__in=task_ids)
+        if language:
+            queryset = queryset.filter(submission__language=language)
+        rows = _result_rows(queryset.annotate(bucket=trunc("created_at")).order_by())
+
+    groups = defaultdict(lambda: [[] for _ in METRICS])
+    for bucket_start, task_id, row_language, values in rows:
+        series = groups[(bucket_start, task_id, row_language)]
+        for position, value in enumerate(values):
+            if value is not None:
+                series[position].append(value)
+
+    return [
+        {
+            "bucket": bucket_start.isoformat(),
+            "task_id": task_id,
+            "language": row_language,
+            "count": len(series[METRICS.index("latency")]),
+            **{name: _summary(values) for name, values in zip(METRICS, series)},
+        }
+        for (bucket_start, task_id, row_language), series in sorted(groups.items(), key=lambda item: (item[0][0], item[0][1]))
+    ]
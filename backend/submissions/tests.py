@@ -1,3 +1,726 @@
-from django.test import TestCase
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from classes.models import Class
+from tasks.models import Task, TestCase as TaskTestCase
+from users.models import User
+
+from . import preflight
+from .admission import AdmissionController
+from .attempts import attempt_count, attempt_counts, increment_attempt_counts, record_attempts
+from .calibration import calibrate_task, time_reference_solution
+from .comparators import EXACT, FLOAT, TOKENS, UNORDERED_LINES, WHITESPACE, compare, normalize_expected
+from .diff import output_diff
+from .grading import case_credit, finalize_submission, run_test_cases, upsert_submission
+from .limits import ExecutionLimits
+from .models import AttemptCounter, Submission, TestAttempt, TestResult
+from .plan import compile_grading_plan
+from .sampling import stratified_sample
+from .scheduler import FairShareScheduler, SchedulerTimeout
+from .services import TIMED_KEY, CodeExecutionService, run_limits
+
+# 重新提交一次的查询数：任务、班级成员、用例、练习记录、测试次数，事务（测试中为保存点）内的
+# 插入或更新提交、删除旧结果、批量插入新结果，以及返回前取出提交和结果
+RESUBMIT_QUERIES = 14
+
+PASSED_RESULT = {
+    "success": True,
+    "passed": True,
+    "stdout": "3",
+    "stderr": "",
+    "time_used": "0.01",
+    "memory_used": "1024",
+}
+
+
+@mock.patch.object(CodeExecutionService, "preflight", return_value=None)
+@mock.patch.object(CodeExecutionService, "execute_code", side_effect=lambda *args, **kwargs: dict(PASSED_RESULT))
+class SubmitCodeQueryCountTests(TestCase):
+    """提交评分：保存提交和测试结果的查询次数与用例数无关"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username="teacher", password="x", role="teacher")
+        cls.student = User.objects.create_user(username="student", password="x", role="student")
+        cls.class_obj = Class.objects.create(name="算法", teacher=cls.teacher)
+        cls.class_obj.students.add(cls.student)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def _task(self, case_count):
+        task = Task.objects.create(
+            title=f"{case_count}个用例",
+            description="a+b",
+            language="python",
+            class_obj=self.class_obj,
+            created_by=self.teacher,
+        )
+        TaskTestCase.objects.bulk_create([
+            TaskTestCase(task=task, input_data="1 2", expected_output="3", order=i)
+            for i in range(case_count)
+        ])
+        compile_grading_plan(task)
+        return task
+
+    def _submit(self, task):
+        response = self.client.post(
+            f"/api/submissions/tasks/{task.id}/submit/",
+            {"code_content": "a, b = map(int, input().split())\nprint(a + b)", "language": "python"},
+            format="json",
+        )
+        self.assertIn(response.status_code, (200, 201))
+        return response
+
+    def _count_queries(self, task):
+        with CaptureQueriesContext(connection) as context:
+            self._submit(task)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_cases(self, *mocks):
+        small, large = self._task(2), self._task(40)
+
+        self.assertEqual(self._count_queries(small), self._count_queries(large))
+        # 重新提交（更新提交、替换旧结果）
+        self.assertEqual(self._count_queries(small), RESUBMIT_QUERIES)
+        with self.assertNumQueries(RESUBMIT_QUERIES):
+            response = self._submit(large)
+
+        self.assertEqual(len(response.data["submission"]["test_results"]), 40)
+        submission = Submission.objects.get(task=large, student=self.student)
+        self.assertEqual(submission.score, 100.0)
+        self.assertEqual(TestResult.objects.filter(submission=submission).count(), 40)
+
+    def test_results_replaced_atomically(self, *mocks):
+        task = self._task(3)
+        self._submit(task)
+        submission = Submission.objects.get(task=task, student=self.student)
+
+        with mock.patch.object(TestResult.objects, "bulk_create", side_effect=RuntimeError("写入失败")):
+            with self.assertRaises(RuntimeError):
+                self._submit(task)
+
+        # 写入结果失败时整个保存回滚，旧的提交和结果保持不变
+        self.assertEqual(Submission.objects.get(pk=submission.pk).updated_at, submission.updated_at)
+        self.assertEqual(TestResult.objects.filter(submission=submission).count(), 3)
+
+
+class UpsertSubmissionConcurrencyTests(TransactionTestCase):
+    """同一学生并发提交：单条语句插入或更新，不会因唯一约束失败"""
+
+    THREADS = 8
+    ROUNDS = 10
+
+    def setUp(self):
+        teacher = User.objects.create_user(username="teacher", password="x", role="teacher")
+        self.student = User.objects.create_user(username="student", password="x", role="student")
+        class_obj = Class.objects.create(name="算法", teacher=teacher)
+        self.task = Task.objects.create(
+            title="并发", description="a+b", language="python", class_obj=class_obj, created_by=teacher,
+        )
+
+    def _upsert(self, fields):
+        while True:
+            try:
+                return upsert_submission(self.task, self.student, fields)
+            except OperationalError as e:
+                # 测试使用的共享缓存内存SQLite在写冲突时立即报表锁定而不是等待（文件数据库、
+                # PostgreSQL会等待），只重试这种错误；唯一约束冲突等其他错误仍使测试失败
+                if connection.vendor != "sqlite" or "locked" not in str(e):
+                    raise
+
+    def _hammer(self, worker, barrier, errors, created_flags):
+        try:
+            barrier.wait()
+            for round_number in range(self.ROUNDS):
+                _, created = self._upsert({
+                    "code_content": f"# {worker}-{round_number}",
+                    "language": "python",
+                    "score": float(worker),
+                    "complexity_timings": {"worker": worker},
+                })
+                created_flags.append(created)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            close_old_connections()
+
+    def test_concurrent_upserts(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors, created_flags = [], []
+        threads = [
+            threading.Thread(target=self._hammer, args=(worker, barrier, errors, created_flags))
+            for worker in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(created_flags), self.THREADS * self.ROUNDS)
+        self.assertEqual(created_flags.count(True), 1)
+        submission = Submission.objects.get(task=self.task, student=self.student)
+        worker = int(submission.code_content.split()[1].split("-")[0])
+        self.assertEqual(submission.score, float(worker))
+        self.assertEqual(submission.complexity_timings, {"worker": worker})
+
+    def test_returns_saved_row(self):
+        first, created = upsert_submission(self.task, self.student, {"code_content": "a", "language": "python"})
+        self.assertTrue(created)
+        second, created = upsert_submission(self.task, self.student, {"code_content": "b", "language": "python"})
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(second.submitted_at, first.submitted_at)
+        self.assertGreater(second.updated_at, first.updated_at)
+        self.assertEqual(second.code_content, "b")
+        self.assertIsNone(second.complexity_timings)
+
+    def test_falls_back_without_returning(self):
+        # 不支持RETURNING的数据库（如SQLite 3.35以前）使用update_or_create
+        with mock.patch.object(connection.features, "can_return_columns_from_insert", False):
+            first, created = upsert_submission(self.task, self.student, {"code_content": "a", "language": "python"})
+            self.assertTrue(created)
+            second, created = upsert_submission(self.task, self.student, {"code_content": "b", "language": "python"})
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(Submission.objects.get(pk=first.pk).code_content, "b")
+
+
+class StratifiedSampleTests(SimpleTestCase):
+    """快速反馈抽样：抽中的用例数不超过请求的样本量"""
+
+    def _cases(self, weights):
+        return [
+            SimpleNamespace(id=i, order=i, weight=weight, input_data="x" * i)
+            for i, weight in enumerate(weights)
+        ]
+
+    def test_sample_size_below_strata(self):
+        cases = self._cases([1.0] * 20)
+        for sample_size in (1, 2, 3):
+            sample, layers = stratified_sample(cases, sample_size, seed=7, strata_count=4)
+            self.assertEqual(len(sample), sample_size)
+            self.assertEqual(sum(len(layer["sampled"]) for layer in layers), sample_size)
+
+    def test_skewed_weights_do_not_exceed_sample_size(self):
+        # 大部分权重集中在一层时，其余各层的配额都不足1个
+        cases = self._cases([0.01] * 15 + [100.0] * 5)
+        sample, _ = stratified_sample(cases, 4, seed=7, strata_count=4)
+        self.assertEqual(len(sample), 4)
+
+
+# 模拟判题机：参考答案每次调用耗时REFERENCE_CPU秒，超过CPU时间限制即超时
+REFERENCE_CPU = 0.4
+
+
+def _fake_judge0(submission_data):
+    payload = json.loads(submission_data["stdin"] or "[]")
+    invocations = 1
+    if isinstance(payload, dict) and TIMED_KEY in payload:
+        invocations = payload["repeat"] * len(payload[TIMED_KEY])
+    cpu = REFERENCE_CPU * invocations
+    if cpu > submission_data["cpu_time_limit"]:
+        return {"success": True, "passed": False, "status_id": 5, "error": "Time Limit Exceeded"}
+    return {"success": True, "passed": True, "status_id": 3, "stdout": "3", "time_used": str(cpu), "memory_used": "1024"}
+
+
+@mock.patch.object(
+    CodeExecutionService, "_run_batch_on_judge0",
+    side_effect=lambda batch: [_fake_judge0(item[1]) for item in batch], autospec=False,
+)
+@mock.patch.object(
+    CodeExecutionService, "_run_on_judge0",
+    side_effect=lambda submission_data, comparison=None: _fake_judge0(submission_data), autospec=False,
+)
+class TimedLimitsTests(TestCase):
+    """速度分档计时模式：与参考答案一样快的代码在校准后的限制下不超时"""
+
+    def setUp(self):
+        teacher = User.objects.create_user(username="teacher", password="x", role="teacher")
+        self.student = User.objects.create_user(username="student", password="x", role="student")
+        self.task = Task.objects.create(
+            title="加法",
+            description="a+b",
+            language="python",
+            class_obj=Class.objects.create(name="算法", teacher=teacher),
+            created_by=teacher,
+            solution_mode="function",
+            function_name="add",
+            reference_solution="def add(a, b):\n    return a + b\n",
+            scoring_mode="speed_tiers",
+        )
+        self.case = TaskTestCase.objects.create(task=self.task, input_data="1 2", expected_output="3")
+        compile_grading_plan(self.task)
+
+    def test_reference_speed_passes_calibrated_limits(self, *mocks):
+        report = calibrate_task(self.task, repeat=3)
+        self.assertEqual(report["calibrated"], 1)
+        self.case.refresh_from_db()
+        # 按单次调用校准：0.4秒 × 3倍
+        self.assertAlmostEqual(self.case.cpu_time_limit, 1.2)
+
+        report = time_reference_solution(self.task, repeat=1)
+        self.assertEqual(report["timed"], 1, report)
+        self.case.refresh_from_db()
+        self.assertAlmostEqual(self.case.reference_time, REFERENCE_CPU * settings.SPEED_TIMING_REPEAT)
+
+        self.task.refresh_from_db()
+        executed = run_test_cases(
+            CodeExecutionService(), self.task, [self.case], self.task.reference_solution, "python",
+        )
+        [(test_case, result)] = executed
+        self.assertTrue(result["passed"], result)
+        self.assertEqual(case_credit(self.task, test_case, True, float(result["time_used"])), 1.0)
+
+    def test_timed_limits_capped(self, *mocks):
+        limits = run_limits(ExecutionLimits(4.0, 9.0, 1024, 1024), {"runs": [[1, 2]], "repeat": 5})
+        self.assertEqual(limits.cpu_time, settings.JUDGE0_MAX_CPU_TIME_LIMIT)
+        self.assertEqual(limits.wall_time, settings.JUDGE0_MAX_WALL_TIME_LIMIT)
+        self.assertEqual(run_limits(ExecutionLimits(4.0, 9.0, 1024, 1024), None).cpu_time, 4.0)
+
+
+class TimedHarnessOutputTests(SimpleTestCase):
+    """计时模式重复执行时，函数自己的输出只出现一次"""
+
+    def _run(self, timing):
+        source, stdin, error = CodeExecutionService()._prepare_source(
+            source_code="def add(a, b):\n    print('calc')\n    return a + b\n",
+            language="python",
+            stdin="1 2",
+            solution_mode="function",
+            function_name="add",
+            template_code=None,
+            arguments=[1, 2],
+            timing=timing,
+        )
+        self.assertIsNone(error)
+        completed = subprocess.run([sys.executable, "-c", source], input=stdin, capture_output=True, text=True)
+        return completed.stdout
+
+    def test_repeats_do_not_repeat_output(self):
+        timed = self._run({"runs": [[1, 2]], "repeat": 5, "echo": True, "nonce": "n"})
+        self.assertEqual(timed, self._run(None))
+        self.assertEqual(timed, "calc\n3\n")
+
+
+@mock.patch.object(CodeExecutionService, "preflight", return_value=None)
+class FinalizeSubmissionTests(TestCase):
+    """补跑隐藏用例：基础设施错误不能变成最终的0分"""
+
+    def setUp(self):
+        teacher = User.objects.create_user(username="teacher", password="x", role="teacher")
+        student = User.objects.create_user(username="student", password="x", role="student")
+        task = Task.objects.create(
+            title="加法",
+            description="a+b",
+            language="python",
+            class_obj=Class.objects.create(name="算法", teacher=teacher),
+            created_by=teacher,
+            deferred_hidden_grading=True,
+        )
+        TaskTestCase.objects.bulk_create([
+            TaskTestCase(task=task, input_data="1 2", expected_output="3", is_hidden=True, order=i)
+            for i in range(2)
+        ])
+        compile_grading_plan(task)
+        self.submission = Submission.objects.create(
+            task=task, student=student, code_content="print(3)", language="python", score=0, provisional=True,
+        )
+
+    def test_infrastructure_error_keeps_provisional(self, *mocks):
+        outcomes = [dict(PASSED_RESULT), {"success": False, "error": "执行队列繁忙，请稍后重试"}]
+        with mock.patch.object(CodeExecutionService, "execute_code", side_effect=outcomes):
+            self.assertFalse(finalize_submission(self.submission))
+        self.submission.refresh_from_db()
+        self.assertTrue(self.submission.provisional)
+        self.assertFalse(self.submission.test_results.exists())
+
+        # 下次补跑成功后才确定最终成绩
+        with mock.patch.object(CodeExecutionService, "execute_code", side_effect=lambda **kwargs: dict(PASSED_RESULT)):
+            self.assertTrue(finalize_submission(self.submission))
+        self.submission.refresh_from_db()
+        self.assertFalse(self.submission.provisional)
+        self.assertEqual(self.submission.score, 100)
+
+
+class TracebackLineTests(SimpleTestCase):
+    """包装后的Python代码运行出错时，回溯中的行号对应学生代码"""
+
+    def test_runtime_error_line_maps_to_user_code(self):
+        service = CodeExecutionService()
+        code = "def add(a, b):\n    total = a + b\n    return total / 0\n"
+        submission_data, comparison, error = service._build_submission(
+            source_code=code, language="python", stdin="1 2", function_name="add", arguments=[1, 2],
+        )
+        self.assertIsNone(error)
+        with tempfile.TemporaryDirectory() as workdir:
+            # 与判题机一样以script.py执行
+            path = os.path.join(workdir, "script.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(submission_data["source_code"])
+            completed = subprocess.run(
+                [sys.executable, "script.py"], cwd=workdir, input=submission_data["stdin"],
+                capture_output=True, text=True,
+            )
+        self.assertIn("ZeroDivisionError", completed.stderr)
+        result = service._finished_result(
+            {"status": {"id": 11, "description": "Runtime Error (NZEC)"}, "stderr": completed.stderr},
+            comparison,
+        )
+        self.assertIn('script.py", line 3, in add', result["stderr"])
+        self.assertIn("line 3, in add", result["error"])
+
+
+class FairShareSchedulerTests(SimpleTestCase):
+    """两级公平排队：班级间按虚拟时间轮转，学生并发、重任务和低优先级任务受限"""
+
+    def _wait_until(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "等待调度器状态超时")
+            time.sleep(0.005)
+
+    def _enqueue(self, scheduler, order, label, **kwargs):
+        """在线程中排队，获得槽位后记录标签并立即归还；返回前确认已进入等待队列"""
+        def run():
+            with scheduler.slot(**kwargs):
+                order.append(label)
+
+        waiting = scheduler.waiting
+        thread = threading.Thread(target=run)
+        thread.start()
+        self._wait_until(lambda: scheduler.waiting > waiting or label in order)
+        return thread
+
+    def _drain(self, scheduler, holder, threads):
+        scheduler.release(holder)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(scheduler.running, 0)
+
+    def test_classes_take_turns(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        holder = scheduler.acquire("x", "x1")
+        order = []
+        threads = [self._enqueue(scheduler, order, "a", class_key="a", student_key="a1") for _ in range(3)]
+        threads.append(self._enqueue(scheduler, order, "b", class_key="b", student_key="b1"))
+        self._drain(scheduler, holder, threads)
+        # 后到的b班级不必等a班级的全部任务完成
+        self.assertEqual(order, ["a", "b", "a", "a"])
+
+    def test_students_take_turns_within_class(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        holder = scheduler.acquire("x", "x1")
+        order = []
+        threads = [self._enqueue(scheduler, order, "s1", class_key="a", student_key="s1") for _ in range(2)]
+        threads.append(self._enqueue(scheduler, order, "s2", class_key="a", student_key="s2"))
+        self._drain(scheduler, holder, threads)
+        self.assertEqual(order, ["s1", "s2", "s1"])
+
+    def test_per_student_cap(self):
+        scheduler = FairShareScheduler(max_concurrency=2, max_per_student=1)
+        first = scheduler.acquire("a", "s1")
+        with self.assertRaises(SchedulerTimeout):
+            scheduler.acquire("a", "s1", timeout=0.05)
+        # 其他学生不受影响
+        other = scheduler.acquire("a", "s2", timeout=0.05)
+        scheduler.release(first)
+        scheduler.release(other)
+        self.assertEqual(scheduler.running, 0)
+
+    def test_heavy_cap(self):
+        scheduler = FairShareScheduler(max_concurrency=3, heavy_cost=2, max_heavy=1)
+        heavy = scheduler.acquire("a", "s1", cost=3)
+        with self.assertRaises(SchedulerTimeout):
+            scheduler.acquire("a", "s2", cost=3, timeout=0.05)
+        light = scheduler.acquire("a", "s2", cost=1, timeout=0.05)
+        scheduler.release(heavy)
+        scheduler.release(scheduler.acquire("a", "s3", cost=3, timeout=0.05))
+        scheduler.release(light)
+
+    def test_low_priority_waits_for_normal_work(self):
+        scheduler = FairShareScheduler(max_concurrency=1, max_low_priority=1)
+        holder = scheduler.acquire("x", "x1")
+        order = []
+        threads = [self._enqueue(scheduler, order, "low", class_key="a", student_key="s1", low_priority=True)]
+        threads.append(self._enqueue(scheduler, order, "normal", class_key="a", student_key="s2"))
+        self._drain(scheduler, holder, threads)
+        self.assertEqual(order, ["normal", "low"])
+
+    def test_idle_flows_forgotten(self):
+        scheduler = FairShareScheduler(max_concurrency=1)
+        holder = scheduler.acquire("a", "s1")
+        with self.assertRaises(SchedulerTimeout):
+            scheduler.acquire("b", "s2", timeout=0.01)
+        scheduler.release(holder)
+        self.assertEqual((scheduler._classes, scheduler._students, scheduler._queues), ({}, {}, {}))
+
+
+class PreflightTests(SimpleTestCase):
+    """本地预检：按Judge0的Python 3.8语法检查，错误行号映射回学生代码"""
+
+    PREFIX = "import json\n\n\n"
+
+    def test_python_syntax_error_line(self):
+        code = "def add(a, b):\n    return a +\n"
+        result = preflight.check_python(self.PREFIX + code + "\nprint(add(1, 2))\n", code)
+        self.assertTrue(result["preflight"])
+        self.assertEqual(result["line"], 2)
+        self.assertIn("第2行", result["compile_output"])
+
+    def test_python_rejects_newer_syntax(self):
+        # match语句是3.10语法，本地解释器能解析，但判题机上的3.8会报语法错误
+        code = "def f(x):\n    match x:\n        case 1:\n            return 1\n"
+        self.assertIsNotNone(preflight.check_python(code, code))
+        self.assertIsNone(preflight.check_python("def f(x):\n    return (y := x)\n", "def f(x):\n    return (y := x)\n"))
+
+    def test_user_line(self):
+        code = "\n\ndef f():\n    pass\n"
+        wrapped = self.PREFIX + code.strip() + "\n\nf()\n"
+        self.assertEqual(preflight._user_line(wrapped, code, 5), (4, True))
+        self.assertEqual(preflight._user_line(wrapped, code, 1), (1, False))
+        self.assertEqual(preflight._user_line(wrapped, code, 7), (7, False))
+
+    def test_user_line_reindented(self):
+        # Java方法体包装时重新缩进，按行内容匹配
+        code = "int x = 1;\nreturn x + y;"
+        wrapped = "class Main {\n    int f() {\n        int x = 1;\n        return x + y;\n    }\n}\n"
+        self.assertEqual(preflight._user_line(wrapped, code, 4), (2, True))
+
+    def test_java_brackets(self):
+        code = "int f() {\n    return (1 + 2;\n}"
+        wrapped = "class Main {\n" + code + "\n}\n"
+        result = preflight.check_java(wrapped, code)
+        # 未闭合的 '(' 在遇到 '}' 时发现
+        self.assertEqual(result["line"], 3)
+        self.assertIn("'}'", result["compile_output"])
+        self.assertIsNone(preflight.check_java("class Main {\n}\n", "class Main {\n}\n"))
+
+    @override_settings(PREFLIGHT_USE_JAVAC=True)
+    def test_javac_results_cached(self):
+        cache.clear()
+        source = "class Main {\n}\n"
+        with mock.patch.object(preflight.shutil, "which", return_value="/usr/bin/javac"), \
+                mock.patch.object(preflight, "_check_java_javac", return_value=None) as javac:
+            self.assertIsNone(preflight.check_java(source, source))
+            self.assertIsNone(preflight.check_java(source, source))
+            self.assertEqual(javac.call_count, 1)
+            preflight.check_java(source + "\n", source)
+            self.assertEqual(javac.call_count, 2)
+
+    def test_javac_off_by_default(self):
+        with mock.patch.object(preflight, "_check_java_javac") as javac:
+            preflight.check_java("class Main {\n}\n", "class Main {\n}\n")
+        javac.assert_not_called()
+
+
+class ComparatorTests(SimpleTestCase):
+    """输出比较方式，以及规范化后的期望输出与原期望输出比较结果一致"""
+
+    def test_exact(self):
+        self.assertTrue(compare("3\n", "3", EXACT))
+        self.assertTrue(compare("3", "3 \n\n", EXACT))
+        self.assertFalse(compare("3 4", "3  4", EXACT))
+        self.assertFalse(compare("34", "3", EXACT))
+
+    def test_whitespace(self):
+        self.assertTrue(compare("1   2\t3\n4\n\n", "1 2 3\n4", WHITESPACE))
+        self.assertFalse(compare("1 2\n3", "1 2 3", WHITESPACE))
+        self.assertFalse(compare("1 2", "1 2\n3", WHITESPACE))
+
+    def test_tokens(self):
+        self.assertTrue(compare("1 2\n3", "1\n2 3", TOKENS))
+        self.assertFalse(compare("1 2", "1 2 3", TOKENS))
+
+    def test_float_tolerance(self):
+        self.assertTrue(compare("0.3333333", "0.33333333", FLOAT))
+        self.assertFalse(compare("0.334", "0.333", FLOAT))
+        self.assertTrue(compare("0.334", "0.333", FLOAT, tolerance=0.01))
+        # 大数按相对误差比较
+        self.assertTrue(compare("1000000001", "1000000000", FLOAT, tolerance=1e-6))
+        self.assertTrue(compare("nan", "NaN", FLOAT))
+        self.assertFalse(compare("1.0 abc", "1.0 abd", FLOAT))
+        self.assertFalse(compare("1.0", "1.0 2.0", FLOAT))
+
+    def test_unordered_lines(self):
+        self.assertTrue(compare("b\na  1\na 1\n", "a 1\nb\na 1", UNORDERED_LINES))
+        self.assertFalse(compare("a\nb", "a\na\nb", UNORDERED_LINES))
+        self.assertFalse(compare("a\na\nb", "a\nb", UNORDERED_LINES))
+
+    def test_normalized_expected_compares_the_same(self):
+        expected = "  1   2 \n3\t4\n\n"
+        for mode in (EXACT, WHITESPACE, TOKENS, FLOAT, UNORDERED_LINES):
+            normalized = normalize_expected(expected, mode)
+            for actual in ("1 2\n3 4", "  1   2\n3\t4", "3 4\n1 2", "1 2 3 4", "1 2\n3 5"):
+                self.assertEqual(
+                    compare(actual, normalized, mode), compare(actual, expected, mode), (mode, actual),
+                )
+
+
+class OutputDiffTests(SimpleTestCase):
+    """输出对比：定位第一个不一致处，上下文、行长度和扫描量都有上限"""
+
+    def test_first_mismatch_with_context(self):
+        actual = "\n".join(str(i) for i in range(10)) + "\n"
+        expected = actual.replace("5\n", "50\n")
+        diff = output_diff(actual, expected, context=2)
+        self.assertFalse(diff["identical"])
+        self.assertEqual(diff["first_mismatch_line"], 6)
+        self.assertEqual(diff["column"], 2)
+        self.assertEqual(
+            [(line["line"], line["type"]) for line in diff["lines"]],
+            [(4, "same"), (5, "same"), (6, "actual"), (6, "expected"), (7, "same"), (8, "same")],
+        )
+
+    def test_identical_in_mode(self):
+        self.assertTrue(output_diff("1  2\n", "1 2", WHITESPACE)["identical"])
+        self.assertTrue(output_diff("1.0000001", "1.0", FLOAT)["identical"])
+        self.assertTrue(output_diff("b\na", "a\nb", UNORDERED_LINES)["identical"])
+
+    def test_missing_lines(self):
+        diff = output_diff("1\n2", "1\n2\n3\n")
+        self.assertEqual(diff["first_mismatch_line"], 3)
+        self.assertEqual(diff["lines"][-1], {"line": 3, "type": "expected", "text": "3"})
+        self.assertIsNone(diff["char_diff"])
+
+    def test_long_line_clipped(self):
+        expected = "a" * 1000 + "b" + "a" * 1000
+        diff = output_diff("a" * 2001, expected, max_line_chars=40)
+        char_diff = diff["char_diff"]
+        self.assertEqual(char_diff["column"], 1001)
+        self.assertEqual(len(char_diff["expected"]), 40)
+        self.assertIn("b", char_diff["expected"])
+        self.assertTrue(char_diff["head_truncated"] and char_diff["tail_truncated"])
+        self.assertTrue(all(len(line["text"]) <= 41 for line in diff["lines"]))
+
+    def test_scan_truncated(self):
+        big = "x\n" * 1000
+        diff = output_diff(big + "y", big + "z", max_scan_chars=100)
+        self.assertTrue(diff["truncated"])
+        self.assertIsNone(diff["identical"])
+        diff = output_diff("y\n" + big, "z\n" + big, max_scan_chars=100)
+        self.assertEqual(diff["first_mismatch_line"], 1)
+        self.assertTrue(diff["truncated"])
+
+
+class AttemptCounterTests(TestCase):
+    """测试次数计数：F()原子递增、并发插入冲突改为递增、按测试尝试记录回填"""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username="teacher", password="x", role="teacher")
+        cls.student = User.objects.create_user(username="student", password="x", role="student")
+        cls.other = User.objects.create_user(username="other", password="x", role="student")
+        cls.task = Task.objects.create(
+            title="加法",
+            description="a+b",
+            language="python",
+            class_obj=Class.objects.create(name="算法", teacher=teacher),
+            created_by=teacher,
+        )
+
+    def _attempt(self, student):
+        return TestAttempt(task=self.task, student=student, code_content="print(3)", language="python")
+
+    def test_increment(self):
+        increment_attempt_counts({(self.task.id, self.student.id): 1})
+        increment_attempt_counts({(self.task.id, self.student.id): 2, (self.task.id, self.other.id): 1})
+        self.assertEqual(attempt_count(self.task, self.student), 3)
+        self.assertEqual(attempt_counts(self.task), {self.student.id: 3, self.other.id: 1})
+
+    def test_concurrent_insert_falls_back_to_increment(self):
+        key = (self.task.id, self.student.id)
+        real_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            # 第一次递增时还没有计数行，模拟此时另一个请求抢先插入
+            if not calls:
+                calls.append(1)
+                AttemptCounter.objects.create(task_id=key[0], student_id=key[1], count=5)
+                return 0
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", update):
+            increment_attempt_counts({key: 2})
+        self.assertEqual(attempt_count(self.task, self.student), 7)
+
+    def test_record_attempts(self):
+        record_attempts([self._attempt(self.student), self._attempt(self.student), self._attempt(self.other)])
+        self.assertEqual(attempt_counts(self.task), {self.student.id: 2, self.other.id: 1})
+        record_attempts([self._attempt(self.student)], count=False)
+        self.assertEqual(TestAttempt.objects.filter(student=self.student).count(), 3)
+        self.assertEqual(attempt_count(self.task, self.student), 2)
+
+    def test_backfill_overwrites_counters(self):
+        record_attempts([self._attempt(self.student), self._attempt(self.other)], count=False)
+        TestAttempt.objects.bulk_create([self._attempt(self.student) for _ in range(2)])
+        AttemptCounter.objects.create(task=self.task, student=self.student, count=99)
+        call_command("backfill_attempt_counters", stdout=io.StringIO())
+        self.assertEqual(attempt_counts(self.task), {self.student.id: 3, self.other.id: 1})
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    """准入控制：先登记租约再判断，并发请求不会超出容量"""
+
+    def setUp(self):
+        cache.clear()
+        # 超出容量即拒绝
+        self.controller = AdmissionController("test", capacity=3, max_wait=0, default_service_time=1.0)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_concurrent_admissions_respect_capacity(self):
+        barrier = threading.Barrier(20)
+        outcomes = []
+
+        def admit():
+            barrier.wait()
+            outcomes.append(self.controller.try_admit())
+
+        real_uuid4 = uuid.uuid4
+
+        def slow_uuid4():
+            # 放大并发请求之间的交错，检查和登记分开执行时必然超出容量
+            time.sleep(0.01)
+            return real_uuid4()
+
+        threads = [threading.Thread(target=admit) for _ in range(20)]
+        with mock.patch("submissions.admission.uuid.uuid4", side_effect=slow_uuid4):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+        admitted = [token for ok, _, token in outcomes if ok]
+        self.assertEqual(len(admitted), 3)
+        # 被拒绝的请求已释放租约
+        self.assertEqual(self.controller.stats()["in_flight"], 3)
+        self.assertEqual(self.controller.stats()["decisions"], {"admitted": 3, "rejected": 17})
+
+        for token in admitted:
+            self.controller.release(token, time.monotonic())
+        self.assertEqual(self.controller.stats()["in_flight"], 0)
+        admitted, _, token = self.controller.try_admit()
+        self.assertTrue(admitted)
+        self.controller.release(token, time.monotonic())
@@ -4,11 +4,14 @@ from .views import (
     submit_code,
     my_submissions,
     submission_detail,
+    test_result_diff,
     class_submissions,
     export_grades,
     ExportGradesView,
     get_code_analysis,
     task_statistics,
+    execution_metrics,
+    execution_telemetry,
 )
 
 app_name = "submissions"
@@ -19,8 +22,11 @@ urlpatterns = [
     path("tasks/<int:task_id>/submit/", submit_code, name="submit_code"),
     path("tasks/<int:task_id>/analysis/", get_code_analysis, name="get_code_analysis"),
     path("tasks/<int:task_id>/statistics/", task_statistics, name="task_statistics"),
+    path("metrics/", execution_metrics, name="execution_metrics"),
+    path("telemetry/", execution_telemetry, name="execution_telemetry"),
     path("my/", my_submissions, name="my_submissions"),
     path("classes/<int:class_id>/", class_submissions, name="class_submissions"),
+    path("results/<int:result_id>/diff/", test_result_diff, name="test_result_diff"),
     path("<int:submission_id>/", submission_detail, name="submission_detail"),
 ]
 
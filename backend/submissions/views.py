@@ -6,7 +6,9 @@ from django.views import View
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.http import HttpResponse
+from django.conf import settings
 from .models import Submission, TestResult, TestAttempt
 from .serializers import (
     SubmissionSerializer,
@@ -16,8 +18,32 @@ from .serializers import (
 )
 from tasks.models import Task, TestCase
 from .services import CodeExecutionService
+from .grading import (
+    order_by_failure_history,
+    run_test_cases,
+    preflight_saved_runs,
+    result_record,
+    save_submission,
+    compute_score,
+    case_credit,
+    telemetry,
+    use_two_phase_grading,
+    code_hash,
+    test_case_fingerprint,
+    attempt_results,
+    speculative_results,
+    schedule_speculative_hidden_run,
+)
 from .export import export_submissions_to_excel, export_submissions_to_csv
-from users.permissions import IsTeacherOrAdmin
+from users.permissions import IsTeacherOrAdmin, IsAdmin
+from .admission import admission_controlled, shared_metrics
+from .sampling import sample_seed, stratified_sample, estimate_pass_rate
+from .diff import result_diff
+from .attempt_buffer import save_attempt
+from .attempts import attempt_count, attempt_counts
+from .telemetry import BUCKETS, MAX_WINDOW_DAYS, aggregate_telemetry
+from .complexity import schedule_complexity_estimate
+from . import metrics
 
 import time
 import requests
@@ -26,6 +52,7 @@ import json
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@admission_controlled("execution")
 def test_code(request, task_id):
     """测试代码（不保存提交）"""
     user = request.user
@@ -47,6 +74,9 @@ def test_code(request, task_id):
     
     code_content = serializer.validated_data["code_content"]
     language = serializer.validated_data["language"]
+    fail_fast = serializer.validated_data["fail_fast"]
+    mode = serializer.validated_data["mode"]
+    sample_size = serializer.validated_data.get("sample_size") or settings.QUICK_FEEDBACK_SAMPLE_SIZE
     
     # 验证语言匹配
     if language != task.language:
@@ -56,60 +86,99 @@ def test_code(request, task_id):
         )
     
     # 获取测试用例（只获取非隐藏的）
-    test_cases = task.test_cases.filter(is_hidden=False).order_by("order")
+    test_cases = list(task.test_cases.filter(is_hidden=False).order_by("order"))
     
-    if not test_cases.exists():
+    if not test_cases:
         return Response({"error": "该任务没有测试用例"}, status=status.HTTP_400_BAD_REQUEST)
     
+    # 抽样模式：大型测试集只运行加权分层抽样得到的部分用例，并估计整体通过率
+    sample_layers = None
+    population_count = len(test_cases)
+    if mode == "sample" and len(test_cases) > sample_size:
+        seed = sample_seed(task.id, user.id, code_hash(code_content, language))
+        test_cases, sample_layers = stratified_sample(
+            test_cases, sample_size, seed, strata_count=settings.QUICK_FEEDBACK_STRATA
+        )
+    
+    # 快速失败模式：历史失败率高的用例先跑，第一个失败即停止
+    run_order = order_by_failure_history(task, test_cases) if fail_fast else test_cases
+    
     # 执行代码测试
-    execution_service = CodeExecutionService()
+    execution_service = CodeExecutionService(class_id=task.class_obj_id, student_id=user.id)
     start_time = time.time()
     
+    executed_pairs = run_test_cases(
+        execution_service, task, run_order, code_content, language, fail_fast=fail_fast
+    )
+    executed = {test_case.id: result for test_case, result in executed_pairs}
+    
+    # 按用例原顺序返回，未执行的用例标记为skipped
     test_results = []
     for test_case in test_cases:
-        result = execution_service.execute_code(
-            source_code=code_content,
-            language=language,
-            stdin=test_case.input_data,
-            expected_output=test_case.expected_output,
-            solution_mode=task.solution_mode,
-            function_name=task.function_name,
-            template_code=task.template_code,
-        )
-        
-        test_results.append({
-            "test_case_id": test_case.id,
-            "input_data": test_case.input_data,
-            "expected_output": test_case.expected_output,
-            **result,
-        })
+        if test_case.id in executed:
+            test_results.append({
+                "test_case_id": test_case.id,
+                "test_case_hash": test_case_fingerprint(test_case),
+                "input_data": test_case.input_data,
+                **executed[test_case.id],
+                # 执行结果中的期望输出是评测计划规范化后的文本（如排序后的行），展示教师填写的原文
+                "expected_output": test_case.expected_output,
+                "telemetry": telemetry(executed[test_case.id]),
+            })
+        else:
+            test_results.append({
+                "test_case_id": test_case.id,
+                "input_data": test_case.input_data,
+                "expected_output": test_case.expected_output,
+                "passed": False,
+                "skipped": True,
+            })
     
     total_time = time.time() - start_time
     
-    # 记录测试尝试
-    TestAttempt.objects.create(
+    # 记录测试尝试（测试次数同步递增；写缓冲开启时记录本身由后台批量写入）
+    save_attempt(TestAttempt(
         task=task,
         student=user,
         code_content=code_content,
+        code_hash=code_hash(code_content, language),
         language=language,
         test_results={"results": test_results},
-    )
+    ))
     
     # 计算通过数
     passed_count = sum(1 for r in test_results if r.get("passed", False))
     total_count = len(test_results)
+    skipped_count = total_count - len(executed)
     
-    return Response({
+    # 可见用例全部通过，学生很可能马上提交：后台低优先级预跑隐藏用例
+    if sample_layers is None and passed_count == total_count:
+        schedule_speculative_hidden_run(task, user, code_content, language)
+    
+    response_data = {
         "success": True,
         "test_results": test_results,
         "passed_count": passed_count,
         "total_count": total_count,
+        "skipped_count": skipped_count,
+        "preflight_saved_runs": preflight_saved_runs(executed_pairs),
         "total_time": total_time,
-    })
+    }
+    if sample_layers is not None:
+        response_data["sample"] = {
+            "sample_size": total_count,
+            "population_size": population_count,
+            **estimate_pass_rate(
+                sample_layers,
+                {test_case_id: result.get("passed", False) for test_case_id, result in executed.items()},
+            ),
+        }
+    return Response(response_data)
 
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@admission_controlled("execution")
 def submit_code(request, task_id):
     """提交代码（保存并评分）"""
     user = request.user
@@ -145,90 +214,80 @@ def submit_code(request, task_id):
     if not test_cases.exists():
         return Response({"error": "该任务没有测试用例"}, status=status.HTTP_400_BAD_REQUEST)
     
+    # 截止时间前后的高峰期：先评测可见用例给出临时成绩，隐藏用例排队到低峰期补跑
+    provisional = use_two_phase_grading(task)
+    if provisional:
+        test_cases = test_cases.filter(is_hidden=False)
+    
     # 执行代码测试
-    execution_service = CodeExecutionService()
+    execution_service = CodeExecutionService(class_id=task.class_obj_id, student_id=user.id)
     start_time = time.time()
     
-    test_results_data = []
-    total_weight = 0.0
-    passed_weight = 0.0
+    # 复用同一份代码最近一次练习运行的可见用例结果，以及推测执行的隐藏用例结果
+    digest = code_hash(code_content, language)
+    known_results = attempt_results(task, user, digest, test_cases)
+    known_results.update(speculative_results(task, digest, test_cases))
     
-    for test_case in test_cases:
-        result = execution_service.execute_code(
-            source_code=code_content,
-            language=language,
-            stdin=test_case.input_data,
-            expected_output=test_case.expected_output,
-            solution_mode=task.solution_mode,
-            function_name=task.function_name,
-            template_code=task.template_code,
-        )
-        
-        passed = result.get("passed", False)
-        total_weight += test_case.weight
-        if passed:
-            passed_weight += test_case.weight
-        
-        test_results_data.append({
-            "test_case": test_case,
-            "passed": passed,
-            "output": result.get("stdout", ""),
-            "error_message": result.get("stderr") or result.get("compile_output") or result.get("error", ""),
-            "execution_time": float(result.get("time_used", 0)) or 0.0,
-        })
+    executed_pairs = run_test_cases(
+        execution_service, task, test_cases, code_content, language, known_results=known_results
+    )
+    test_results_data = [result_record(test_case, result) for test_case, result in executed_pairs]
     
     total_time = time.time() - start_time
     
     # 计算分数
-    if total_weight > 0:
-        score = (passed_weight / total_weight) * 100
-    else:
-        score = 0.0
+    score = compute_score(
+        (r["test_case"], case_credit(task, r["test_case"], r["passed"], r["execution_time"]))
+        for r in test_results_data
+    )
     
     # 获取测试次数
-    test_count = TestAttempt.objects.filter(task=task, student=user).count()
+    test_count = attempt_count(task, user)
     
     # 获取学生作答总时间（如果前端提供了）
     completion_time = serializer.validated_data.get("completion_time")
     # 如果提供了学生作答总时间，使用它；否则使用代码运行时间
     final_total_time = completion_time if completion_time is not None else total_time
     
-    # 创建或更新提交
-    submission, created = Submission.objects.update_or_create(
-        task=task,
-        student=user,
-        defaults={
-            "code_content": code_content,
-            "language": language,
-            "score": score,
-            "test_count": test_count,
-            "total_time": final_total_time,  # 保存学生作答总时间或代码运行时间
-        }
-    )
+    # 创建或更新提交，并替换其测试结果（同一事务）
+    submission, created = save_submission(task, user, test_results_data, {
+        "code_content": code_content,
+        "language": language,
+        "score": score,
+        "test_count": test_count,
+        "total_time": final_total_time,  # 保存学生作答总时间或代码运行时间
+        "provisional": provisional,
+        "finalized_at": None if provisional else timezone.now(),
+        # 代码已变化，之前的复杂度估算失效
+        "complexity_class": None,
+        "complexity_timings": None,
+        "complexity_ok": None,
+    })
     
-    # 删除旧的测试结果
-    submission.test_results.all().delete()
-    
-    # 创建新的测试结果
-    for result_data in test_results_data:
-        TestResult.objects.create(
-            submission=submission,
-            test_case=result_data["test_case"],
-            passed=result_data["passed"],
-            output=result_data["output"],
-            error_message=result_data["error_message"],
-            execution_time=result_data["execution_time"],
-        )
+    # 一次取出提交及其测试结果（含用例），序列化时不再逐条查询
+    submission = (
+        Submission.objects.select_related("task", "student")
+        .prefetch_related(Prefetch("test_results", queryset=TestResult.objects.select_related("test_case")))
+        .get(pk=submission.pk)
+    )
     
+    # 全部用例通过时在后台估算时间复杂度（临时成绩等隐藏用例评测后再估算）
+    complexity_pending = not provisional and schedule_complexity_estimate(
+        submission, all(r["passed"] for r in test_results_data)
+    )
     serializer = SubmissionDetailSerializer(submission)
     return Response({
         "message": "提交成功",
+        "complexity_pending": complexity_pending,
         "submission": serializer.data,
+        "provisional": provisional,
+        "preflight_saved_runs": preflight_saved_runs(executed_pairs),
     }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@admission_controlled("analysis")
 def get_code_analysis(request, task_id):
     """获取代码解析（使用DeepSeek Coder分析问题思路）"""
     user = request.user
@@ -448,6 +507,69 @@ def get_code_analysis(request, task_id):
     }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
+@api_view(["GET"])
+@permission_classes([IsTeacherOrAdmin])
+def execution_telemetry(request):
+    """
+    按任务、语言汇总执行遥测（CPU时间、内存、排队时间、端到端耗时的百分位数）
+    
+    查询参数：task_id、language、days（默认7）、bucket（hour/day，默认day）、
+    source（submissions 提交评测，practice 练习运行，默认submissions）。
+    教师只能查看自己班级的任务。
+    """
+    user = request.user
+    params = request.query_params
+    try:
+        days = int(params.get("days", 7))
+    except ValueError:
+        return Response({"error": "days必须是整数"}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= days <= MAX_WINDOW_DAYS:
+        return Response({"error": f"days必须在1到{MAX_WINDOW_DAYS}之间"}, status=status.HTTP_400_BAD_REQUEST)
+    bucket = params.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return Response({"error": "bucket只能是hour或day"}, status=status.HTTP_400_BAD_REQUEST)
+    source = params.get("source", "submissions")
+    if source not in ("submissions", "practice"):
+        return Response({"error": "source只能是submissions或practice"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    tasks = Task.objects.all()
+    if not user.is_admin:
+        tasks = tasks.filter(class_obj__teacher=user)
+    task_id = params.get("task_id")
+    if task_id:
+        tasks = tasks.filter(id=task_id)
+        if not tasks.exists():
+            return Response({"error": "任务不存在或无权限查看"}, status=status.HTTP_404_NOT_FOUND)
+    task_ids = None if user.is_admin and not task_id else list(tasks.values_list("id", flat=True))
+    
+    return Response({
+        "days": days,
+        "bucket": bucket,
+        "source": source,
+        "series": aggregate_telemetry(
+            task_ids=task_ids,
+            language=params.get("language"),
+            days=days,
+            bucket=bucket,
+            source=source,
+        ),
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAdmin])
+def execution_metrics(request):
+    """
+    导出执行相关运行指标（Prometheus文本格式，format_type=json时返回JSON）
+
+    准入控制指标取自共享缓存，其余指标只统计处理本次请求的gunicorn进程。
+    """
+    shared = shared_metrics()
+    if request.query_params.get("format_type") == "json":
+        return Response(metrics.snapshot(shared))
+    return HttpResponse(metrics.render_prometheus(shared), content_type="text/plain; version=0.0.4")
+
+
 @api_view(["GET"])
 @permission_classes([permissions.IsAuthenticated])
 def my_submissions(request):
@@ -492,6 +614,32 @@ def submission_detail(request, submission_id):
     return Response(serializer.data)
 
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def test_result_diff(request, result_id):
+    """获取未通过测试结果的期望输出与实际输出对比"""
+    try:
+        result = TestResult.objects.select_related(
+            "test_case", "submission__student", "submission__task__class_obj"
+        ).get(id=result_id)
+    except TestResult.DoesNotExist:
+        return Response({"error": "测试结果不存在"}, status=status.HTTP_404_NOT_FOUND)
+
+    user = request.user
+    submission = result.submission
+
+    # 权限检查（与提交详情一致，学生不能查看隐藏用例的期望输出）
+    if user.is_student and (submission.student != user or result.test_case.is_hidden):
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+    elif user.is_teacher and submission.task.class_obj.teacher != user:
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+
+    if result.passed:
+        return Response({"error": "该测试用例已通过"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({"result_id": result.id, "test_case_id": result.test_case_id, **result_diff(result)})
+
+
 @api_view(["GET"])
 @permission_classes([IsTeacherOrAdmin])
 def class_submissions(request, class_id):
@@ -526,6 +674,8 @@ def task_statistics(request, task_id):
     
     # 获取该任务所属班级的所有学生
     all_students = task.class_obj.students.all()
+    # 测试次数（含尚未提交的学生的练习次数）
+    test_counts = attempt_counts(task)
     
     # 构建统计数据
     statistics = []
@@ -540,7 +690,7 @@ def task_statistics(request, task_id):
             "has_submitted": submission is not None,
             "submission_id": submission.id if submission else None,
             "score": submission.score if submission else 0.0,
-            "test_count": submission.test_count if submission else 0,
+            "test_count": test_counts.get(student.id, 0),
             "total_time": submission.total_time if submission else 0.0,
             "submitted_at": submission.submitted_at.isoformat() if submission else None,
             "language": submission.language if submission else None,
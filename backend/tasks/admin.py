@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task, TestCase
+from .models import Task, TaskJob, TestCase
 
 
 class TestCaseInline(admin.TabularInline):
@@ -17,6 +17,13 @@ class TaskAdmin(admin.ModelAdmin):
 
 @admin.register(TestCase)
 class TestCaseAdmin(admin.ModelAdmin):
-    list_display = ["task", "order", "is_hidden", "weight", "created_at"]
-    list_filter = ["is_hidden", "created_at"]
+    list_display = ["task", "order", "is_hidden", "weight", "comparison_mode", "created_at"]
+    list_filter = ["is_hidden", "comparison_mode", "created_at"]
+    search_fields = ["task__title"]
+
+
+@admin.register(TaskJob)
+class TaskJobAdmin(admin.ModelAdmin):
+    list_display = ["task", "kind", "status", "completed", "total", "created_at", "finished_at"]
+    list_filter = ["kind", "status", "created_at"]
     search_fields = ["task__title"]
@@ -0,0 +1,154 @@
+"""
+任务后台作业：创建作业记录，在后台线程执行并更新进度和结果报告
+
+作业在单独的线程池（TASK_JOB_WORKERS）中执行，不与推测执行等短任务互相阻塞。
+持有作业（排队或执行中）的进程每TASK_JOB_HEARTBEAT_SECONDS秒刷新一次作业心跳；
+进程重启或被gunicorn超时杀掉后心跳停止，查询作业时把超过3个周期没有心跳的作业标记为失败。
+"""
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from submissions.background import submit_to_pool
+from submissions.calibration import calibrate_task, generate_expected_outputs, time_reference_solution
+from submissions.stress import generate_stress_tests
+
+from .models import TaskJob
+
+logger = logging.getLogger(__name__)
+
+
+def _calibrate(job: TaskJob, progress):
+    return calibrate_task(
+        job.task,
+        repeat=job.params.get("repeat"),
+        time_multiplier=job.params.get("time_multiplier"),
+        memory_multiplier=job.params.get("memory_multiplier"),
+        progress=progress,
+    )
+
+
+def _generate_outputs(job: TaskJob, progress):
+    return generate_expected_outputs(job.task, only_empty=job.params.get("only_empty", False), progress=progress)
+
+
+def _generate_tests(job: TaskJob, progress):
+    return generate_stress_tests(
+        job.task,
+        count=job.params["count"],
+        seed_start=job.params.get("seed_start", 0),
+        replace=job.params.get("replace", False),
+        progress=progress,
+    )
+
+
+def _time_reference(job: TaskJob, progress):
+    return time_reference_solution(job.task, repeat=job.params.get("repeat"), progress=progress)
+
+
+JOB_HANDLERS = {
+    "calibrate": _calibrate,
+    "generate_outputs": _generate_outputs,
+    "generate_tests": _generate_tests,
+    "time_reference": _time_reference,
+}
+
+
+def _progress_callback(job_id):
+    def progress(completed: int, total: int):
+        TaskJob.objects.filter(id=job_id).update(completed=completed, total=total)
+    return progress
+
+
+# 本进程持有（排队或执行中）的作业ID
+_held = set()
+_held_lock = threading.Lock()
+_heartbeat_pid = None
+
+# 心跳中断的作业的错误信息
+STALE_ERROR = "作业已中断（服务进程重启或超时），请重新发起"
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(settings.TASK_JOB_HEARTBEAT_SECONDS)
+        with _held_lock:
+            job_ids = list(_held)
+        if not job_ids:
+            continue
+        close_old_connections()
+        try:
+            TaskJob.objects.filter(id__in=job_ids).update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception("刷新任务作业心跳失败")
+        finally:
+            close_old_connections()
+
+
+def _hold(job_id: int):
+    """登记本进程持有的作业，按进程启动心跳线程"""
+    global _heartbeat_pid
+    with _held_lock:
+        _held.add(job_id)
+        if _heartbeat_pid != os.getpid():
+            threading.Thread(target=_heartbeat_loop, name="task-job-heartbeat", daemon=True).start()
+            _heartbeat_pid = os.getpid()
+
+
+def _release(job_id: int):
+    with _held_lock:
+        _held.discard(job_id)
+
+
+def fail_stale_jobs(queryset=None) -> int:
+    """把心跳已中断的等待中/执行中作业标记为失败，返回标记的数量"""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_JOB_HEARTBEAT_SECONDS * 3)
+    queryset = TaskJob.objects.all() if queryset is None else queryset
+    return queryset.filter(status__in=["pending", "running"]).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff)
+    ).update(status="failed", error=STALE_ERROR, finished_at=timezone.now())
+
+
+def _run_held(job_id: int):
+    try:
+        run_job(job_id)
+    finally:
+        _release(job_id)
+
+
+def run_job(job_id: int) -> TaskJob:
+    """执行作业（同步），异常记录到作业的错误信息中"""
+    job = TaskJob.objects.select_related("task").get(id=job_id)
+    # 只执行仍在等待的作业（已被标记为中断的不再执行）
+    if not TaskJob.objects.filter(id=job.id, status="pending").update(status="running", heartbeat_at=timezone.now()):
+        return job
+    # 执行较慢时可能已被fail_stale_jobs标记为中断，结束时只更新仍在执行中的作业，已失败的保持失败
+    running = TaskJob.objects.filter(id=job.id, status="running")
+    try:
+        report = JOB_HANDLERS[job.kind](job, _progress_callback(job.id))
+    except Exception as e:
+        logger.exception("任务作业执行失败: %s", job.id)
+        running.update(status="failed", error=str(e), finished_at=timezone.now())
+    else:
+        running.update(status="succeeded", report=report, finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def start_job(task, kind: str, user=None, params=None, background: bool = True) -> TaskJob:
+    """创建作业，默认提交到作业线程池执行"""
+    job = TaskJob.objects.create(
+        task=task, kind=kind, params=params or {}, created_by=user, heartbeat_at=timezone.now(),
+    )
+    if background:
+        _hold(job.id)
+        submit_to_pool("jobs", _run_held, job.id)
+        return job
+    return run_job(job.id)
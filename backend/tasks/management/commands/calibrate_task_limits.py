@@ -0,0 +1,43 @@
+"""用参考答案校准任务各测试用例的资源限制"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.jobs import start_job
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "用参考答案多次执行各测试用例，按CPU时间和内存的P95设置用例的资源限制"
+
+    def add_arguments(self, parser):
+        parser.add_argument("task_ids", nargs="+", type=int, help="任务ID")
+        parser.add_argument("--repeat", type=int, help="每个用例执行次数（默认CALIBRATION_RUNS）")
+        parser.add_argument("--time-multiplier", type=float, help="CPU时间限制相对参考答案P95的倍数")
+        parser.add_argument("--memory-multiplier", type=float, help="内存限制相对参考答案P95的倍数")
+
+    def handle(self, *args, **options):
+        params = {
+            key: options[key]
+            for key in ("repeat", "time_multiplier", "memory_multiplier")
+            if options[key] is not None
+        }
+        for task_id in options["task_ids"]:
+            try:
+                task = Task.objects.get(id=task_id)
+            except Task.DoesNotExist:
+                raise CommandError(f"任务不存在: {task_id}")
+
+            job = start_job(task, "calibrate", params=params, background=False)
+            if job.status != "succeeded":
+                self.stderr.write(self.style.ERROR(f"任务 {task_id} 校准失败: {job.error}"))
+                continue
+            for case in job.report["cases"]:
+                if "error" in case:
+                    self.stdout.write(f"  用例 {case['test_case_id']}: 未校准（{case['error'][:100]}）")
+                else:
+                    self.stdout.write(
+                        f"  用例 {case['test_case_id']}: CPU中位数 {case['cpu_median']:.3f}s P95 {case['cpu_p95']:.3f}s"
+                        f" -> 限制 {case['cpu_time_limit']}s，内存P95 {case['memory_p95']:.0f}KB -> 限制 {case['memory_limit']}KB"
+                    )
+            self.stdout.write(self.style.SUCCESS(
+                f"任务 {task_id}: 已校准 {job.report['calibrated']} 个用例，{job.report['failed']} 个失败"
+            ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_function_name_task_solution_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='deferred_hidden_grading',
+            field=models.BooleanField(default=False, verbose_name='高峰期延后评测隐藏用例'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_deferred_hidden_grading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='grading_plan',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='评测计划'),
+        ),
+    ]
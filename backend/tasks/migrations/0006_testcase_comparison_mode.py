@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_grading_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='comparison_mode',
+            field=models.CharField(choices=[('exact', '精确匹配（忽略末尾空白）'), ('whitespace', '忽略空白差异'), ('float', '浮点数容差'), ('unordered_lines', '行顺序无关'), ('tokens', '按词比较')], default='exact', max_length=20, verbose_name='比较方式'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='float_tolerance',
+            field=models.FloatField(default=1e-06, verbose_name='浮点数容差'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_testcase_comparison_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='cpu_time_limit',
+            field=models.FloatField(default=2.0, verbose_name='CPU时间限制（秒）'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='memory_limit',
+            field=models.IntegerField(default=128000, verbose_name='内存限制（KB）'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='output_limit',
+            field=models.IntegerField(default=1024, verbose_name='输出大小限制（KB）'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='wall_time_limit',
+            field=models.FloatField(default=5.0, verbose_name='运行时间限制（秒）'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='cpu_time_limit',
+            field=models.FloatField(blank=True, null=True, verbose_name='CPU时间限制（秒）'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='memory_limit',
+            field=models.IntegerField(blank=True, null=True, verbose_name='内存限制（KB）'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_limit',
+            field=models.IntegerField(blank=True, null=True, verbose_name='输出大小限制（KB）'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='wall_time_limit',
+            field=models.FloatField(blank=True, null=True, verbose_name='运行时间限制（秒）'),
+        ),
+    ]
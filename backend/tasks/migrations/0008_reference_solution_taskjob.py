@@ -0,0 +1,44 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0007_execution_limits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='reference_solution',
+            field=models.TextField(blank=True, null=True, verbose_name='参考答案'),
+        ),
+        migrations.CreateModel(
+            name='TaskJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('calibrate', '校准资源限制')], max_length=30, verbose_name='作业类型')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='参数')),
+                ('total', models.IntegerField(default=0, verbose_name='总数')),
+                ('completed', models.IntegerField(default=0, verbose_name='已完成数')),
+                ('report', models.JSONField(blank=True, null=True, verbose_name='结果报告')),
+                ('error', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_jobs', to=settings.AUTH_USER_MODEL, verbose_name='创建者')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='tasks.task', verbose_name='所属任务')),
+            ],
+            options={
+                'verbose_name': '任务作业',
+                'verbose_name_plural': '任务作业',
+                'db_table': 'task_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
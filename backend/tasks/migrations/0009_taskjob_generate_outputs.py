@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_reference_solution_taskjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskjob',
+            name='kind',
+            field=models.CharField(choices=[('calibrate', '校准资源限制'), ('generate_outputs', '生成期望输出')], max_length=30, verbose_name='作业类型'),
+        ),
+    ]
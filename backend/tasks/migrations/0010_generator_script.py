@@ -0,0 +1,28 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_taskjob_generate_outputs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='generator_script',
+            field=models.TextField(blank=True, null=True, verbose_name='用例生成脚本'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='seed',
+            field=models.IntegerField(blank=True, null=True, verbose_name='生成种子'),
+        ),
+        migrations.AlterField(
+            model_name='taskjob',
+            name='kind',
+            field=models.CharField(choices=[('calibrate', '校准资源限制'), ('generate_outputs', '生成期望输出'), ('generate_tests', '生成随机用例')], max_length=30, verbose_name='作业类型'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_generator_script'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='complexity_analysis',
+            field=models.BooleanField(default=False, verbose_name='估算时间复杂度'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='required_complexity',
+            field=models.CharField(blank=True, choices=[('O(1)', 'O(1)'), ('O(log n)', 'O(log n)'), ('O(n)', 'O(n)'), ('O(n log n)', 'O(n log n)'), ('O(n^2)', 'O(n²)'), ('O(n^3)', 'O(n³)')], max_length=20, null=True, verbose_name='要求的时间复杂度'),
+        ),
+    ]
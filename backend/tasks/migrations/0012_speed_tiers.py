@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_complexity_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='scoring_mode',
+            field=models.CharField(choices=[('pass_fail', '按通过计分'), ('speed_tiers', '按运行速度分档计分')], default='pass_fail', max_length=20, verbose_name='计分方式'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='speed_tiers',
+            field=models.JSONField(blank=True, null=True, verbose_name='速度档位'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='reference_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='参考答案运行时间（秒）'),
+        ),
+        migrations.AlterField(
+            model_name='taskjob',
+            name='kind',
+            field=models.CharField(choices=[('calibrate', '校准资源限制'), ('generate_outputs', '生成期望输出'), ('generate_tests', '生成随机用例'), ('time_reference', '测量参考答案运行时间')], max_length=30, verbose_name='作业类型'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def reset_function_reference_time(apps, schema_editor):
+    """函数模式的参考答案运行时间原为进程内计时，速度分档改用判题机统计的CPU时间后需要重新测量"""
+    TestCase = apps.get_model("tasks", "TestCase")
+    TestCase.objects.filter(task__solution_mode="function", reference_time__isnull=False).update(reference_time=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_speed_tiers'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_function_reference_time, migrations.RunPython.noop),
+    ]
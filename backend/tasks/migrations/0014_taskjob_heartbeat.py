@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_reset_function_reference_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='心跳时间'),
+        ),
+    ]
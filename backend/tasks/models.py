@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from classes.models import Class
+from submissions.comparators import COMPARISON_MODES, DEFAULT_FLOAT_TOLERANCE, EXACT
+from submissions.limits import DEFAULT_LIMITS
 
 User = get_user_model()
 
@@ -13,6 +15,21 @@ class Task(models.Model):
         ("python", "Python"),
     ]
     
+    # 时间复杂度等级（由低到高，见submissions.complexity）
+    COMPLEXITY_CHOICES = [
+        ("O(1)", "O(1)"),
+        ("O(log n)", "O(log n)"),
+        ("O(n)", "O(n)"),
+        ("O(n log n)", "O(n log n)"),
+        ("O(n^2)", "O(n²)"),
+        ("O(n^3)", "O(n³)"),
+    ]
+    
+    SCORING_CHOICES = [
+        ("pass_fail", "按通过计分"),
+        ("speed_tiers", "按运行速度分档计分"),
+    ]
+    
     title = models.CharField(max_length=200, verbose_name="任务标题")
     description = models.TextField(verbose_name="任务描述")
     language = models.CharField(
@@ -36,12 +53,45 @@ class Task(models.Model):
     # LeetCode模式支持：模板代码和函数名称
     template_code = models.TextField(null=True, blank=True, verbose_name="模板代码")
     function_name = models.CharField(max_length=100, null=True, blank=True, verbose_name="函数名称")
+    # 教师的参考答案（与学生代码使用相同的语言和代码模式），用于校准资源限制等
+    reference_solution = models.TextField(null=True, blank=True, verbose_name="参考答案")
+    # 随机用例生成脚本（Python，定义generate(seed)返回一个用例的输入，在服务器本地执行；
+    # 估算时间复杂度时调用generate_sized(n)返回规模为n的输入）
+    generator_script = models.TextField(null=True, blank=True, verbose_name="用例生成脚本")
+    # 全部用例通过后，用逐渐增大的输入测量学生代码的运行时间，估算时间复杂度（结果仅供参考，不计入成绩，
+    # required_complexity只用于提示是否满足，计时可被学生代码伪造）
+    complexity_analysis = models.BooleanField(default=False, verbose_name="估算时间复杂度")
+    required_complexity = models.CharField(
+        max_length=20,
+        choices=COMPLEXITY_CHOICES,
+        null=True,
+        blank=True,
+        verbose_name="要求的时间复杂度"
+    )
     solution_mode = models.CharField(
         max_length=20,
         choices=[("full", "完整程序"), ("function", "函数模式")],
         default="full",
         verbose_name="代码模式"
     )
+    # 计分方式：按运行速度分档时，通过的用例按相对参考答案的运行时间倍数获得部分或全部分数
+    scoring_mode = models.CharField(
+        max_length=20,
+        choices=SCORING_CHOICES,
+        default="pass_fail",
+        verbose_name="计分方式"
+    )
+    # 速度档位 [[相对参考答案的最大倍数, 得分比例], ...]，按倍数从小到大；为空时使用系统配置
+    speed_tiers = models.JSONField(null=True, blank=True, verbose_name="速度档位")
+    # 两阶段评测：截止时间前后的高峰期，提交时只即时评测可见用例，隐藏用例延后到低峰期补跑
+    deferred_hidden_grading = models.BooleanField(default=False, verbose_name="高峰期延后评测隐藏用例")
+    # 评测计划：保存任务时预先解析的用例参数、规范化的期望输出和模板骨架（见submissions.plan）
+    grading_plan = models.JSONField(null=True, blank=True, editable=False, verbose_name="评测计划")
+    # 执行资源限制（测试用例可单独覆盖）
+    cpu_time_limit = models.FloatField(default=DEFAULT_LIMITS.cpu_time, verbose_name="CPU时间限制（秒）")
+    wall_time_limit = models.FloatField(default=DEFAULT_LIMITS.wall_time, verbose_name="运行时间限制（秒）")
+    memory_limit = models.IntegerField(default=DEFAULT_LIMITS.memory, verbose_name="内存限制（KB）")
+    output_limit = models.IntegerField(default=DEFAULT_LIMITS.output_size, verbose_name="输出大小限制（KB）")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
     is_active = models.BooleanField(default=True, verbose_name="是否激活")
@@ -70,6 +120,23 @@ class TestCase(models.Model):
     is_hidden = models.BooleanField(default=False, verbose_name="是否隐藏测试")
     order = models.IntegerField(default=0, verbose_name="排序")
     weight = models.FloatField(default=1.0, verbose_name="权重")
+    # 输出比较方式（评测时在本地比较，不依赖执行后端）
+    comparison_mode = models.CharField(
+        max_length=20,
+        choices=COMPARISON_MODES,
+        default=EXACT,
+        verbose_name="比较方式"
+    )
+    float_tolerance = models.FloatField(default=DEFAULT_FLOAT_TOLERANCE, verbose_name="浮点数容差")
+    # 由生成脚本生成的用例记录其种子，手工录入的用例为空
+    seed = models.IntegerField(null=True, blank=True, verbose_name="生成种子")
+    # 参考答案在该用例上的运行时间（多次执行的中位数），速度分档计分使用
+    reference_time = models.FloatField(null=True, blank=True, verbose_name="参考答案运行时间（秒）")
+    # 执行资源限制，为空时使用任务的设置
+    cpu_time_limit = models.FloatField(null=True, blank=True, verbose_name="CPU时间限制（秒）")
+    wall_time_limit = models.FloatField(null=True, blank=True, verbose_name="运行时间限制（秒）")
+    memory_limit = models.IntegerField(null=True, blank=True, verbose_name="内存限制（KB）")
+    output_limit = models.IntegerField(null=True, blank=True, verbose_name="输出大小限制（KB）")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     
     class Meta:
@@ -80,3 +147,54 @@ class TestCase(models.Model):
     
     def __str__(self):
         return f"{self.task.title} - Test Case {self.order}"
+
+
+class TaskJob(models.Model):
+    """任务后台作业（使用参考答案校准资源限制等），记录进度和结果报告"""
+    
+    KIND_CHOICES = [
+        ("calibrate", "校准资源限制"),
+        ("generate_outputs", "生成期望输出"),
+        ("generate_tests", "生成随机用例"),
+        ("time_reference", "测量参考答案运行时间"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "等待中"),
+        ("running", "执行中"),
+        ("succeeded", "已完成"),
+        ("failed", "失败"),
+    ]
+    
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name="jobs",
+        verbose_name="所属任务"
+    )
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name="作业类型")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="状态")
+    params = models.JSONField(default=dict, blank=True, verbose_name="参数")
+    total = models.IntegerField(default=0, verbose_name="总数")
+    completed = models.IntegerField(default=0, verbose_name="已完成数")
+    report = models.JSONField(null=True, blank=True, verbose_name="结果报告")
+    error = models.TextField(blank=True, default="", verbose_name="错误信息")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="task_jobs",
+        verbose_name="创建者"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="心跳时间")
+    
+    class Meta:
+        verbose_name = "任务作业"
+        verbose_name_plural = "任务作业"
+        db_table = "task_jobs"
+        ordering = ["-created_at"]
+    
+    def __str__(self):
+        return f"{self.task.title} - {self.get_kind_display()} - {self.get_status_display()}"
@@ -1,5 +1,23 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Task, TestCase
+from submissions.plan import compile_grading_plan
+from .models import Task, TaskJob, TestCase
+
+
+def normalize_speed_tiers(value):
+    """校验速度档位 [[最大倍数, 得分比例], ...] 并按倍数从小到大排序"""
+    if value is None:
+        return value
+    try:
+        tiers = [(float(ratio), float(credit)) for ratio, credit in value]
+    except (TypeError, ValueError):
+        raise serializers.ValidationError("速度档位格式应为 [[最大倍数, 得分比例], ...]")
+    if not tiers:
+        raise serializers.ValidationError("至少需要一个速度档位")
+    for ratio, credit in tiers:
+        if ratio <= 0 or not 0 <= credit <= 1:
+            raise serializers.ValidationError("倍数必须大于0，得分比例必须在0到1之间")
+    return [list(tier) for tier in sorted(tiers)]
 
 
 class TestCaseSerializer(serializers.ModelSerializer):
@@ -9,9 +27,11 @@ class TestCaseSerializer(serializers.ModelSerializer):
         model = TestCase
         fields = [
             "id", "input_data", "expected_output", "is_hidden",
-            "order", "weight", "created_at"
+            "order", "weight", "comparison_mode", "float_tolerance",
+            "cpu_time_limit", "wall_time_limit", "memory_limit", "output_limit", "seed",
+            "reference_time", "created_at"
         ]
-        read_only_fields = ["id", "created_at"]
+        read_only_fields = ["id", "seed", "reference_time", "created_at"]
 
 
 class TestCaseCreateSerializer(serializers.ModelSerializer):
@@ -21,7 +41,8 @@ class TestCaseCreateSerializer(serializers.ModelSerializer):
         model = TestCase
         fields = [
             "input_data", "expected_output", "is_hidden",
-            "order", "weight"
+            "order", "weight", "comparison_mode", "float_tolerance",
+            "cpu_time_limit", "wall_time_limit", "memory_limit", "output_limit"
         ]
 
 
@@ -38,7 +59,9 @@ class TaskSerializer(serializers.ModelSerializer):
             "id", "title", "description", "language", "class_obj",
             "class_name", "created_by", "created_by_name", "deadline",
             "test_case_count", "is_active", "created_at", "updated_at",
-            "solution_mode", "function_name", "template_code"
+            "solution_mode", "function_name", "template_code",
+            "deferred_hidden_grading", "cpu_time_limit", "wall_time_limit",
+            "memory_limit", "output_limit"
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
     
@@ -62,9 +85,16 @@ class TaskDetailSerializer(serializers.ModelSerializer):
             "id", "title", "description", "language", "class_obj",
             "class_name", "created_by", "created_by_name", "deadline",
             "test_cases", "is_active", "created_at", "updated_at",
-            "template_code", "function_name", "solution_mode"
+            "template_code", "function_name", "solution_mode", "reference_solution",
+            "generator_script", "complexity_analysis", "required_complexity",
+            "scoring_mode", "speed_tiers",
+            "deferred_hidden_grading", "cpu_time_limit", "wall_time_limit",
+            "memory_limit", "output_limit"
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+    
+    def validate_speed_tiers(self, value):
+        return normalize_speed_tiers(value)
 
 
 class TaskCreateSerializer(serializers.ModelSerializer):
@@ -77,9 +107,16 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         fields = [
             "title", "description", "language", "class_obj",
             "deadline", "is_active", "test_cases",
-            "template_code", "function_name", "solution_mode"
+            "template_code", "function_name", "solution_mode", "reference_solution",
+            "generator_script", "complexity_analysis", "required_complexity",
+            "scoring_mode", "speed_tiers",
+            "deferred_hidden_grading", "cpu_time_limit", "wall_time_limit",
+            "memory_limit", "output_limit"
         ]
     
+    def validate_speed_tiers(self, value):
+        return normalize_speed_tiers(value)
+    
     def create(self, validated_data):
         test_cases_data = validated_data.pop("test_cases", [])
         task = Task.objects.create(**validated_data)
@@ -87,6 +124,8 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         for test_case_data in test_cases_data:
             TestCase.objects.create(task=task, **test_case_data)
         
+        # 预先构建评测计划，评测时不再逐个用例解析
+        compile_grading_plan(task)
         return task
     
     def update(self, instance, validated_data):
@@ -103,5 +142,52 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             for test_case_data in test_cases_data:
                 TestCase.objects.create(task=instance, **test_case_data)
         
+        # 任务或测试用例变化后重新构建评测计划
+        compile_grading_plan(instance)
         return instance
 
+
+
+class CalibrationSerializer(serializers.Serializer):
+    """资源限制校准参数（不传时使用系统配置）"""
+    
+    repeat = serializers.IntegerField(required=False, min_value=1, max_value=50, help_text="每个用例执行次数")
+    time_multiplier = serializers.FloatField(required=False, min_value=1.0, help_text="CPU时间限制相对参考答案P95的倍数")
+    memory_multiplier = serializers.FloatField(required=False, min_value=1.0, help_text="内存限制相对参考答案P95的倍数")
+
+
+class ReferenceTimingSerializer(serializers.Serializer):
+    """参考答案运行时间测量参数"""
+    
+    repeat = serializers.IntegerField(required=False, min_value=1, max_value=50, help_text="每个用例重复运行次数")
+
+
+class GenerateOutputsSerializer(serializers.Serializer):
+    """生成期望输出参数"""
+    
+    only_empty = serializers.BooleanField(required=False, default=False, help_text="只生成期望输出为空的用例")
+
+
+class GenerateTestsSerializer(serializers.Serializer):
+    """生成随机用例参数"""
+    
+    count = serializers.IntegerField(min_value=1, help_text="生成的用例数")
+    seed_start = serializers.IntegerField(required=False, default=0, help_text="起始种子")
+    replace = serializers.BooleanField(required=False, default=False, help_text="是否替换之前生成的用例")
+    
+    def validate_count(self, value):
+        if value > settings.GENERATOR_MAX_CASES:
+            raise serializers.ValidationError(f"单次最多生成{settings.GENERATOR_MAX_CASES}个用例")
+        return value
+
+
+class TaskJobSerializer(serializers.ModelSerializer):
+    """任务作业序列化器"""
+    
+    class Meta:
+        model = TaskJob
+        fields = [
+            "id", "task", "kind", "status", "params", "total", "completed",
+            "report", "error", "created_at", "finished_at"
+        ]
+        read_only_fields = fields
@@ -1,3 +1,44 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from classes.models import Class
+from users.models import User
+
+from . import jobs
+from .models import Task, TaskJob
+
+
+class RunJobTests(TestCase):
+    """任务作业：执行期间被标记为中断的作业结束后保持失败"""
+
+    def setUp(self):
+        teacher = User.objects.create_user(username="teacher", password="x", role="teacher")
+        self.task = Task.objects.create(
+            title="加法",
+            description="a+b",
+            language="python",
+            class_obj=Class.objects.create(name="算法", teacher=teacher),
+            created_by=teacher,
+        )
+
+    def _run(self, handler):
+        job = TaskJob.objects.create(task=self.task, kind="calibrate")
+        with mock.patch.dict(jobs.JOB_HANDLERS, {"calibrate": handler}):
+            return jobs.run_job(job.id)
+
+    def test_succeeds(self):
+        job = self._run(lambda job, progress: {"calibrated": 1})
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.report, {"calibrated": 1})
+
+    def test_stale_job_stays_failed(self):
+        def slow(job, progress):
+            # 执行期间心跳超时，被查询作业的请求标记为中断
+            TaskJob.objects.filter(id=job.id).update(status="failed", error=jobs.STALE_ERROR)
+            return {"calibrated": 1}
+
+        job = self._run(slow)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, jobs.STALE_ERROR)
+        self.assertIsNone(job.report)
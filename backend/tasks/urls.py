@@ -4,6 +4,11 @@ from .views import (
     TaskDetailView,
     student_task_list,
     student_task_detail,
+    calibrate_task_limits,
+    time_reference_solution,
+    generate_expected_outputs,
+    generate_stress_tests,
+    task_job_detail,
 )
 
 app_name = "tasks"
@@ -13,5 +18,10 @@ urlpatterns = [
     path("<int:pk>/", TaskDetailView.as_view(), name="task_detail"),
     path("student/", student_task_list, name="student_task_list"),
     path("student/<int:task_id>/", student_task_detail, name="student_task_detail"),
+    path("<int:task_id>/calibrate/", calibrate_task_limits, name="calibrate_task_limits"),
+    path("<int:task_id>/time-reference/", time_reference_solution, name="time_reference_solution"),
+    path("<int:task_id>/generate-outputs/", generate_expected_outputs, name="generate_expected_outputs"),
+    path("<int:task_id>/generate-tests/", generate_stress_tests, name="generate_stress_tests"),
+    path("jobs/<int:job_id>/", task_job_detail, name="task_job_detail"),
 ]
 
@@ -2,12 +2,18 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from .models import Task, TestCase
+from .models import Task, TaskJob, TestCase
 from .serializers import (
     TaskSerializer,
     TaskDetailSerializer,
     TaskCreateSerializer,
+    CalibrationSerializer,
+    GenerateOutputsSerializer,
+    GenerateTestsSerializer,
+    ReferenceTimingSerializer,
+    TaskJobSerializer,
 )
+from .jobs import fail_stale_jobs, start_job
 from classes.models import Class
 from users.permissions import IsTeacherOrAdmin
 
@@ -102,10 +108,118 @@ def student_task_detail(request, task_id):
     serializer = TaskDetailSerializer(task)
     data = serializer.data
     
-    # 过滤掉隐藏的测试用例
+    # 不向学生返回参考答案和生成脚本，并过滤掉隐藏的测试用例
+    data.pop("reference_solution", None)
+    data.pop("generator_script", None)
     data["test_cases"] = [
         tc for tc in data["test_cases"]
         if not tc["is_hidden"]
     ]
     
     return Response(data)
+
+
+@api_view(["POST"])
+@permission_classes([IsTeacherOrAdmin])
+def calibrate_task_limits(request, task_id):
+    """用参考答案校准各测试用例的资源限制（后台执行，返回作业）"""
+    try:
+        task = Task.objects.select_related("class_obj").get(id=task_id)
+    except Task.DoesNotExist:
+        return Response({"error": "任务不存在"}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not request.user.is_admin and task.class_obj.teacher != request.user:
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+    
+    if not task.reference_solution:
+        return Response({"error": "请先设置参考答案"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = CalibrationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    job = start_job(task, "calibrate", user=request.user, params=serializer.validated_data)
+    return Response(TaskJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["POST"])
+@permission_classes([IsTeacherOrAdmin])
+def time_reference_solution(request, task_id):
+    """测量参考答案在各测试用例上的运行时间，供速度分档计分使用（后台执行，返回作业）"""
+    try:
+        task = Task.objects.select_related("class_obj").get(id=task_id)
+    except Task.DoesNotExist:
+        return Response({"error": "任务不存在"}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not request.user.is_admin and task.class_obj.teacher != request.user:
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+    
+    if not task.reference_solution:
+        return Response({"error": "请先设置参考答案"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ReferenceTimingSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    job = start_job(task, "time_reference", user=request.user, params=serializer.validated_data)
+    return Response(TaskJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["POST"])
+@permission_classes([IsTeacherOrAdmin])
+def generate_expected_outputs(request, task_id):
+    """用参考答案批量生成测试用例的期望输出（后台执行，返回作业）"""
+    try:
+        task = Task.objects.select_related("class_obj").get(id=task_id)
+    except Task.DoesNotExist:
+        return Response({"error": "任务不存在"}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not request.user.is_admin and task.class_obj.teacher != request.user:
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+    
+    if not task.reference_solution:
+        return Response({"error": "请先设置参考答案"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = GenerateOutputsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    job = start_job(task, "generate_outputs", user=request.user, params=serializer.validated_data)
+    return Response(TaskJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["POST"])
+@permission_classes([IsTeacherOrAdmin])
+def generate_stress_tests(request, task_id):
+    """运行任务的生成脚本批量生成隐藏用例，期望输出由参考答案生成（后台执行，返回作业）"""
+    try:
+        task = Task.objects.select_related("class_obj").get(id=task_id)
+    except Task.DoesNotExist:
+        return Response({"error": "任务不存在"}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not request.user.is_admin and task.class_obj.teacher != request.user:
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+    
+    if not task.generator_script or not task.reference_solution:
+        return Response({"error": "请先设置生成脚本和参考答案"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = GenerateTestsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    job = start_job(task, "generate_tests", user=request.user, params=serializer.validated_data)
+    return Response(TaskJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([IsTeacherOrAdmin])
+def task_job_detail(request, job_id):
+    """查询任务作业的进度和结果报告"""
+    try:
+        job = TaskJob.objects.select_related("task__class_obj").get(id=job_id)
+    except TaskJob.DoesNotExist:
+        return Response({"error": "作业不存在"}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not request.user.is_admin and job.task.class_obj.teacher != request.user:
+        return Response({"error": "无权限"}, status=status.HTTP_403_FORBIDDEN)
+    
+    # 执行作业的进程已重启或被杀掉时，作业不会再有进展，标记为失败
+    if fail_stale_jobs(TaskJob.objects.filter(id=job.id)):
+        job.refresh_from_db()
+    return Response(TaskJobSerializer(job).data)